@@ -0,0 +1,42 @@
+"""
+Latency of a contact detail read (served from the cache) through the regular
+middleware stack and through the lean API one
+
+    $ python -m benchmarks.middleware
+"""
+from benchmarks.utils import setup_django, measure
+
+REPEAT = 2000
+
+
+def main():
+    setup_django()
+
+    from wsgiref.util import setup_testing_defaults
+    from django.core.handlers.wsgi import WSGIHandler
+
+    from contactmanager.handlers import APIWSGIHandler
+    from contacts.models import Contact
+
+    contact = Contact.objects.create(first_name='Elton', last_name='John', date_of_birth='1947-03-25')
+    environ = {'PATH_INFO': '/contactmanager/v1/contacts/{}'.format(contact.pk), 'HTTP_HOST': 'testserver'}
+    setup_testing_defaults(environ)
+
+    def read(handler):
+        def request():
+            response = handler(dict(environ), lambda status, headers: None)
+            b''.join(response)
+            response.close()
+        return request
+
+    handlers = (('MIDDLEWARE', WSGIHandler()), ('API_MIDDLEWARE', APIWSGIHandler()))
+    for _, handler in handlers:
+        read(handler)()
+
+    print('{:>16} {:>12}'.format('stack', 'read (µs)'))
+    for name, handler in handlers:
+        print('{:>16} {:>12.1f}'.format(name, measure(read(handler), REPEAT) * 1000))
+
+
+if __name__ == '__main__':
+    main()
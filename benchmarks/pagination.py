@@ -0,0 +1,48 @@
+"""
+Latency of a page of the contacts listing as the table grows, with the
+estimated count pagination and with DRF's PageNumberPagination (COUNT(*))
+
+    $ python -m benchmarks.pagination
+"""
+from benchmarks.utils import setup_django, measure
+
+TABLE_SIZES = (10000, 100000, 500000)
+PAGE_URL = '/contactmanager/v1/contacts?page=3&page_size=20'
+
+
+def main():
+    setup_django()
+
+    from datetime import date
+    from rest_framework.pagination import PageNumberPagination
+    from rest_framework.test import APIClient
+
+    from contacts.models import Contact
+    from contacts.views import ListContactsView
+
+    class CountingPagination(PageNumberPagination):
+        page_size_query_param = 'page_size'
+
+    client = APIClient()
+    estimated_pagination = ListContactsView.pagination_class
+
+    print('{:>10} {:>16} {:>16}'.format('contacts', 'estimated (ms)', 'COUNT(*) (ms)'))
+    for size in TABLE_SIZES:
+        first_id = Contact.objects.count()
+        Contact.objects.bulk_create(
+            (Contact(first_name='First {}'.format(i), last_name='Last {}'.format(i), date_of_birth=date(1990, 1, 1))
+             for i in range(first_id, size)),
+            batch_size=500
+        )
+
+        ListContactsView.pagination_class = estimated_pagination
+        estimated_latency = measure(lambda: client.get(PAGE_URL))
+        ListContactsView.pagination_class = CountingPagination
+        counting_latency = measure(lambda: client.get(PAGE_URL))
+        print('{:>10} {:>16.2f} {:>16.2f}'.format(size, estimated_latency, counting_latency))
+
+    ListContactsView.pagination_class = estimated_pagination
+
+
+if __name__ == '__main__':
+    main()
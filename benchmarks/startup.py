@@ -0,0 +1,63 @@
+"""
+Cold start of a worker with the full and the API-only (CONTACTMANAGER_API_ONLY=1)
+startup profiles: time to load the WSGI application and to serve its first request
+(a page of contacts, so the database must be migrated)
+
+    $ python -m benchmarks.startup
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+RUNS = 20
+
+WORKER = '''
+import json, sys, time
+started_at = time.perf_counter()
+from wsgiref.util import setup_testing_defaults
+from contactmanager.wsgi import application
+loaded_at = time.perf_counter()
+
+environ = {'PATH_INFO': '/contactmanager/v1/contacts'}
+setup_testing_defaults(environ)
+b''.join(application(environ, lambda status, headers: None))
+answered_at = time.perf_counter()
+
+print(json.dumps({
+    'load': (loaded_at - started_at) * 1000,
+    'first_request': (answered_at - loaded_at) * 1000,
+    'modules': len(sys.modules),
+}))
+'''
+
+
+def start_worker(api_only):
+    environ = dict(os.environ, CONTACTMANAGER_API_ONLY='1' if api_only else '0')
+    output = subprocess.run(
+        [sys.executable, '-c', WORKER], env=environ, check=True, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+    ).stdout
+    return json.loads(output)
+
+
+def main():
+    # The profiles are started alternately, so they are equally affected by the machine load
+    profiles = (('full', False), ('api-only', True))
+    runs = {profile: [] for profile, _ in profiles}
+    for _ in range(RUNS):
+        for profile, api_only in profiles:
+            runs[profile].append(start_worker(api_only))
+
+    print('{:>10} {:>10} {:>20} {:>10}'.format('profile', 'load (ms)', 'first request (ms)', 'modules'))
+    for profile, profile_runs in runs.items():
+        print('{:>10} {:>10.1f} {:>20.1f} {:>10}'.format(
+            profile,
+            statistics.median(run['load'] for run in profile_runs),
+            statistics.median(run['first_request'] for run in profile_runs),
+            profile_runs[0]['modules'],
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,30 @@
+import os
+import statistics
+import time
+
+
+def setup_django():
+    """
+    Configure Django with the project settings and an empty in-memory database
+    """
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'contactmanager.settings')
+
+    import django
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+
+    django.setup()
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0)
+
+
+def measure(function, repeat=50):
+    """
+    Median duration, in milliseconds, of a function call
+    """
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        durations.append((time.perf_counter() - start) * 1000)
+    return statistics.median(durations)
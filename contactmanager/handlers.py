@@ -0,0 +1,63 @@
+"""
+WSGI handlers of the project: the versioned API is served by a handler running
+only the middleware it needs (`API_MIDDLEWARE`), and everything else (admin,
+docs) by the regular one (`MIDDLEWARE`)
+"""
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.core.handlers.exception import convert_exception_to_response
+from django.core.handlers.wsgi import WSGIHandler
+from django.utils.module_loading import import_string
+
+
+class APIWSGIHandler(WSGIHandler):
+    """
+    WSGI handler running the `API_MIDDLEWARE` stack instead of `MIDDLEWARE`
+    """
+
+    def load_middleware(self):
+        # Same as BaseHandler.load_middleware, which always reads settings.MIDDLEWARE
+        self._view_middleware = []
+        self._template_response_middleware = []
+        self._exception_middleware = []
+
+        handler = convert_exception_to_response(self._get_response)
+        for middleware_path in reversed(settings.API_MIDDLEWARE):
+            try:
+                middleware = import_string(middleware_path)(handler)
+            except MiddlewareNotUsed:
+                continue
+            if middleware is None:
+                raise ImproperlyConfigured('Middleware factory {} returned None.'.format(middleware_path))
+
+            if hasattr(middleware, 'process_view'):
+                self._view_middleware.insert(0, middleware.process_view)
+            if hasattr(middleware, 'process_template_response'):
+                self._template_response_middleware.append(middleware.process_template_response)
+            if hasattr(middleware, 'process_exception'):
+                self._exception_middleware.append(middleware.process_exception)
+            handler = convert_exception_to_response(middleware)
+
+        self._middleware_chain = handler
+
+
+class PrefixDispatcher:
+    """
+    WSGI application passing the requests to the application of the first
+    matching path prefix, or to the default one
+    """
+
+    def __init__(self, default, prefixes):
+        """
+        :param default: application of the requests not matching any prefix
+        :param prefixes: dict of the applications by path prefix
+        """
+        self.default = default
+        self.prefixes = tuple(prefixes.items())
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        for prefix, application in self.prefixes:
+            if path.startswith(prefix):
+                return application(environ, start_response)
+        return self.default(environ, start_response)
@@ -43,15 +43,55 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'contacts.middleware.MetricsMiddleware',
+    'contacts.middleware.SlowQueryLogMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
+    'contacts.middleware.AdmissionControlMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'contacts.middleware.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Middleware of the versioned API (served by contactmanager.handlers.APIWSGIHandler), which is stateless: no
+# sessions, CSRF, messages nor clickjacking protection
+
+API_PATH_PREFIX = '/contactmanager/'
+
+API_MIDDLEWARE = [
+    'django.middleware.security.SecurityMiddleware',
+    'contacts.middleware.MetricsMiddleware',
+    'contacts.middleware.SlowQueryLogMiddleware',
+    'corsheaders.middleware.CorsMiddleware',
+    'contacts.middleware.AdmissionControlMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'contacts.middleware.ProfilingMiddleware',
+]
+
+# API-only startup profile (CONTACTMANAGER_API_ONLY=1), for the workers serving only the API: without the admin,
+# sessions, messages and docs UI, nor the browsable API (the OpenAPI schema is served from a prebuilt file)
+
+API_ONLY = os.environ.get('CONTACTMANAGER_API_ONLY') == '1'
+
+if API_ONLY:
+    INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in (
+        'django.contrib.admin',
+        'django.contrib.sessions',
+        'django.contrib.messages',
+        'django.contrib.staticfiles',
+        'rest_framework_swagger',
+    )]
+    MIDDLEWARE = [middleware for middleware in MIDDLEWARE if middleware not in (
+        'django.contrib.sessions.middleware.SessionMiddleware',
+        'django.middleware.csrf.CsrfViewMiddleware',
+        'django.contrib.auth.middleware.AuthenticationMiddleware',
+        'contacts.middleware.ProfilingMiddleware',
+        'django.contrib.messages.middleware.MessageMiddleware',
+    )]
+
 ROOT_URLCONF = 'contactmanager.urls'
 
 TEMPLATES = [
@@ -82,6 +122,13 @@ DATABASES = {
     }
 }
 
+# Directory of the files generated by the contacts app (reports, snapshots)
+
+CONTACTS_DATA_DIR = os.path.join(BASE_DIR, 'data')
+
+# The tests write these files to a temporary directory instead
+TEST_RUNNER = 'contactmanager.test_runner.TemporaryDataDirRunner'
+
 # Password validation
 # https://docs.djangoproject.com/en/2.1/ref/settings/#auth-password-validators
 
@@ -100,6 +147,118 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Cache
+# https://docs.djangoproject.com/en/2.1/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'contactmanager',
+    }
+}
+
+# Contacts cache configurations (timeouts in seconds)
+
+CONTACTS_CACHE = {
+    'DETAIL_TIMEOUT': 300,
+    'REBUILD_TIMEOUT': 5,
+    'SEARCH_RESULTS_SIZE': 1024,
+    # Ids held by all the cached search results together (an empty query matches every contact)
+    'SEARCH_RESULTS_MAX_IDS': 200000,
+    'COUNT_TIMEOUT': 3600,
+}
+
+# Contacts pagination configurations (see contacts.pagination)
+
+CONTACTS_PAGINATION = {
+    'PAGE_SIZE': 20,
+    'MAX_PAGE_SIZE': 100,
+    'COUNT_CAP': 1000,
+}
+
+# Contacts fuzzy search configurations
+
+CONTACTS_FUZZY_SEARCH = {
+    'MAX_CANDIDATES': 500,
+}
+
+# Contacts duplicates detection configurations (see contacts.duplicates)
+
+CONTACTS_DUPLICATES = {
+    'THRESHOLD': 0.65,
+    'WINDOW': 50,
+}
+
+# Contacts autocomplete configurations (see contacts.name_index)
+
+CONTACTS_AUTOCOMPLETE = {
+    'LIMIT': 10,
+    'MAX_LIMIT': 50,
+    'MAX_STALENESS': 60,
+}
+
+# Request profiling (staff only, see contacts.middleware.ProfilingMiddleware)
+
+CONTACTS_PROFILING = {
+    'QUERY_PARAMETER': '_profile',
+    'HEADER': 'X-Profile',
+    'TOP_FUNCTIONS': 50,
+}
+
+# Slow queries log (see contacts.instrumentation.SlowQueryLog)
+
+CONTACTS_SLOW_QUERIES = {
+    'THRESHOLD_MS': 100,
+    'SAMPLE_RATE': 1.0,
+    'RECENT': 100,
+}
+
+# Metrics shared by the worker processes (see contacts.metrics)
+
+CONTACTS_METRICS = {
+    'LATENCY_BUCKETS': (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+}
+
+# Background jobs run by `manage.py run_workers` (see contacts.jobs, intervals in seconds)
+
+CONTACTS_JOBS = {
+    'CONCURRENCY': 2,
+    'POLL_INTERVAL': 1.0,
+    'PROGRESS_INTERVAL': 1.0,
+    'RETENTION_DAYS': 7,
+    # Jobs queued again once their interval has passed since they were last queued
+    'PERIODIC': {
+        'purge_deleted_contacts': 3600,
+    },
+}
+
+# Deleted contacts, restorable for `RETENTION_DAYS` and then purged (see contacts.jobs)
+
+CONTACTS_DELETION = {
+    'RETENTION_DAYS': 30,
+    'PURGE_BATCH_SIZE': 1000,
+}
+
+# Logging
+# https://docs.djangoproject.com/en/2.1/topics/logging/
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'contacts.slow_queries': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
 # Internationalization
 # https://docs.djangoproject.com/en/2.1/topics/i18n/
 
@@ -125,3 +284,27 @@ STATIC_URL = '/static/'
 REST_FRAMEWORK = {
     'DEFAULT_VERSIONING_CLASS': 'rest_framework.versioning.URLPathVersioning',
 }
+
+if API_ONLY:
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'] = ['rest_framework.renderers.JSONRenderer']
+    REST_FRAMEWORK['DEFAULT_AUTHENTICATION_CLASSES'] = ['rest_framework.authentication.BasicAuthentication']
+
+# OpenAPI schema of the API, built with `manage.py build_openapi_schema`
+
+OPENAPI_SCHEMA_FILE = os.path.join(CONTACTS_DATA_DIR, 'openapi.json')
+
+# Admission control (concurrent requests per route class, see contacts.middleware)
+
+ADMISSION_CONTROL = {
+    'ROUTE_CLASSES': {
+        'contacts-search': 'search',
+        'contact-merge': 'bulk',
+        'contacts-export': 'bulk',
+    },
+    'LIMITS': {
+        'search': {'CONCURRENCY': 4, 'QUEUE_SIZE': 8, 'TIMEOUT': 2.0},
+        'bulk': {'CONCURRENCY': 2, 'QUEUE_SIZE': 4, 'TIMEOUT': 5.0},
+        'normal': {'CONCURRENCY': 32, 'QUEUE_SIZE': 64, 'TIMEOUT': 5.0},
+    },
+    'RETRY_AFTER': 1,
+}
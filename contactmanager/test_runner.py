@@ -0,0 +1,24 @@
+import shutil
+import tempfile
+
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+
+
+class TemporaryDataDirRunner(DiscoverRunner):
+    """
+    Test runner pointing `CONTACTS_DATA_DIR` to a temporary directory, so the
+    files written by the tests (metrics, generations, reports) never land in
+    the data directory of the project
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.data_dir = tempfile.mkdtemp(prefix='contactmanager-tests-')
+        self.settings_override = override_settings(CONTACTS_DATA_DIR=self.data_dir)
+        self.settings_override.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.settings_override.disable()
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
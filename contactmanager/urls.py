@@ -13,13 +13,37 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
-from django.contrib import admin
+from django.conf import settings
 from django.urls import path, re_path, include
 from django.conf.urls import url
-from rest_framework_swagger.views import get_swagger_view
+
+from contacts.views import MetricsView, OpenAPISchemaView
+
+_docs_view = None
+
+
+def docs_view(request, *args, **kwargs):
+    """
+    Swagger UI of the API, built on its first request (its dependencies are slow to import)
+    """
+    global _docs_view
+    if _docs_view is None:
+        from rest_framework_swagger.views import get_swagger_view
+        _docs_view = get_swagger_view(title='Contact Manager API')
+    return _docs_view(request, *args, **kwargs)
+
 
 urlpatterns = [
-    url('docs/', get_swagger_view(title='Contact Manager API')),
-    path('admin/', admin.site.urls),
+    path('docs/openapi.json', OpenAPISchemaView.as_view(), name='openapi-schema'),
+    # Where the Prometheus scrapers look for them, outside of the versioned API
+    path('metrics', MetricsView.as_view(), name='metrics'),
     re_path('contactmanager/(?P<version>(v1))/', include('contacts.urls'))
 ]
+
+if not settings.API_ONLY:
+    from django.contrib import admin
+
+    urlpatterns += [
+        url('docs/', docs_view),
+        path('admin/', admin.site.urls),
+    ]
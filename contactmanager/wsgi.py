@@ -9,8 +9,18 @@ https://docs.djangoproject.com/en/2.1/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
+from contactmanager.handlers import APIWSGIHandler, PrefixDispatcher
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'contactmanager.settings')
 
-application = get_wsgi_application()
+# The versioned API and the metrics run a lean middleware stack (see contactmanager.handlers)
+default_application = get_wsgi_application()
+api_application = APIWSGIHandler()
+
+application = PrefixDispatcher(default_application, {
+    settings.API_PATH_PREFIX: api_application,
+    '/metrics': api_application,
+})
@@ -1,8 +1,117 @@
+from functools import reduce
+from operator import or_
+
 from django.contrib import admin
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.forms.models import BaseInlineFormSet
 
+from contacts.db import prefix_lookups
 from contacts.models import Contact, PhoneNumber, EmailField, AddressField
+from contacts.pagination import EstimatedCountPaginator
+from contacts.text import content_hash, fold
+
+
+class ScalableAdmin(admin.ModelAdmin):
+    """
+    Admin of a large table: the changelist never counts the whole table, is
+    only sorted by its (indexed) default ordering and is searched with
+    `search_lookups` (index ranges) instead of the default `icontains` scans
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    sortable_by = ()
+
+    def search_lookups(self, search_term):
+        """
+        Filter matching a (non-empty) search term, by default the rows with one
+        of the `search_fields` starting with it
+        :param search_term:
+        :return: Q object
+        """
+        return reduce(or_, (Q(**prefix_lookups(field, search_term)) for field in self.search_fields))
+
+    def get_search_results(self, request, queryset, search_term):
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        return queryset.filter(self.search_lookups(search_term)), False
+
+
+class PhoneNumberInline(admin.TabularInline):
+    model = PhoneNumber
+    extra = 0
+
+
+class EmailFieldInline(admin.TabularInline):
+    model = EmailField
+    extra = 0
+
+
+class AddressFieldInlineFormSet(BaseInlineFormSet):
+    def clean(self):
+        """
+        Reject the same address given twice, which the model validation cannot
+        see before the addresses are saved
+        """
+        super().clean()
+        hashes = set()
+        for form in self.forms:
+            if not form.cleaned_data or self._should_delete_form(form):
+                continue
+            values = [form.cleaned_data.get(field) for field in AddressField.CONTENT_FIELDS]
+            if None in values:
+                continue
+            address_hash = content_hash(*values)
+            if address_hash in hashes:
+                raise ValidationError('The same address is given more than once.')
+            hashes.add(address_hash)
+
+
+class AddressFieldInline(admin.TabularInline):
+    model = AddressField
+    formset = AddressFieldInlineFormSet
+    extra = 0
+
+
+@admin.register(Contact)
+class ContactAdmin(ScalableAdmin):
+    list_display = ('first_name', 'last_name', 'date_of_birth')
+    ordering = Contact.NAME_ORDERING
+    # Only for the search box (and the autocompletes), see `search_lookups`
+    search_fields = ('first_name_key', 'last_name_key')
+    inlines = (PhoneNumberInline, EmailFieldInline, AddressFieldInline)
+
+    def search_lookups(self, search_term):
+        """
+        Contacts with a first or last name starting with the term, ignoring case and accents
+        """
+        key = fold(search_term)
+        return Q(**prefix_lookups('first_name_key', key)) | Q(**prefix_lookups('last_name_key', key))
+
+
+@admin.register(PhoneNumber)
+class PhoneNumberAdmin(ScalableAdmin):
+    list_display = ('phone', 'contact')
+    list_select_related = ('contact',)
+    autocomplete_fields = ('contact',)
+    search_fields = ('phone',)
+
+
+@admin.register(EmailField)
+class EmailFieldAdmin(ScalableAdmin):
+    list_display = ('email', 'contact')
+    list_select_related = ('contact',)
+    autocomplete_fields = ('contact',)
+    search_fields = ('email_key',)
+
+    def search_lookups(self, search_term):
+        return Q(**prefix_lookups('email_key', fold(search_term)))
+
 
-admin.site.register(Contact)
-admin.site.register(PhoneNumber)
-admin.site.register(EmailField)
-admin.site.register(AddressField)
+@admin.register(AddressField)
+class AddressFieldAdmin(ScalableAdmin):
+    list_display = ('address', 'city', 'state', 'country', 'zip_code', 'contact')
+    list_select_related = ('contact',)
+    autocomplete_fields = ('contact',)
+    search_fields = ('zip_code',)
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class ContactsConfig(AppConfig):
     name = 'contacts'
+
+    def ready(self):
+        from contacts import signals  # noqa: F401
@@ -0,0 +1,331 @@
+import fcntl
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from contacts import metrics
+from contacts.models import Contact
+from contacts.text import fold
+
+# By contact id and data generation, so the writes of any process make the cached contacts misses
+CONTACT_DETAIL_KEY = 'contacts:detail:{}:{}'
+CONTACT_DETAIL_LOCK_KEY = 'contacts:detail:{}:{}:lock'
+DATA_GENERATION = 'data'
+NAMES_GENERATION = 'names'
+CONTACTS_COUNT = 'contacts_count'
+REBUILD_POLL_INTERVAL = 0.01
+
+
+def get_or_render_contact(contact_id, render):
+    """
+    Read-through lookup of the rendered representation of a contact at the
+    current data generation, only one caller rebuilds a cold key while the
+    others wait for its result
+    :param contact_id:
+    :param render: callable that returns the rendered bytes of the contact
+    :return:
+    """
+    generation = data_generation()
+    key = CONTACT_DETAIL_KEY.format(contact_id, generation)
+    content = cache.get(key)
+    if content is not None:
+        metrics.CACHE_LOOKUPS.inc(cache='contact_detail', result='hit')
+        return content
+
+    metrics.CACHE_LOOKUPS.inc(cache='contact_detail', result='miss')
+    lock_key = CONTACT_DETAIL_LOCK_KEY.format(contact_id, generation)
+    rebuild_timeout = settings.CONTACTS_CACHE['REBUILD_TIMEOUT']
+    if cache.add(lock_key, True, rebuild_timeout):
+        try:
+            content = render()
+            cache.set(key, content, settings.CONTACTS_CACHE['DETAIL_TIMEOUT'])
+            return content
+        finally:
+            cache.delete(lock_key)
+
+    deadline = time.monotonic() + rebuild_timeout
+    while time.monotonic() < deadline:
+        time.sleep(REBUILD_POLL_INTERVAL)
+        content = cache.get(key)
+        if content is not None:
+            return content
+        if cache.get(lock_key) is None:
+            break
+
+    # The rebuild failed (e.g. the contact does not exist) or took too long
+    return render()
+
+
+def get_cached_contact(contact_id):
+    """
+    Cached rendered representation of a contact at the current data
+    generation, without rendering it on a miss
+    :param contact_id:
+    :return: the rendered bytes, or None
+    """
+    return cache.get(CONTACT_DETAIL_KEY.format(contact_id, data_generation()))
+
+
+def generations_dir():
+    return os.path.join(settings.CONTACTS_DATA_DIR, 'generations')
+
+
+class SharedCounter:
+    """
+    64-bit counter stored in a memory-mapped file, shared by all the processes
+    of the host. The increments hold an exclusive lock on the file, the reads
+    take none (the counter is a single aligned word)
+    """
+    # Layout of the file, the counter first
+    LAYOUT = struct.Struct('<q')
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._file = open(path, 'a+b')
+        fcntl.flock(self._file, fcntl.LOCK_EX)
+        try:
+            if os.fstat(self._file.fileno()).st_size < self.LAYOUT.size:
+                self._file.truncate(0)
+                self._file.write(self.LAYOUT.pack(*self.initial_values()))
+                self._file.flush()
+        finally:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+        self._mmap = mmap.mmap(self._file.fileno(), self.LAYOUT.size)
+
+    def initial_values(self):
+        # Start from the clock, so a lost counter never repeats an old generation
+        return (time.time_ns(),)
+
+    def values(self):
+        return self.LAYOUT.unpack_from(self._mmap)
+
+    def value(self):
+        return self.values()[0]
+
+    @contextmanager
+    def locked(self):
+        # The file lock is held per open file, so the threads of this process take turns first
+        with self._lock:
+            fcntl.flock(self._file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._file, fcntl.LOCK_UN)
+
+    def increment(self):
+        with self.locked():
+            value = self.value() + 1
+            self.LAYOUT.pack_into(self._mmap, 0, value)
+            return value
+
+
+class SharedCount(SharedCounter):
+    """
+    Count shared by all the processes of the host, followed in its file by
+    the time it expires at: the writes add their changes to it until then,
+    and it is counted again once expired (which bounds its drift)
+    """
+    LAYOUT = struct.Struct('<qd')
+
+    def initial_values(self):
+        # Expired, so the first read counts
+        return (0, 0.0)
+
+    def get(self, count, timeout):
+        """
+        :param count: callable counting the rows
+        :param timeout: seconds until the new count expires
+        :return: the count
+        """
+        value, expires_at = self.values()
+        if expires_at > time.time():
+            return value
+
+        with self.locked():
+            value, expires_at = self.values()
+            if expires_at <= time.time():
+                value = count()
+                self.LAYOUT.pack_into(self._mmap, 0, value, time.time() + timeout)
+            return value
+
+    def add(self, delta):
+        with self.locked():
+            value, expires_at = self.values()
+            if expires_at > time.time():
+                self.LAYOUT.pack_into(self._mmap, 0, value + delta, expires_at)
+
+    def expire(self):
+        with self.locked():
+            self.LAYOUT.pack_into(self._mmap, 0, *self.initial_values())
+
+
+_counters = {}
+_counters_owner = None
+_counters_lock = threading.Lock()
+
+
+def shared_counter(name, counter_class=SharedCounter):
+    """
+    Counter file of a generation, or of a count (reopened after a fork)
+    :param name:
+    :param counter_class: SharedCounter or SharedCount
+    :return:
+    """
+    global _counters_owner
+    owner = (os.getpid(), settings.CONTACTS_DATA_DIR)
+    with _counters_lock:
+        if _counters_owner != owner:
+            _counters.clear()
+            _counters_owner = owner
+        counter = _counters.get(name)
+        if counter is None:
+            os.makedirs(generations_dir(), exist_ok=True)
+            counter = _counters[name] = counter_class(os.path.join(generations_dir(), name))
+        return counter
+
+
+def get_generation(name):
+    """
+    Current value of a generation counter, it changes on every bump (in any
+    process of the host)
+    :param name:
+    :return:
+    """
+    return shared_counter(name).value()
+
+
+def increment_generation(name):
+    """
+    Bump a generation counter
+    :param name:
+    :return: the new generation
+    """
+    return shared_counter(name).increment()
+
+
+def data_generation():
+    """
+    Current generation of the contacts data, it changes on every write
+    """
+    return get_generation(DATA_GENERATION)
+
+
+def bump_data_generation():
+    """
+    Move the contacts data to a new generation, now and once the current
+    transaction is committed
+    """
+    increment_generation(DATA_GENERATION)
+    transaction.on_commit(lambda: increment_generation(DATA_GENERATION))
+
+
+def contacts_count():
+    """
+    Number of contacts, from a count shared by the processes and maintained by
+    the writes (the table is only counted when the count is expired)
+    """
+    return shared_counter(CONTACTS_COUNT, SharedCount).get(
+        Contact.objects.count, settings.CONTACTS_CACHE['COUNT_TIMEOUT']
+    )
+
+
+def adjust_contacts_count(delta):
+    """
+    Apply the committed creation (or removal) of contacts to the count
+    :param delta:
+    """
+    transaction.on_commit(lambda: shared_counter(CONTACTS_COUNT, SharedCount).add(delta))
+
+
+def clear_contacts_count():
+    """
+    Expire the count of the contacts, it is counted again on the next read
+    """
+    shared_counter(CONTACTS_COUNT, SharedCount).expire()
+
+
+def normalize_query(query):
+    """
+    Normalize a search query, folding only what the search itself ignores (case and accents)
+    :param query:
+    :return:
+    """
+    return fold(query)
+
+
+class SearchResultCache:
+    """
+    Bounded LRU mapping of normalized search queries to the ordered ids of
+    the matching contacts, the entries of older data generations are misses.
+    It holds at most `max_size` queries and `max_ids` ids in all, a result
+    larger than that is not kept
+    """
+
+    def __init__(self, max_size, max_ids):
+        self.max_size = max_size
+        self.max_ids = max_ids
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._ids = 0
+        self._lock = threading.Lock()
+
+    def get(self, query, generation):
+        with self._lock:
+            entry = self._entries.get(query)
+            if entry is None or entry[0] != generation:
+                self.misses += 1
+                metrics.CACHE_LOOKUPS.inc(cache='search', result='miss')
+                return None
+
+            self._entries.move_to_end(query)
+            self.hits += 1
+            metrics.CACHE_LOOKUPS.inc(cache='search', result='hit')
+            return entry[1]
+
+    def set(self, query, generation, contact_ids):
+        with self._lock:
+            previous = self._entries.pop(query, None)
+            if previous is not None:
+                self._ids -= len(previous[1])
+            if len(contact_ids) > self.max_ids:
+                return
+
+            self._entries[query] = (generation, contact_ids)
+            self._ids += len(contact_ids)
+            while len(self._entries) > self.max_size or self._ids > self.max_ids:
+                _, (_, evicted_ids) = self._entries.popitem(last=False)
+                self._ids -= len(evicted_ids)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._ids = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ids': self._ids,
+                'max_ids': self.max_ids,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else None,
+            }
+
+
+search_results = SearchResultCache(
+    settings.CONTACTS_CACHE['SEARCH_RESULTS_SIZE'], settings.CONTACTS_CACHE['SEARCH_RESULTS_MAX_IDS']
+)
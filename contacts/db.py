@@ -0,0 +1,64 @@
+from django.db import connections, router
+
+
+def bulk_delete(queryset):
+    """
+    Delete the rows of a queryset with a single `DELETE ... WHERE pk IN (...)`,
+    without loading them (so no cascades nor per-row signals are run)
+    :param queryset:
+    :return: number of deleted rows
+    """
+    connection = connections[queryset.db]
+    quote_name = connection.ops.quote_name
+    meta = queryset.model._meta
+    sql, params = queryset.order_by().values('pk').query.sql_with_params()
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'DELETE FROM {} WHERE {} IN ({})'.format(quote_name(meta.db_table), quote_name(meta.pk.column), sql), params
+        )
+        return cursor.rowcount
+
+
+def is_unfiltered(queryset):
+    """
+    Whether a queryset has no other filters than the ones of its model's
+    default manager (e.g. the contacts not deleted)
+    :param queryset:
+    :return:
+    """
+    compiler = queryset.query.get_compiler(queryset.db)
+    default_query = queryset.model._default_manager.all().query
+    return compiler.compile(queryset.query.where) == compiler.compile(default_query.where)
+
+
+def prefix_lookups(field, prefix):
+    """
+    Lookups of the values of a field starting with a (non-empty) prefix, as a
+    range instead of a LIKE so that an index on the field is always used
+    :param field:
+    :param prefix:
+    :return: dict of lookups, for `filter` or `Q`
+    """
+    return {
+        '{}__gte'.format(field): prefix,
+        '{}__lt'.format(field): prefix[:-1] + chr(ord(prefix[-1]) + 1),
+    }
+
+
+def estimated_rows(model):
+    """
+    Number of rows of the table of a model as estimated by the database
+    statistics, without counting them (only available on PostgreSQL)
+    :param model:
+    :return: the estimate, or None if there is none
+    """
+    connection = connections[router.db_for_read(model)]
+    if connection.vendor != 'postgresql':
+        return None
+
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT reltuples FROM pg_class WHERE oid = %s::regclass', [model._meta.db_table])
+        row = cursor.fetchone()
+    # A table never analyzed has no estimate (-1 since PostgreSQL 14, 0 before)
+    return int(row[0]) if row and row[0] > 0 else None
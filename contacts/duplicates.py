@@ -0,0 +1,220 @@
+import json
+import os
+import re
+import zlib
+from collections import defaultdict, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+from django.conf import settings
+
+from contacts.cache import data_generation
+from contacts.models import Contact, EmailField, PhoneNumber
+from contacts.text import fold
+
+NAME_WEIGHT = 0.5
+DATE_OF_BIRTH_WEIGHT = 0.2
+EMAIL_WEIGHT = 0.15
+PHONE_WEIGHT = 0.15
+NAME_VECTOR_BITS = 512
+PHONE_SUFFIX_LENGTH = 7
+BLOCKS_PER_TASK = 2000
+
+ContactRecord = namedtuple('ContactRecord', 'id name name_vector date_of_birth emails phone_suffixes')
+
+
+def name_vector(name):
+    """
+    Hashed character trigrams of a name packed in an int, so the similarity
+    of two names is computed with a couple of bitwise operations
+    :param name:
+    :return:
+    """
+    padded = ' {} '.format(name)
+    vector = 0
+    for i in range(len(padded) - 2):
+        vector |= 1 << (zlib.crc32(padded[i:i + 3].encode()) % NAME_VECTOR_BITS)
+    return vector
+
+
+def similarity(first, second):
+    """
+    Weighted similarity (between 0 and 1) of two contact records
+    """
+    union = bin(first.name_vector | second.name_vector).count('1')
+    score = NAME_WEIGHT * (bin(first.name_vector & second.name_vector).count('1') / union if union else 0)
+    if first.date_of_birth == second.date_of_birth:
+        score += DATE_OF_BIRTH_WEIGHT
+    if first.emails & second.emails:
+        score += EMAIL_WEIGHT
+    if first.phone_suffixes & second.phone_suffixes:
+        score += PHONE_WEIGHT
+    return score
+
+
+_records = []
+
+
+def _set_records(records):
+    global _records
+    _records = records
+
+
+def score_blocks(blocks, threshold, window):
+    """
+    Compare the records inside each block (given as positions in the loaded
+    records), the blocks larger than the window are sorted by name and each
+    record is only compared to its neighbors
+    :return: list of (first_id, second_id, score) over the threshold
+    """
+    pairs = []
+    for positions in blocks:
+        records = [_records[position] for position in positions]
+        if len(records) > window:
+            records.sort(key=lambda record: record.name)
+        for i, first in enumerate(records):
+            for second in records[i + 1:i + 1 + window]:
+                score = similarity(first, second)
+                if score >= threshold:
+                    pairs.append((min(first.id, second.id), max(first.id, second.id), score))
+    return pairs
+
+
+def load_records():
+    emails = defaultdict(set)
+    for contact_id, email in EmailField.objects.values_list('contact_id', 'email').iterator():
+        emails[contact_id].add(email.casefold())
+
+    phone_suffixes = defaultdict(set)
+    for contact_id, phone in PhoneNumber.objects.values_list('contact_id', 'phone').iterator():
+        digits = re.sub(r'\D', '', phone)
+        if len(digits) >= PHONE_SUFFIX_LENGTH:
+            phone_suffixes[contact_id].add(digits[-PHONE_SUFFIX_LENGTH:])
+
+    contacts = Contact.objects.values_list('id', 'first_name', 'last_name', 'last_name_phonetic', 'date_of_birth')
+    for contact_id, first_name, last_name, last_name_phonetic, date_of_birth in contacts.iterator():
+        name = ' '.join(fold('{} {}'.format(first_name, last_name)).split())
+        record = ContactRecord(contact_id, name, name_vector(name), date_of_birth,
+                               frozenset(emails.pop(contact_id, ())), frozenset(phone_suffixes.pop(contact_id, ())))
+        yield record, last_name_phonetic
+
+
+def blocking_keys(record, last_name_phonetic):
+    """
+    Keys of the blocks of candidates a record belongs to, only records sharing
+    a key are ever compared
+    """
+    yield 'name:{}'.format(record.name)
+    yield 'birth:{}:{}'.format(record.date_of_birth.isoformat(), last_name_phonetic)
+    for email in record.emails:
+        yield 'email-domain:{}:{}'.format(email.rsplit('@', 1)[-1], last_name_phonetic)
+    for phone_suffix in record.phone_suffixes:
+        yield 'phone:{}'.format(phone_suffix)
+
+
+def cluster(pairs):
+    """
+    Group the matching pairs into clusters (connected components)
+    :return: list of clusters, the most likely duplicates first
+    """
+    parents = {}
+
+    def find(contact_id):
+        parents.setdefault(contact_id, contact_id)
+        while parents[contact_id] != contact_id:
+            parents[contact_id] = parents[parents[contact_id]]
+            contact_id = parents[contact_id]
+        return contact_id
+
+    for first_id, second_id in pairs:
+        parents[find(first_id)] = find(second_id)
+
+    clusters = defaultdict(lambda: {'contact_ids': [], 'score': 0})
+    for contact_id in parents:
+        clusters[find(contact_id)]['contact_ids'].append(contact_id)
+    for (first_id, _), score in pairs.items():
+        current = clusters[find(first_id)]
+        current['score'] = max(current['score'], round(score, 4))
+
+    for current in clusters.values():
+        current['contact_ids'].sort()
+    return sorted(clusters.values(), key=lambda current: (-current['score'], -len(current['contact_ids'])))
+
+
+def find_duplicate_clusters(workers=1, threshold=None, window=None):
+    """
+    Find the clusters of probably duplicated contacts
+    :param workers: number of processes scoring the blocks
+    :param threshold: minimum similarity of a duplicated pair
+    :param window: maximum number of neighbors a record is compared to in a block
+    :return:
+    """
+    threshold = settings.CONTACTS_DUPLICATES['THRESHOLD'] if threshold is None else threshold
+    window = settings.CONTACTS_DUPLICATES['WINDOW'] if window is None else window
+
+    records = []
+    blocks = defaultdict(list)
+    for record, last_name_phonetic in load_records():
+        for key in blocking_keys(record, last_name_phonetic):
+            blocks[key].append(len(records))
+        records.append(record)
+    candidate_blocks = [positions for positions in blocks.values() if len(positions) > 1]
+    del blocks
+
+    # The records are handed once to each worker, the tasks only carry positions
+    _set_records(records)
+    tasks = [candidate_blocks[i:i + BLOCKS_PER_TASK] for i in range(0, len(candidate_blocks), BLOCKS_PER_TASK)]
+    try:
+        if workers > 1 and len(tasks) > 1:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_set_records, initargs=(records,)) as executor:
+                results = executor.map(score_blocks, tasks, [threshold] * len(tasks), [window] * len(tasks))
+                scored = [pair for result in results for pair in result]
+        else:
+            scored = [pair for task in tasks for pair in score_blocks(task, threshold, window)]
+    finally:
+        _set_records([])
+
+    pairs = {}
+    for first_id, second_id, score in scored:
+        pairs[first_id, second_id] = max(score, pairs.get((first_id, second_id), 0))
+    return cluster(pairs)
+
+
+def report_path():
+    return os.path.join(settings.CONTACTS_DATA_DIR, 'duplicates.json')
+
+
+def write_report(clusters, generation):
+    os.makedirs(settings.CONTACTS_DATA_DIR, exist_ok=True)
+    report = {
+        'generated_at': datetime.now(timezone.utc).isoformat(),
+        'generation': generation,
+        'clusters': clusters,
+    }
+    temporary_path = '{}.tmp'.format(report_path())
+    with open(temporary_path, 'w') as report_file:
+        json.dump(report, report_file)
+    os.replace(temporary_path, report_path())
+    return report
+
+
+def read_report():
+    """
+    Last written duplicates report, or None if there is none
+    """
+    try:
+        with open(report_path()) as report_file:
+            report = json.load(report_file)
+    except FileNotFoundError:
+        return None
+
+    report['stale'] = report['generation'] != data_generation()
+    return report
+
+
+def build_report(workers=1, threshold=None, window=None):
+    """
+    Find the duplicated contacts and store the result as the current report
+    """
+    generation = data_generation()
+    return write_report(find_duplicate_clusters(workers, threshold, window), generation)
@@ -0,0 +1,183 @@
+import logging
+import random
+import re
+import time
+from collections import deque
+from contextlib import ExitStack, contextmanager
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger('contacts.slow_queries')
+
+EXPLAINED_STATEMENTS = ('SELECT', 'WITH', 'UPDATE', 'DELETE')
+# Scans in the plans of SQLite ("SCAN t", "SCAN TABLE t", "SCAN t USING INDEX i") and PostgreSQL ("Seq Scan on t")
+FULL_SCAN_PATTERNS = (
+    re.compile(r'^SCAN (?:TABLE )?"?(\w+)"?'),
+    re.compile(r'\bSeq Scan on "?(\w+)"?'),
+)
+# Tables aliased by Django in the subqueries ("contacts_emailfield" U0), SQLite only names the alias in the plans
+TABLE_ALIAS_RE = re.compile(r'"(\w+)" ([A-Z]\d+)\b')
+
+_recent_slow_queries = deque(maxlen=settings.CONTACTS_SLOW_QUERIES['RECENT'])
+
+
+class QueryRecorder:
+    """
+    Database execute wrapper recording the SQL statements it runs, with
+    their parameters and duration
+    """
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started_at = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                'sql': sql,
+                # Only the number of parameter sets of an `executemany`
+                'params': len(params) if many else [str(param) for param in params or ()],
+                'many': many,
+                'duration_ms': round((time.perf_counter() - started_at) * 1000, 3),
+            })
+
+
+@contextmanager
+def record_queries():
+    """
+    Record the queries run on every database connection of the current thread
+    :return: the QueryRecorder
+    """
+    recorder = QueryRecorder()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        yield recorder
+
+
+def explain(connection, sql, params):
+    """
+    Query plan of a statement, as given by the database
+    :param connection:
+    :param sql:
+    :param params:
+    :return: list of the lines of the plan, or None if the statement cannot be explained
+    """
+    if not sql.lstrip().upper().startswith(EXPLAINED_STATEMENTS):
+        return None
+
+    with connection.cursor() as cursor:
+        cursor.execute('{} {}'.format(connection.ops.explain_query_prefix(), sql), params)
+        rows = cursor.fetchall()
+    # SQLite gives (id, parent, notused, detail) rows, the other databases a line per row
+    if connection.vendor == 'sqlite':
+        return [row[-1] for row in rows]
+    return [' '.join(map(str, row)) for row in rows]
+
+
+def contacts_tables():
+    return {model._meta.db_table for model in apps.get_app_config('contacts').get_models()}
+
+
+def full_scans(plan, sql=''):
+    """
+    Tables of the contacts app read with a full scan in a query plan (of the
+    table, or of a whole index of the table)
+    :param plan: lines of the plan
+    :param sql: the explained statement, to tell the tables of its aliases
+    :return: sorted list of the scanned tables
+    """
+    tables = contacts_tables()
+    aliases = {alias: table for table, alias in TABLE_ALIAS_RE.findall(sql)}
+    scanned = set()
+    for line in plan or ():
+        for pattern in FULL_SCAN_PATTERNS:
+            match = pattern.search(line.strip())
+            table = match and aliases.get(match.group(1), match.group(1))
+            if table in tables:
+                scanned.add(table)
+    return sorted(scanned)
+
+
+class SlowQueryLog:
+    """
+    Database execute wrapper logging the statements slower than the
+    `THRESHOLD_MS` setting, with their parameters, call site and query plan.
+
+    Only a `SAMPLE_RATE` fraction of the slow statements is explained and
+    logged, the plans with full scans of the contacts tables are logged as
+    warnings
+    """
+
+    def __init__(self, call_site):
+        """
+        :param call_site: callable returning the name of the code running the queries (e.g. the view)
+        """
+        self.call_site = call_site
+        self.threshold = settings.CONTACTS_SLOW_QUERIES['THRESHOLD_MS'] / 1000
+        self.sample_rate = settings.CONTACTS_SLOW_QUERIES['SAMPLE_RATE']
+        self._explaining = False
+
+    def __call__(self, execute, sql, params, many, context):
+        if self._explaining:
+            return execute(sql, params, many, context)
+
+        started_at = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started_at
+            if duration >= self.threshold and random.random() < self.sample_rate:
+                self.log(context['connection'], sql, params[0] if many and params else params, duration)
+
+    def log(self, connection, sql, params, duration):
+        self._explaining = True
+        try:
+            plan = explain(connection, sql, params)
+        except Exception as exception:
+            plan = ['Unavailable plan: {}'.format(exception)]
+        finally:
+            self._explaining = False
+
+        slow_query = {
+            'call_site': self.call_site(),
+            'duration_ms': round(duration * 1000, 3),
+            'sql': sql,
+            'params': [str(param) for param in params or ()],
+            'plan': plan,
+            'full_scans': full_scans(plan, sql),
+        }
+        _recent_slow_queries.append(slow_query)
+
+        level = logging.WARNING if slow_query['full_scans'] else logging.INFO
+        logger.log(
+            level, 'Slow query (%.1f ms) in %s%s: %s; params=%s; plan=%s',
+            slow_query['duration_ms'], slow_query['call_site'],
+            ' [FULL SCAN of {}]'.format(', '.join(slow_query['full_scans'])) if slow_query['full_scans'] else '',
+            sql, slow_query['params'], ' / '.join(plan or ()),
+            extra={'slow_query': slow_query},
+        )
+
+
+def recent_slow_queries():
+    """
+    Last slow queries logged by the current process, the latest first
+    """
+    return list(reversed(_recent_slow_queries))
+
+
+@contextmanager
+def log_slow_queries(call_site):
+    """
+    Log the slow queries run on every database connection of the current thread
+    :param call_site: callable returning the name of the code running the queries
+    """
+    slow_query_log = SlowQueryLog(call_site)
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(slow_query_log))
+        yield slow_query_log
@@ -0,0 +1,259 @@
+import json
+import os
+import socket
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from contacts.duplicates import build_report
+from contacts.models import Contact, Job
+from contacts.processes import is_process_alive
+from contacts.serializers import DuplicatesJobSerializer, JobArgumentsSerializer
+from contacts.signals import contacts_bulk_changed
+from contacts.snapshots import build_snapshot
+
+BATCH_SIZE = 1000
+MAX_ERROR_LENGTH = 10000
+
+_handlers = {}
+_arguments_serializers = {}
+
+
+def job_handler(kind, arguments_serializer=JobArgumentsSerializer):
+    """
+    Register a function as the handler of a kind of jobs, it is called with
+    a `progress` callable and the arguments of the job and returns its
+    (JSON-serializable) result
+    :param kind:
+    :param arguments_serializer: serializer validating the arguments of the jobs queued through the API
+    """
+    def register(function):
+        _handlers[kind] = function
+        _arguments_serializers[kind] = arguments_serializer
+        return function
+    return register
+
+
+def job_kinds():
+    return sorted(_handlers)
+
+
+def job_arguments_serializer(kind):
+    return _arguments_serializers.get(kind, JobArgumentsSerializer)
+
+
+def enqueue(kind, arguments=None):
+    """
+    Add a job to the queue, a queued job of the same kind and arguments is
+    reused instead of adding another one
+    :param kind:
+    :param arguments: dict of the keyword arguments of the handler
+    :return: the job
+    """
+    if kind not in _handlers:
+        raise ValueError('Unknown job kind: {}'.format(kind))
+
+    encoded_arguments = json.dumps(arguments or {}, sort_keys=True)
+    job = Job.objects.filter(kind=kind, arguments=encoded_arguments, status=Job.QUEUED).order_by('id').first()
+    if job is None:
+        job = Job.objects.create(kind=kind, arguments=encoded_arguments)
+    return job
+
+
+def enqueue_periodic_jobs():
+    """
+    Queue the periodic jobs (`CONTACTS_JOBS['PERIODIC']`) not queued during
+    their last interval, by the workers of any host
+    :return: the queued jobs
+    """
+    now = timezone.now()
+    return [
+        enqueue(kind) for kind, interval in settings.CONTACTS_JOBS['PERIODIC'].items()
+        if not Job.objects.filter(kind=kind, created_at__gt=now - timedelta(seconds=interval)).exists()
+    ]
+
+
+def worker_name():
+    return '{}:{}'.format(socket.gethostname(), os.getpid())
+
+
+def claim_job(worker):
+    """
+    Take the oldest queued job, the conditional update makes sure a job is
+    claimed by a single worker without locking the table
+    :return: the claimed job, or None if the queue is empty
+    """
+    while True:
+        job_id = Job.objects.filter(status=Job.QUEUED).order_by('id').values_list('id', flat=True).first()
+        if job_id is None:
+            return None
+
+        claimed = Job.objects.filter(pk=job_id, status=Job.QUEUED).update(
+            status=Job.RUNNING, worker=worker, started_at=timezone.now()
+        )
+        if claimed:
+            return Job.objects.get(pk=job_id)
+
+
+class Progress:
+    """
+    Progress reporter of a running job, the updates are written at most once
+    per `PROGRESS_INTERVAL` seconds
+    """
+
+    def __init__(self, job_id, interval=None):
+        self.job_id = job_id
+        self.interval = settings.CONTACTS_JOBS['PROGRESS_INTERVAL'] if interval is None else interval
+        self._last_update = None
+
+    def __call__(self, done, total):
+        now = time.monotonic()
+        if not total or (self._last_update is not None and now - self._last_update < self.interval):
+            return
+        self._last_update = now
+        Job.objects.filter(pk=self.job_id).update(progress=min(done / total, 1))
+
+
+def run_job(job):
+    """
+    Run a claimed job and store its result (or error)
+    :return: the finished job
+    """
+    handler = _handlers.get(job.kind)
+    try:
+        if handler is None:
+            raise ValueError('Unknown job kind: {}'.format(job.kind))
+        result = handler(Progress(job.pk), **json.loads(job.arguments))
+    except Exception:
+        job.status, job.error = Job.FAILED, traceback.format_exc()[-MAX_ERROR_LENGTH:]
+    else:
+        job.status, job.result, job.progress = Job.SUCCEEDED, json.dumps(result), 1
+
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'result', 'error', 'progress', 'finished_at'])
+    return job
+
+
+def work(worker=None, poll_interval=None, burst=False, should_stop=lambda: False):
+    """
+    Run the queued jobs one after the other
+    :param worker: name of the worker claiming the jobs
+    :param poll_interval: seconds to wait before looking again at an empty queue
+    :param burst: return as soon as the queue is empty
+    :param should_stop: callable telling when to stop (checked between jobs)
+    :return: the number of jobs run
+    """
+    worker = worker or worker_name()
+    poll_interval = settings.CONTACTS_JOBS['POLL_INTERVAL'] if poll_interval is None else poll_interval
+    count = 0
+    while not should_stop():
+        job = claim_job(worker)
+        if job is not None:
+            run_job(job)
+            count += 1
+        elif burst:
+            break
+        else:
+            time.sleep(poll_interval)
+    return count
+
+
+def requeue_orphaned_jobs():
+    """
+    Put back in the queue the jobs left running by the dead workers of this host
+    :return: the number of requeued jobs
+    """
+    prefix = '{}:'.format(socket.gethostname())
+    orphaned = [
+        job_id for job_id, worker in
+        Job.objects.filter(status=Job.RUNNING, worker__startswith=prefix).values_list('id', 'worker')
+        if worker[len(prefix):].isdigit() and not is_process_alive(int(worker[len(prefix):]))
+    ]
+    return Job.objects.filter(pk__in=orphaned, status=Job.RUNNING).update(
+        status=Job.QUEUED, worker='', started_at=None, progress=0
+    )
+
+
+def purge_finished_jobs():
+    """
+    Remove the jobs finished more than `RETENTION_DAYS` ago
+    :return: the number of removed jobs
+    """
+    finished_before = timezone.now() - timedelta(days=settings.CONTACTS_JOBS['RETENTION_DAYS'])
+    removed, _ = Job.objects.filter(finished_at__lt=finished_before).delete()
+    return removed
+
+
+@job_handler('find_duplicates', DuplicatesJobSerializer)
+def find_duplicates_job(progress, threshold=None, window=None):
+    report = build_report(1, threshold, window)
+    return {'generated_at': report['generated_at'], 'clusters': len(report['clusters'])}
+
+
+@job_handler('build_snapshot')
+def build_snapshot_job(progress):
+    manifest = build_snapshot(progress)
+    return {key: manifest[key] for key in ('etag', 'size', 'generation', 'created_at')}
+
+
+@job_handler('rebuild_search_keys')
+def rebuild_search_keys_job(progress):
+    """
+    Compute again the derived search keys of all contacts (e.g. after the
+    key functions changed)
+    """
+    fields = list(Contact.search_keys('', ''))
+    # The deleted contacts too, they can be restored
+    total = Contact.all_objects.count()
+    done = updated = last_pk = 0
+    while True:
+        contacts = list(Contact.all_objects.filter(pk__gt=last_pk).order_by('pk').only(
+            'first_name', 'last_name', *fields
+        )[:BATCH_SIZE])
+        if not contacts:
+            break
+
+        # Only the contacts whose keys changed are written
+        changed = []
+        for contact in contacts:
+            keys = Contact.search_keys(contact.first_name, contact.last_name)
+            if any(getattr(contact, field) != value for field, value in keys.items()):
+                for field, value in keys.items():
+                    setattr(contact, field, value)
+                changed.append(contact)
+        Contact.all_objects.bulk_update(changed, fields)
+        done += len(contacts)
+        updated += len(changed)
+        last_pk = contacts[-1].pk
+        progress(done, total)
+
+    contacts_bulk_changed()
+    return {'contacts': done, 'updated': updated}
+
+
+@job_handler('purge_deleted_contacts')
+def purge_deleted_contacts_job(progress):
+    """
+    Remove the contacts deleted before the retention window, with their
+    phones, emails and addresses: each batch is removed in its own short
+    transaction, by a set-based DELETE per table (no rows are loaded)
+    """
+    batch_size = settings.CONTACTS_DELETION['PURGE_BATCH_SIZE']
+    expired = Contact.all_objects.filter(deleted_at__lt=Contact.retention_start())
+    total = expired.count()
+    purged = 0
+    while True:
+        with transaction.atomic():
+            # Locked, so that a contact cannot be restored while its rows are removed
+            contact_ids = list(expired.select_for_update().values_list('pk', flat=True)[:batch_size])
+            if not contact_ids:
+                break
+            Contact.purge(contact_ids)
+        purged += len(contact_ids)
+        progress(purged, total)
+
+    return {'contacts': purged}
@@ -0,0 +1,25 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONOpenAPIRenderer
+from rest_framework.schemas.openapi import SchemaGenerator
+
+
+class Command(BaseCommand):
+    help = 'Build the OpenAPI schema of the API, served by the docs (run it when building a release)'
+
+    def handle(self, *args, **options):
+        schema = SchemaGenerator(title='Contact Manager API').get_schema(request=None, public=True)
+        schema['paths'] = {
+            path: item for path, item in schema['paths'].items() if path.startswith(settings.API_PATH_PREFIX)
+        }
+
+        os.makedirs(os.path.dirname(settings.OPENAPI_SCHEMA_FILE), exist_ok=True)
+        temporary_path = '{}.tmp'.format(settings.OPENAPI_SCHEMA_FILE)
+        with open(temporary_path, 'wb') as schema_file:
+            schema_file.write(JSONOpenAPIRenderer().render(schema))
+        os.replace(temporary_path, settings.OPENAPI_SCHEMA_FILE)
+
+        summary = 'Wrote the schema of {} paths to {}'.format(len(schema['paths']), settings.OPENAPI_SCHEMA_FILE)
+        self.stdout.write(self.style.SUCCESS(summary))
@@ -0,0 +1,24 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from contacts.duplicates import build_report
+
+
+class Command(BaseCommand):
+    help = 'Find the clusters of probably duplicated contacts and store them as the duplicates report'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Number of processes scoring the candidate blocks')
+        parser.add_argument('--threshold', type=float, help='Minimum similarity (0 to 1) of a duplicated pair')
+        parser.add_argument('--window', type=int,
+                            help='Maximum number of neighbors a contact is compared to inside a block')
+
+    def handle(self, *args, **options):
+        report = build_report(options['workers'], options['threshold'], options['window'])
+
+        for cluster in report['clusters']:
+            self.stdout.write('{:.2f} {}'.format(cluster['score'], ', '.join(map(str, cluster['contact_ids']))))
+        summary = 'Found {} clusters of duplicated contacts'.format(len(report['clusters']))
+        self.stdout.write(self.style.SUCCESS(summary))
@@ -0,0 +1,86 @@
+import multiprocessing
+import signal
+import threading
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from contacts.jobs import enqueue_periodic_jobs, purge_finished_jobs, requeue_orphaned_jobs, work
+
+# Seconds between the checks of the periodic jobs
+PERIODIC_JOBS_CHECK_INTERVAL = 60
+
+
+def run_worker(poll_interval, burst):
+    """
+    Entry point of a worker process, which finishes its current job when it
+    is asked to stop
+    """
+    django.setup()
+    stopping = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *args: stopping.set())
+    signal.signal(signal.SIGINT, lambda *args: stopping.set())
+    try:
+        work(poll_interval=poll_interval, burst=burst, should_stop=stopping.is_set)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Run the queued background jobs (duplicates reports, export snapshots, index rebuilds, purges of the ' \
+           'deleted contacts) in worker processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=settings.CONTACTS_JOBS['CONCURRENCY'],
+                            help='Number of worker processes')
+        parser.add_argument('--poll-interval', type=float, default=settings.CONTACTS_JOBS['POLL_INTERVAL'],
+                            help='Seconds to wait before looking again at an empty queue')
+        parser.add_argument('--burst', action='store_true', help='Exit once the queue is empty')
+
+    def handle(self, *args, **options):
+        requeued = requeue_orphaned_jobs()
+        purged = purge_finished_jobs()
+        self.stdout.write('Requeued {} orphaned jobs, removed {} old jobs'.format(requeued, purged))
+        enqueue_periodic_jobs()
+
+        # The workers open their own connections
+        connections.close_all()
+        workers = [
+            multiprocessing.Process(target=run_worker, args=(options['poll_interval'], options['burst']))
+            for _ in range(max(options['concurrency'], 1))
+        ]
+        for worker in workers:
+            worker.start()
+        self.stdout.write('Started {} workers'.format(len(workers)))
+
+        def stop(*args):
+            for worker in workers:
+                if worker.is_alive():
+                    worker.terminate()
+
+        signal.signal(signal.SIGTERM, stop)
+        try:
+            self.wait(workers, queue_periodic_jobs=not options['burst'])
+        except KeyboardInterrupt:
+            # The workers got the SIGINT too, they stop after their current job
+            for worker in workers:
+                worker.join()
+
+        self.stdout.write(self.style.SUCCESS('Workers stopped'))
+
+    @staticmethod
+    def wait(workers, queue_periodic_jobs):
+        """
+        Wait for the workers to stop, queueing the periodic jobs when they are due
+        """
+        while True:
+            alive = [worker for worker in workers if worker.is_alive()]
+            if not alive:
+                return
+            alive[0].join(PERIODIC_JOBS_CHECK_INTERVAL)
+            if queue_periodic_jobs:
+                enqueue_periodic_jobs()
+                # Not kept open between the checks
+                connections.close_all()
@@ -0,0 +1,33 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from contacts.seeding import seed_contacts
+
+
+class Command(BaseCommand):
+    help = 'Add generated contacts, with phone numbers, emails and addresses, for load and scale testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=10000, help='Number of contacts to add')
+        parser.add_argument('--seed', type=int, default=0, help='Seed of the generated data')
+        parser.add_argument('--batch-size', type=int, default=10000,
+                            help='Number of contacts generated and inserted at a time')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Number of processes generating the contacts')
+
+    def handle(self, *args, **options):
+        started_at = time.monotonic()
+
+        def progress(inserted_contacts):
+            if options['verbosity'] > 1:
+                self.stdout.write('{} contacts'.format(inserted_contacts))
+
+        inserted = seed_contacts(options['count'], options['seed'], options['batch_size'], options['workers'], progress)
+
+        elapsed = time.monotonic() - started_at
+        summary = 'Added {} contacts, {} phone numbers, {} emails and {} addresses in {:.1f}s ({:.0f} contacts/s)'
+        self.stdout.write(self.style.SUCCESS(summary.format(
+            *inserted.values(), elapsed, list(inserted.values())[0] / elapsed if elapsed else 0
+        )))
@@ -0,0 +1,352 @@
+import fcntl
+import json
+import mmap
+import os
+import struct
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+
+from contacts.processes import is_process_alive
+
+HEADER_SIZE = 8
+INITIAL_FILE_SIZE = 1 << 16
+# File of the counters and histograms merged from the exited processes
+EXITED_FILE = 'exited.db'
+
+
+def metrics_dir():
+    return os.path.join(settings.CONTACTS_DATA_DIR, 'metrics')
+
+
+class MmapValues:
+    """
+    Float values keyed by strings, stored in a memory-mapped file written by
+    a single process and read by any other.
+
+    The file starts with the number of used bytes, followed by the entries
+    (key length, key padded to 8 bytes and value), a new entry is written
+    before the used bytes are updated so the readers never see it partially
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, 'a+b')
+        if os.fstat(self._file.fileno()).st_size == 0:
+            self._file.truncate(INITIAL_FILE_SIZE)
+        self._capacity = os.fstat(self._file.fileno()).st_size
+        self._mmap = mmap.mmap(self._file.fileno(), self._capacity)
+        self._used = struct.unpack_from('<i', self._mmap, 0)[0] or HEADER_SIZE
+        self._offsets = {key: offset for key, _, offset in self._entries(self._mmap, self._used)}
+
+    @staticmethod
+    def _entries(data, used):
+        position = HEADER_SIZE
+        while position < used:
+            key_length = struct.unpack_from('<i', data, position)[0]
+            key_end = position + 4 + key_length
+            value_offset = key_end + (-(4 + key_length) % 8)
+            value = struct.unpack_from('<d', data, value_offset)[0]
+            yield bytes(data[position + 4:key_end]).decode(), value, value_offset
+            position = value_offset + 8
+
+    @classmethod
+    def read(cls, path):
+        """
+        Current values of a file
+        :return: list of (key, value)
+        """
+        with open(path, 'rb') as values_file:
+            data = values_file.read()
+        if len(data) < HEADER_SIZE:
+            return []
+        return [(key, value) for key, value, _ in cls._entries(data, struct.unpack_from('<i', data, 0)[0])]
+
+    def _offset(self, key):
+        offset = self._offsets.get(key)
+        if offset is not None:
+            return offset
+
+        encoded = key.encode()
+        padding = -(4 + len(encoded)) % 8
+        entry = struct.pack('<i{}s{}xd'.format(len(encoded), padding), len(encoded), encoded, 0.0)
+        while self._used + len(entry) > self._capacity:
+            self._capacity *= 2
+            self._file.truncate(self._capacity)
+            self._mmap.close()
+            self._mmap = mmap.mmap(self._file.fileno(), self._capacity)
+
+        self._mmap[self._used:self._used + len(entry)] = entry
+        offset = self._used + len(entry) - 8
+        self._used += len(entry)
+        struct.pack_into('<i', self._mmap, 0, self._used)
+        self._offsets[key] = offset
+        return offset
+
+    def inc(self, key, amount=1):
+        with self._lock:
+            offset = self._offset(key)
+            struct.pack_into('<d', self._mmap, offset, struct.unpack_from('<d', self._mmap, offset)[0] + amount)
+
+    def set(self, key, value):
+        with self._lock:
+            struct.pack_into('<d', self._mmap, self._offset(key), value)
+
+    def close(self):
+        with self._lock:
+            self._mmap.close()
+            self._file.close()
+
+
+_store = None
+_store_owner = None
+_store_lock = threading.Lock()
+
+
+def store():
+    """
+    Values file of the current process (reopened after a fork)
+    """
+    current = (os.getpid(), settings.CONTACTS_DATA_DIR)
+    if _store is None or _store_owner != current:
+        with _store_lock:
+            if _store is None or _store_owner != current:
+                _open_store(current)
+    return _store
+
+
+def _open_store(owner):
+    global _store, _store_owner
+    os.makedirs(metrics_dir(), exist_ok=True)
+    # Each new process folds the files of the exited ones, so they do not pile up
+    compact()
+    _store = MmapValues(os.path.join(metrics_dir(), '{}.db'.format(os.getpid())))
+    _store_owner = owner
+
+
+_metrics = {}
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name, documentation, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self._keys = {}
+        _metrics[name] = self
+
+    def key(self, labels, suffix='', label_names=None):
+        label_names = self.label_names if label_names is None else label_names
+        label_values = tuple(str(labels[name]) for name in label_names)
+        # The keys are encoded once per series, not on every update
+        key = self._keys.get((suffix, label_values))
+        if key is None:
+            key = json.dumps([self.name, suffix, [list(label) for label in zip(label_names, label_values)]])
+            self._keys[suffix, label_values] = key
+        return key
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        store().inc(self.key(labels), amount)
+
+
+class Gauge(Metric):
+    """
+    Gauge of the current process, the values of the live processes are summed
+    """
+    type = 'gauge'
+
+    def inc(self, amount=1, **labels):
+        store().inc(self.key(labels), amount)
+
+    def dec(self, amount=1, **labels):
+        store().inc(self.key(labels), -amount)
+
+    def set(self, value, **labels):
+        store().set(self.key(labels), value)
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name, documentation, label_names=(), buckets=()):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        values = store()
+        bucket = next((bucket for bucket in self.buckets if value <= bucket), '+Inf')
+        values.inc(self.key(dict(labels, le=bucket), '_bucket'))
+        values.inc(self.key(labels, '_sum'), value)
+        values.inc(self.key(labels, '_count'))
+
+    def key(self, labels, suffix='', label_names=None):
+        if suffix == '_bucket':
+            label_names = (*self.label_names, 'le')
+        return super().key(labels, suffix, label_names)
+
+
+REQUESTS = Counter('contacts_http_requests_total', 'Requests served', ('route', 'method', 'status'))
+REQUEST_DURATION = Histogram(
+    'contacts_http_request_duration_seconds', 'Latency of the requests', ('route', 'method'),
+    settings.CONTACTS_METRICS['LATENCY_BUCKETS']
+)
+REQUESTS_IN_FLIGHT = Gauge('contacts_http_requests_in_flight', 'Requests being served')
+QUERIES = Counter('contacts_db_queries_total', 'SQL queries run by the requests', ('route',))
+QUERIES_DURATION = Counter('contacts_db_queries_seconds_total', 'Time spent running SQL queries', ('route',))
+CACHE_LOOKUPS = Counter('contacts_cache_lookups_total', 'Cache lookups', ('cache', 'result'))
+ADMISSION_IN_FLIGHT = Gauge('contacts_admission_in_flight', 'Requests admitted and being served', ('route_class',))
+ADMISSION_SHED = Counter('contacts_admission_shed_total', 'Requests shed by the admission control', ('route_class',))
+
+
+def _lock_files(operation):
+    lock_file = open(os.path.join(metrics_dir(), 'files.lock'), 'wb')
+    fcntl.flock(lock_file, operation)
+    return lock_file
+
+
+def _process_files():
+    """
+    Values files of the processes
+    :return: list of (path, pid)
+    """
+    return [
+        (os.path.join(metrics_dir(), file_name), int(file_name[:-3]))
+        for file_name in os.listdir(metrics_dir()) if file_name.endswith('.db') and file_name[:-3].isdigit()
+    ]
+
+
+def compact():
+    """
+    Merge the counters and histograms of the exited processes into a single
+    file and remove their files (their gauges are dropped)
+    :return: number of removed files
+    """
+    with _lock_files(fcntl.LOCK_EX):
+        exited = [path for path, pid in _process_files() if not is_process_alive(pid)]
+        if not exited:
+            return 0
+
+        merged = MmapValues(os.path.join(metrics_dir(), EXITED_FILE))
+        try:
+            for path in exited:
+                for key, value in MmapValues.read(path):
+                    metric = _metrics.get(json.loads(key)[0])
+                    if metric is not None and metric.type != 'gauge':
+                        merged.inc(key, value)
+                os.remove(path)
+        finally:
+            merged.close()
+        return len(exited)
+
+
+def collect():
+    """
+    Aggregate the values written by every process: the counters and
+    histograms of all of them (including the exited ones) and the gauges of
+    the live ones
+    :return: dict of the samples of each metric, by (suffix, labels)
+    """
+    samples = defaultdict(lambda: defaultdict(float))
+    if not os.path.isdir(metrics_dir()):
+        return samples
+
+    # No file is merged while they are read, so no value is counted twice
+    with _lock_files(fcntl.LOCK_SH):
+        files = [(path, is_process_alive(pid)) for path, pid in _process_files()]
+        if os.path.exists(os.path.join(metrics_dir(), EXITED_FILE)):
+            files.append((os.path.join(metrics_dir(), EXITED_FILE), False))
+
+        for path, alive in files:
+            for key, value in MmapValues.read(path):
+                name, suffix, labels = json.loads(key)
+                metric = _metrics.get(name)
+                if metric is None or (metric.type == 'gauge' and not alive):
+                    continue
+                samples[name][suffix, tuple(map(tuple, labels))] += value
+    return samples
+
+
+def cache_hit_ratios(samples):
+    lookups = defaultdict(dict)
+    for (_, labels), value in samples[CACHE_LOOKUPS.name].items():
+        labels = dict(labels)
+        lookups[labels['cache']][labels['result']] = value
+    return {
+        cache: results.get('hit', 0) / sum(results.values())
+        for cache, results in lookups.items() if sum(results.values())
+    }
+
+
+def _escape(value):
+    return value.replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _format_sample(name, labels, value):
+    if labels:
+        name = '{}{{{}}}'.format(name, ','.join('{}="{}"'.format(label, _escape(v)) for label, v in labels))
+    return '{} {}'.format(name, repr(float(value)) if value != int(value) else int(value))
+
+
+def _format_bucket(le):
+    return '+Inf' if le == '+Inf' else repr(float(le))
+
+
+def render():
+    """
+    Metrics of all the processes in the Prometheus text format
+    """
+    samples = collect()
+    lines = []
+    for metric in _metrics.values():
+        lines.append('# HELP {} {}'.format(metric.name, metric.documentation))
+        lines.append('# TYPE {} {}'.format(metric.name, metric.type))
+        metric_samples = samples.get(metric.name, {})
+
+        if metric.type != 'histogram':
+            for (_, labels), value in sorted(metric_samples.items()):
+                lines.append(_format_sample(metric.name, labels, value))
+            continue
+
+        # The buckets are stored by themselves, and exposed cumulatively
+        series = defaultdict(lambda: {'buckets': defaultdict(float), '_sum': 0, '_count': 0})
+        for (suffix, labels), value in metric_samples.items():
+            if suffix == '_bucket':
+                series[labels[:-1]]['buckets'][labels[-1][1]] += value
+            else:
+                series[labels][suffix] = value
+        for labels, values in sorted(series.items()):
+            cumulative = 0
+            for le in (*map(str, metric.buckets), '+Inf'):
+                cumulative += values['buckets'].get(le, 0)
+                lines.append(_format_sample(metric.name + '_bucket', (*labels, ('le', _format_bucket(le))), cumulative))
+            lines.append(_format_sample(metric.name + '_sum', labels, values['_sum']))
+            lines.append(_format_sample(metric.name + '_count', labels, values['_count']))
+
+    lines.append('# HELP contacts_cache_hit_ratio Ratio of the cache lookups that were hits')
+    lines.append('# TYPE contacts_cache_hit_ratio gauge')
+    for cache, ratio in sorted(cache_hit_ratios(samples).items()):
+        lines.append(_format_sample('contacts_cache_hit_ratio', (('cache', cache),), ratio))
+    return '\n'.join(lines) + '\n'
+
+
+def clear():
+    """
+    Remove the values of all the processes (e.g. when the server starts)
+    """
+    global _store
+    with _store_lock:
+        if _store is not None:
+            _store.close()
+            _store = None
+    if os.path.isdir(metrics_dir()):
+        for file_name in os.listdir(metrics_dir()):
+            if file_name.endswith('.db'):
+                os.remove(os.path.join(metrics_dir(), file_name))
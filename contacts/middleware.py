@@ -0,0 +1,277 @@
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+from contextlib import ExitStack
+from datetime import datetime, timezone
+from importlib import import_module
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth.models import AnonymousUser
+from django.db import connections
+from django.http import JsonResponse
+from django.urls import Resolver404, resolve
+
+from contacts import metrics
+from contacts.instrumentation import log_slow_queries, record_queries
+
+DEFAULT_ROUTE_CLASS = 'normal'
+
+_gates = {}
+
+
+class AdmissionGate:
+    """
+    Bounds the number of concurrent requests of a route class, the requests
+    over the limit wait in a bounded queue until a slot is released or their
+    deadline expires
+    """
+
+    def __init__(self, name, concurrency, queue_size, timeout):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.in_flight = 0
+        self.queued = 0
+        self.admitted = 0
+        self.shed = 0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        """
+        Take a slot, waiting in the queue if needed
+        :return: False if the request must be shed
+        """
+        with self._condition:
+            if self.in_flight >= self.concurrency:
+                if self.queued >= self.queue_size:
+                    self.shed += 1
+                    metrics.ADMISSION_SHED.inc(route_class=self.name)
+                    return False
+
+                self.queued += 1
+                try:
+                    available = self._condition.wait_for(lambda: self.in_flight < self.concurrency, self.timeout)
+                finally:
+                    self.queued -= 1
+
+                if not available:
+                    self.shed += 1
+                    metrics.ADMISSION_SHED.inc(route_class=self.name)
+                    return False
+
+            self.in_flight += 1
+            self.admitted += 1
+            metrics.ADMISSION_IN_FLIGHT.inc(route_class=self.name)
+            return True
+
+    def release(self):
+        with self._condition:
+            self.in_flight -= 1
+            metrics.ADMISSION_IN_FLIGHT.dec(route_class=self.name)
+            self._condition.notify()
+
+    def stats(self):
+        with self._condition:
+            return {
+                'concurrency': self.concurrency,
+                'queue_size': self.queue_size,
+                'in_flight': self.in_flight,
+                'queued': self.queued,
+                'admitted': self.admitted,
+                'shed': self.shed,
+            }
+
+
+def admission_stats():
+    """
+    Snapshot of the admission gates of the current process
+    """
+    return {name: gate.stats() for name, gate in _gates.items()}
+
+
+class AdmissionControlMiddleware:
+    """
+    Caps the in-flight requests per route class (e.g. search, bulk and normal)
+    and sheds the excess with a fast 503 response
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+        config = settings.ADMISSION_CONTROL
+        self.route_classes = config.get('ROUTE_CLASSES', {})
+        self.retry_after = config.get('RETRY_AFTER', 1)
+        # The handlers of a process (see contactmanager.handlers) share the gates of the same limits
+        self.gates = {}
+        for name, limits in config['LIMITS'].items():
+            limits = (limits['CONCURRENCY'], limits['QUEUE_SIZE'], limits['TIMEOUT'])
+            gate = _gates.get(name)
+            if gate is None or (gate.concurrency, gate.queue_size, gate.timeout) != limits:
+                gate = AdmissionGate(name, *limits)
+            self.gates[name] = gate
+        _gates.clear()
+        _gates.update(self.gates)
+
+    def __call__(self, request):
+        gate = self.gates[self.route_class(request)]
+        if not gate.acquire():
+            return self.overloaded()
+
+        try:
+            return self.get_response(request)
+        finally:
+            gate.release()
+
+    def route_class(self, request):
+        try:
+            url_name = resolve(request.path_info).url_name
+        except Resolver404:
+            return DEFAULT_ROUTE_CLASS
+        return self.route_classes.get(url_name, DEFAULT_ROUTE_CLASS)
+
+    def overloaded(self):
+        response = JsonResponse({'detail': 'Service temporarily overloaded, try again later.'}, status=503)
+        response['Retry-After'] = str(self.retry_after)
+        return response
+
+
+def profiles_dir():
+    return os.path.join(settings.CONTACTS_DATA_DIR, 'profiles')
+
+
+class ProfilingMiddleware:
+    """
+    Runs the requests of staff users asking for it (with the `_profile=1`
+    parameter or the `X-Profile: 1` header) under cProfile, and replaces
+    their response with a report of the profile and the SQL queries issued.
+
+    The profile is also stored (`pstats` format) in the profiles directory,
+    other requests only pay for the trigger check
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+        config = settings.CONTACTS_PROFILING
+        self.query_parameter = config['QUERY_PARAMETER']
+        self.header = 'HTTP_{}'.format(config['HEADER'].upper().replace('-', '_'))
+        self.top_functions = config['TOP_FUNCTIONS']
+
+    def __call__(self, request):
+        if request.META.get(self.header) != '1' and request.GET.get(self.query_parameter) != '1':
+            return self.get_response(request)
+        # The user (and its session) is only loaded for the requests asking for a profile
+        if not self.get_user(request).is_staff:
+            return self.get_response(request)
+
+        return self.profile(request)
+
+    @staticmethod
+    def get_user(request):
+        if hasattr(request, 'user'):
+            return request.user
+
+        # Without the session and authentication middleware (e.g. the API handler), they are loaded here
+        if not apps.is_installed('django.contrib.sessions'):
+            return AnonymousUser()
+        session_store = import_module(settings.SESSION_ENGINE).SessionStore
+        request.session = session_store(request.COOKIES.get(settings.SESSION_COOKIE_NAME))
+        return auth.get_user(request)
+
+    def profile(self, request):
+        profiler = cProfile.Profile()
+        started_at = time.perf_counter()
+        with record_queries() as recorder:
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+        duration = time.perf_counter() - started_at
+        response.close()
+
+        os.makedirs(profiles_dir(), exist_ok=True)
+        profile_file = '{}-{}.prof'.format(datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%f'), os.getpid())
+        profiler.dump_stats(os.path.join(profiles_dir(), profile_file))
+
+        stats_output = io.StringIO()
+        pstats.Stats(profiler, stream=stats_output).sort_stats('cumulative').print_stats(self.top_functions)
+
+        return JsonResponse({
+            'path': request.get_full_path(),
+            'method': request.method,
+            'status': response.status_code,
+            'duration_ms': round(duration * 1000, 3),
+            'queries': recorder.queries,
+            'query_count': len(recorder.queries),
+            'query_duration_ms': round(sum(query['duration_ms'] for query in recorder.queries), 3),
+            'profile_file': profile_file,
+            'profile': stats_output.getvalue().splitlines(),
+        })
+
+
+class SlowQueryLogMiddleware:
+    """
+    Logs the slow queries of the requests (see contacts.instrumentation),
+    attributed to the view serving them
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        def call_site():
+            if request.resolver_match is None:
+                return request.path_info
+            view = request.resolver_match.func
+            return '{}.{}'.format(view.__module__, view.__name__)
+
+        with log_slow_queries(call_site):
+            return self.get_response(request)
+
+
+class MetricsMiddleware:
+    """
+    Records the latency, status and SQL queries of the requests, by route,
+    in the metrics shared by the worker processes (see contacts.metrics)
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = {'count': 0, 'duration': 0}
+
+        def count_query(execute, sql, params, many, context):
+            started_at = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                queries['count'] += 1
+                queries['duration'] += time.perf_counter() - started_at
+
+        metrics.REQUESTS_IN_FLIGHT.inc()
+        started_at = time.perf_counter()
+        status = 500
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(count_query))
+                response = self.get_response(request)
+            status = response.status_code
+            return response
+        finally:
+            duration = time.perf_counter() - started_at
+            metrics.REQUESTS_IN_FLIGHT.dec()
+            # Labelled by route name (not path), so the number of series stays bounded
+            route = request.resolver_match.url_name if request.resolver_match else 'unmatched'
+            metrics.REQUESTS.inc(route=route, method=request.method, status=status)
+            metrics.REQUEST_DURATION.observe(duration, route=route, method=request.method)
+            metrics.QUERIES.inc(queries['count'], route=route)
+            metrics.QUERIES_DURATION.inc(queries['duration'], route=route)
@@ -0,0 +1,45 @@
+from django.db import migrations, models
+
+from contacts.phonetics import soundex
+
+
+BATCH_SIZE = 1000
+
+
+def fill_phonetic_keys(apps, schema_editor):
+    Contact = apps.get_model('contacts', 'Contact')
+    last_pk = 0
+    while True:
+        contacts = Contact.objects.filter(pk__gt=last_pk).order_by('pk').only('first_name', 'last_name')
+        contacts = list(contacts[:BATCH_SIZE])
+        if not contacts:
+            break
+
+        for contact in contacts:
+            contact.first_name_phonetic = soundex(contact.first_name)
+            contact.last_name_phonetic = soundex(contact.last_name)
+        Contact.objects.bulk_update(contacts, ['first_name_phonetic', 'last_name_phonetic'])
+        last_pk = contacts[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contacts', '0012_auto_20181105_1938'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contact',
+            name='first_name_phonetic',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=4),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='contact',
+            name='last_name_phonetic',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=4),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_phonetic_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contacts', '0015_job'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='addressfield',
+            index=models.Index(fields=['country', 'state', 'city', 'contact'], name='address_location_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='addressfield',
+            index=models.Index(fields=['zip_code', 'contact'], name='address_zip_code_idx'),
+        ),
+    ]
@@ -0,0 +1,70 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+from contacts.text import content_hash
+
+
+BATCH_SIZE = 1000
+CONTENT_FIELDS = ('address', 'city', 'state', 'country', 'zip_code')
+
+
+def fill_content_hashes(apps, schema_editor):
+    AddressField = apps.get_model('contacts', 'AddressField')
+    quote_name = schema_editor.connection.ops.quote_name
+    # One UPDATE by primary key per address, much cheaper than a `bulk_update` (CASE over the whole batch)
+    update_sql = 'UPDATE {} SET {} = %s WHERE {} = %s'.format(
+        quote_name(AddressField._meta.db_table), quote_name('content_hash'), quote_name('id')
+    )
+    last_pk = 0
+    with schema_editor.connection.cursor() as cursor:
+        while True:
+            addresses = AddressField.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', *CONTENT_FIELDS)
+            addresses = list(addresses[:BATCH_SIZE])
+            if not addresses:
+                break
+
+            cursor.executemany(update_sql, [(content_hash(*values), pk) for pk, *values in addresses])
+            last_pk = addresses[-1][0]
+
+    # Addresses differing only by surrounding spaces or accents composition are now duplicates, the oldest is kept
+    duplicates = AddressField.objects.values('contact_id', 'content_hash').annotate(
+        first_pk=models.Min('pk'), count=models.Count('pk')
+    ).filter(count__gt=1)
+    for duplicate in duplicates:
+        AddressField.objects.filter(
+            contact_id=duplicate['contact_id'], content_hash=duplicate['content_hash'], pk__gt=duplicate['first_pk']
+        ).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contacts', '0016_address_location_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='addressfield',
+            name='content_hash',
+            field=models.BigIntegerField(default=0, editable=False),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_content_hashes, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='addressfield',
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name='addressfield',
+            constraint=models.UniqueConstraint(fields=('contact', 'content_hash'), name='address_content_hash_uniq'),
+        ),
+        migrations.AlterModelOptions(
+            name='addressfield',
+            options={'ordering': ['id']},
+        ),
+        migrations.AlterField(
+            model_name='addressfield',
+            name='contact',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='addresses', to='contacts.Contact'),
+        ),
+    ]
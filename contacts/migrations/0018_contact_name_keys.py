@@ -0,0 +1,57 @@
+from django.db import migrations, models
+
+from contacts.text import fold
+
+
+BATCH_SIZE = 1000
+
+
+def fill_name_keys(apps, schema_editor):
+    Contact = apps.get_model('contacts', 'Contact')
+    quote_name = schema_editor.connection.ops.quote_name
+    update_sql = 'UPDATE {} SET {} = %s, {} = %s WHERE {} = %s'.format(
+        quote_name(Contact._meta.db_table), quote_name('first_name_key'), quote_name('last_name_key'), quote_name('id')
+    )
+    last_pk = 0
+    with schema_editor.connection.cursor() as cursor:
+        while True:
+            contacts = Contact.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', 'first_name', 'last_name')
+            contacts = list(contacts[:BATCH_SIZE])
+            if not contacts:
+                break
+
+            cursor.executemany(update_sql, [
+                (fold(first_name)[:255], fold(last_name)[:255], pk) for pk, first_name, last_name in contacts
+            ])
+            last_pk = contacts[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contacts', '0017_address_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contact',
+            name='first_name_key',
+            field=models.CharField(default='', editable=False, max_length=255),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='contact',
+            name='last_name_key',
+            field=models.CharField(default='', editable=False, max_length=255),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_name_keys, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='contact',
+            name='contact_name_idx',
+        ),
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(fields=['first_name_key', 'last_name_key'], name='contact_sort_idx'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+from django.db import migrations, models
+
+from contacts.text import fold
+
+
+BATCH_SIZE = 1000
+
+
+def fill_email_keys(apps, schema_editor):
+    EmailField = apps.get_model('contacts', 'EmailField')
+    quote_name = schema_editor.connection.ops.quote_name
+    update_sql = 'UPDATE {} SET {} = %s WHERE {} = %s'.format(
+        quote_name(EmailField._meta.db_table), quote_name('email_key'), quote_name('id')
+    )
+    last_pk = 0
+    with schema_editor.connection.cursor() as cursor:
+        while True:
+            emails = EmailField.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', 'email')
+            emails = list(emails[:BATCH_SIZE])
+            if not emails:
+                break
+
+            cursor.executemany(update_sql, [(fold(email)[:254], pk) for pk, email in emails])
+            last_pk = emails[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contacts', '0018_contact_name_keys'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='emailfield',
+            name='email_key',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=254),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_email_keys, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='contact',
+            name='last_name_key',
+            field=models.CharField(db_index=True, editable=False, max_length=255),
+        ),
+    ]
@@ -0,0 +1,22 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contacts', '0019_search_keys'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contact',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(
+                condition=models.Q(deleted_at__isnull=False), fields=['deleted_at'], name='contact_deleted_idx'
+            ),
+        ),
+    ]
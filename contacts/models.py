@@ -1,21 +1,139 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import NON_FIELD_ERRORS, ValidationError
 from django.core.validators import RegexValidator
 from django.db import models
+from django.utils import timezone
+
+from contacts.db import bulk_delete
+from contacts.phonetics import soundex
+from contacts.text import content_hash, fold
+
+
+class ContactManager(models.Manager):
+    """
+    Manager of the contacts that are not deleted (see `Contact.deleted_at`)
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
 
 
 class Contact(models.Model):
     first_name = models.CharField(max_length=255, null=False)
     last_name = models.CharField(max_length=255, null=False)
     date_of_birth = models.DateField(editable=True)
+    # Derived search keys, kept current on save (see `search_keys`)
+    first_name_phonetic = models.CharField(max_length=4, editable=False, db_index=True)
+    last_name_phonetic = models.CharField(max_length=4, editable=False, db_index=True)
+    first_name_key = models.CharField(max_length=255, editable=False)
+    last_name_key = models.CharField(max_length=255, editable=False, db_index=True)
+    # Set when the contact is deleted: it is kept (and can be restored) for
+    # `RETENTION_DAYS`, then purged with its rows by the `purge_deleted_contacts` job
+    deleted_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    objects = ContactManager()
+    # Including the deleted contacts
+    all_objects = models.Manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['first_name_key', 'last_name_key'], name='contact_sort_idx'),
+            # Only the (few) deleted contacts are indexed, for the purge
+            models.Index(
+                fields=['deleted_at'], name='contact_deleted_idx', condition=models.Q(deleted_at__isnull=False)
+            ),
+        ]
+
+    # Case- and accent-insensitive order of the names, walked on the sort index (the id makes it total)
+    NAME_ORDERING = ('first_name_key', 'last_name_key', 'id')
+
+    # Fields derived from each of the editable fields
+    DERIVED_FIELDS = {
+        'first_name': ('first_name_phonetic', 'first_name_key'),
+        'last_name': ('last_name_phonetic', 'last_name_key'),
+    }
+
+    @staticmethod
+    def search_keys(first_name, last_name):
+        """
+        Compute the derived search keys of a contact name
+        :param first_name:
+        :param last_name:
+        :return: dict with the values of the derived fields
+        """
+        return {
+            'first_name_phonetic': soundex(first_name),
+            'last_name_phonetic': soundex(last_name),
+            'first_name_key': fold(first_name)[:255],
+            'last_name_key': fold(last_name)[:255],
+        }
+
+    @staticmethod
+    def retention_start():
+        """
+        Oldest deletion time of the contacts that can still be restored, the
+        contacts deleted before it are purged
+        """
+        return timezone.now() - timedelta(days=settings.CONTACTS_DELETION['RETENTION_DAYS'])
+
+    @staticmethod
+    def purge(contact_ids):
+        """
+        Remove deleted contacts with their phones, emails and addresses, by a
+        set-based DELETE per table (no rows are loaded), within the caller's transaction
+        :param contact_ids:
+        """
+        deleted = Contact.all_objects.filter(pk__in=contact_ids, deleted_at__isnull=False)
+        for model in (PhoneNumber, EmailField, AddressField):
+            bulk_delete(model.objects.filter(contact__in=deleted))
+        bulk_delete(deleted)
+
+    def save(self, *args, **kwargs):
+        for field, value in self.search_keys(self.first_name, self.last_name).items():
+            setattr(self, field, value)
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields).union(
+                *(self.DERIVED_FIELDS.get(field, ()) for field in update_fields)
+            )
+
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return "{} {}".format(self.first_name, self.last_name)
 
 
+class ContactFieldQuerySet(models.QuerySet):
+    """
+    Phones, emails or addresses of the contacts
+    """
+
+    def of_contact(self, contact_id):
+        """
+        The rows of a contact, none when it is deleted (it is read through the default manager)
+        :param contact_id:
+        :return:
+        """
+        return self.filter(contact__in=Contact.objects.filter(pk=contact_id))
+
+    def of_live_contacts(self):
+        """
+        The rows of the contacts that are not deleted
+        :return:
+        """
+        return self.filter(contact__deleted_at__isnull=True)
+
+
 class PhoneNumber(models.Model):
     contact = models.ForeignKey(Contact, on_delete=models.CASCADE, related_name='phone_numbers')
     phone_regex = RegexValidator(regex=r'^[0-9 -+]+$')
     phone = models.CharField(validators=[phone_regex], max_length=20, unique=True)
 
+    objects = ContactFieldQuerySet.as_manager()
+
     def __str__(self):
         return self.phone
 
@@ -23,21 +141,120 @@ class PhoneNumber(models.Model):
 class EmailField(models.Model):
     contact = models.ForeignKey(Contact, on_delete=models.CASCADE, related_name='emails')
     email = models.EmailField(unique=True)
+    # Case- and accent-insensitive form of the email, kept current on save for the search
+    email_key = models.CharField(max_length=254, editable=False, db_index=True)
+
+    objects = ContactFieldQuerySet.as_manager()
+
+    @staticmethod
+    def search_key(email):
+        """
+        Compute the derived search key of an email
+        :param email:
+        :return: the key
+        """
+        return fold(email)[:254]
+
+    def save(self, *args, **kwargs):
+        self.email_key = self.search_key(self.email)
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'email' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'email_key'}
+
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.email
 
 
 class AddressField(models.Model):
-    contact = models.ForeignKey(Contact, on_delete=models.CASCADE, related_name='addresses')
+    contact = models.ForeignKey(Contact, on_delete=models.CASCADE, related_name='addresses', db_index=False)
     address = models.CharField(max_length=512)
     city = models.CharField(max_length=255)
     state = models.CharField(max_length=255)
     country = models.CharField(max_length=100)
     zip_code = models.CharField(max_length=20)
+    # Hash of the fields below, kept current on save: the addresses of a contact are unique by it
+    content_hash = models.BigIntegerField(editable=False)
+
+    CONTENT_FIELDS = ('address', 'city', 'state', 'country', 'zip_code')
+
+    objects = ContactFieldQuerySet.as_manager()
 
     class Meta:
-        unique_together = ('contact', 'address', 'city', 'state', 'country', 'zip_code')
+        # Listed in insertion order, which the unique index (by hash) does not give
+        ordering = ['id']
+        # The unique index also serves the lookups by contact, so the foreign key has no index of its own
+        constraints = [
+            models.UniqueConstraint(fields=['contact', 'content_hash'], name='address_content_hash_uniq'),
+        ]
+        # The contact is last, so the contacts of a location are read from the indexes alone
+        indexes = [
+            models.Index(fields=['country', 'state', 'city', 'contact'], name='address_location_idx'),
+            models.Index(fields=['zip_code', 'contact'], name='address_zip_code_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.content_hash = content_hash(*(getattr(self, field) for field in self.CONTENT_FIELDS))
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and set(update_fields) & set(self.CONTENT_FIELDS):
+            kwargs['update_fields'] = {*update_fields, 'content_hash'}
+
+        super().save(*args, **kwargs)
+
+    def validate_unique(self, exclude=None):
+        """
+        Also check the unique constraint on the content hash, which the model
+        validation (e.g. of the admin forms) leaves to the database
+        """
+        super().validate_unique(exclude)
+        if self.contact_id is None or (exclude and 'contact' in exclude):
+            return
+
+        address_hash = content_hash(*(getattr(self, field) for field in self.CONTENT_FIELDS))
+        duplicates = AddressField.objects.filter(contact_id=self.contact_id, content_hash=address_hash)
+        if self.pk is not None:
+            duplicates = duplicates.exclude(pk=self.pk)
+        if duplicates.exists():
+            raise ValidationError({NON_FIELD_ERRORS: ['This contact already has this address.']})
 
     def __str__(self):
         return "{}, {} - {}, {}, {}".format(self.address, self.city, self.state, self.country, self.zip_code)
+
+
+class Job(models.Model):
+    """
+    Background job run by the `run_workers` processes (see contacts.jobs),
+    the arguments and the result are stored as JSON
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    )
+
+    kind = models.CharField(max_length=50)
+    status = models.CharField(max_length=10, choices=STATUSES, default=QUEUED)
+    arguments = models.TextField(default='{}')
+    result = models.TextField(blank=True, default='')
+    error = models.TextField(blank=True, default='')
+    progress = models.FloatField(default=0)
+    worker = models.CharField(max_length=100, blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'id'], name='job_status_idx'),
+        ]
+
+    def __str__(self):
+        return "{} #{} ({})".format(self.kind, self.pk, self.status)
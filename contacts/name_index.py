@@ -0,0 +1,178 @@
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+
+from django.conf import settings
+from django.db import connection
+
+from contacts.cache import get_generation, increment_generation, NAMES_GENERATION
+from contacts.models import Contact
+
+
+def name_key(name):
+    return name.casefold()
+
+
+def name_keys(first_name, last_name):
+    """
+    Keys of a contact in the index: its first name, its last name and its
+    full name ("first last"), so that a prefix of several words is also a range
+    """
+    return {name_key(first_name), name_key(last_name), name_key('{} {}'.format(first_name, last_name))}
+
+
+class NameIndex:
+    """
+    Per-process sorted index of the casefolded first, last and full names of
+    the contacts, used to answer prefix lookups with a binary search.
+
+    The index is built on the first lookup and kept current by the writes of
+    this process, the writes of other processes (noticed through a generation
+    counter shared by the processes of the host, see contacts.cache) trigger a
+    background rebuild, while the stale index keeps being served for at most
+    `MAX_STALENESS` seconds
+    """
+
+    def __init__(self):
+        self._keys = []
+        self._ids = array('q')
+        self._names = {}
+        self._generation = None
+        self._built_at = None
+        self._rebuilding = False
+        self._lock = threading.RLock()
+
+    def search(self, prefix, limit):
+        """
+        Find the contacts with a first or last name starting with a prefix
+        :param prefix:
+        :param limit: maximum number of contacts
+        :return: list of (id, first_name, last_name), sorted by the matched name
+        """
+        self._sync()
+        prefix = name_key(prefix)
+
+        with self._lock:
+            matches = []
+            seen = set()
+            position = bisect_left(self._keys, prefix)
+            while position < len(self._keys) and len(matches) < limit:
+                if not self._keys[position].startswith(prefix):
+                    break
+
+                contact_id = self._ids[position]
+                position += 1
+                if contact_id in seen:
+                    continue
+
+                seen.add(contact_id)
+                matches.append((contact_id, *self._names[contact_id]))
+            return matches
+
+    def contact_saved(self, contact_id, first_name, last_name):
+        """
+        Apply a committed contact write of this process
+        """
+        generation = increment_generation(NAMES_GENERATION)
+        with self._lock:
+            if self._generation is None:
+                return
+            self._remove(contact_id)
+            self._insert(contact_id, first_name, last_name)
+            self._follow(generation)
+
+    def contact_deleted(self, contact_id):
+        """
+        Apply a committed contact removal of this process
+        """
+        generation = increment_generation(NAMES_GENERATION)
+        with self._lock:
+            if self._generation is None:
+                return
+            self._remove(contact_id)
+            self._follow(generation)
+
+    def invalidate(self):
+        """
+        Drop the index after a committed set-based write of this process, it
+        is rebuilt on the next lookup (the other processes rebuild theirs)
+        """
+        increment_generation(NAMES_GENERATION)
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._keys = []
+            self._ids = array('q')
+            self._names = {}
+            self._generation = None
+            self._built_at = None
+
+    def _follow(self, generation):
+        # Only a generation right after ours means that no other process wrote meanwhile
+        if generation == self._generation + 1:
+            self._generation = generation
+
+    def _insert(self, contact_id, first_name, last_name):
+        self._names[contact_id] = (first_name, last_name)
+        for key in name_keys(first_name, last_name):
+            position = bisect_right(self._keys, key)
+            self._keys.insert(position, key)
+            self._ids.insert(position, contact_id)
+
+    def _remove(self, contact_id):
+        names = self._names.pop(contact_id, None)
+        if names is None:
+            return
+
+        for key in name_keys(*names):
+            position = bisect_left(self._keys, key)
+            while position < len(self._keys) and self._keys[position] == key:
+                if self._ids[position] == contact_id:
+                    del self._keys[position]
+                    del self._ids[position]
+                    break
+                position += 1
+
+    def _sync(self):
+        generation = get_generation(NAMES_GENERATION)
+        with self._lock:
+            if self._generation is None:
+                self._build(generation)
+                return
+            if generation == self._generation or self._rebuilding:
+                return
+            if time.monotonic() - self._built_at < settings.CONTACTS_AUTOCOMPLETE['MAX_STALENESS']:
+                return
+            self._rebuilding = True
+
+        threading.Thread(target=self._rebuild, args=(generation,), daemon=True).start()
+
+    def _rebuild(self, generation):
+        try:
+            self._build(generation)
+        finally:
+            connection.close()
+
+    def _build(self, generation):
+        try:
+            names = {}
+            entries = []
+            contacts = Contact.objects.values_list('id', 'first_name', 'last_name')
+            for contact_id, first_name, last_name in contacts.iterator():
+                names[contact_id] = (first_name, last_name)
+                entries.extend((key, contact_id) for key in name_keys(first_name, last_name))
+            entries.sort()
+
+            with self._lock:
+                self._keys = [key for key, _ in entries]
+                self._ids = array('q', (contact_id for _, contact_id in entries))
+                self._names = names
+                self._generation = generation
+                self._built_at = time.monotonic()
+        finally:
+            self._rebuilding = False
+
+
+name_index = NameIndex()
@@ -0,0 +1,100 @@
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from contacts.cache import contacts_count
+from contacts.db import estimated_rows, is_unfiltered
+from contacts.models import Contact
+
+
+class EstimatedCountPagination(PageNumberPagination):
+    """
+    Page number pagination that never counts a whole table: views can provide
+    a cheap total for their unfiltered listings (`get_total_count`), otherwise
+    the count is capped at `COUNT_CAP` (e.g. "1000+"). A page is only fetched
+    with one extra row, to know if there are more.
+
+    Listings requested without `page` nor `page_size` are not paginated
+    """
+    page_size = settings.CONTACTS_PAGINATION['PAGE_SIZE']
+    page_size_query_param = 'page_size'
+    max_page_size = settings.CONTACTS_PAGINATION['MAX_PAGE_SIZE']
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.page_query_param not in request.query_params and \
+                self.page_size_query_param not in request.query_params:
+            return None
+
+        try:
+            self.page_number = int(request.query_params.get(self.page_query_param, 1))
+        except ValueError:
+            self.page_number = 0
+        if self.page_number < 1:
+            raise NotFound('Invalid page.')
+
+        self.request = request
+        page_size = self.get_page_size(request)
+        offset = (self.page_number - 1) * page_size
+        results = list(queryset[offset:offset + page_size + 1])
+        self.has_more = len(results) > page_size
+
+        total_count = getattr(view, 'get_total_count', lambda: None)()
+        self.count = total_count if total_count is not None else self.capped_count(queryset)
+        return results[:page_size]
+
+    @staticmethod
+    def capped_count(queryset):
+        count_cap = settings.CONTACTS_PAGINATION['COUNT_CAP']
+        if isinstance(queryset, list):
+            count = len(queryset)
+        else:
+            count = queryset.values('pk')[:count_cap + 1].count()
+        return count if count <= count_cap else '{}+'.format(count_cap)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('count', self.count),
+            ('has_more', self.has_more),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_next_link(self):
+        if not self.has_more:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.page_query_param, self.page_number + 1)
+
+    def get_previous_link(self):
+        if self.page_number == 1:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.page_number == 2:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.page_query_param, self.page_number - 1)
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator (of the admin changelists) that never counts a whole table: all
+    the contacts are counted by the cached counter, all the rows of another
+    table are estimated by the database when it can, and the other querysets
+    are counted up to `COUNT_CAP` (so only their first pages are reachable)
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if is_unfiltered(queryset):
+            total = contacts_count() if queryset.model is Contact else estimated_rows(queryset.model)
+            if total is not None:
+                return total
+
+        count_cap = settings.CONTACTS_PAGINATION['COUNT_CAP']
+        return min(queryset.values('pk')[:count_cap + 1].count(), count_cap)
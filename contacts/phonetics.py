@@ -0,0 +1,56 @@
+import unicodedata
+
+SOUNDEX_CODES = {
+    letter: digit
+    for letters, digit in (('bfpv', '1'), ('cgjkqsxz', '2'), ('dt', '3'), ('l', '4'), ('mn', '5'), ('r', '6'))
+    for letter in letters
+}
+
+
+def soundex(name):
+    """
+    American Soundex code of a name (e.g. 'Smith' and 'Smyth' are both 'S530')
+    :param name:
+    :return: the 4 characters code, or an empty string if the name has no latin letters
+    """
+    letters = [char for char in unicodedata.normalize('NFKD', name.casefold()) if 'a' <= char <= 'z']
+    if not letters:
+        return ''
+
+    code = letters[0].upper()
+    previous = SOUNDEX_CODES.get(letters[0])
+    for letter in letters[1:]:
+        digit = SOUNDEX_CODES.get(letter)
+        if digit and digit != previous:
+            code += digit
+            if len(code) == 4:
+                break
+        # 'h' and 'w' do not separate letters with the same code
+        if letter not in 'hw':
+            previous = digit
+
+    return code.ljust(4, '0')
+
+
+def edit_distance(first, second):
+    """
+    Levenshtein distance between two strings
+    :param first:
+    :param second:
+    :return:
+    """
+    if len(first) < len(second):
+        first, second = second, first
+
+    previous_row = list(range(len(second) + 1))
+    for i, first_char in enumerate(first, 1):
+        current_row = [i]
+        for j, second_char in enumerate(second, 1):
+            current_row.append(min(
+                previous_row[j] + 1,
+                current_row[j - 1] + 1,
+                previous_row[j - 1] + (first_char != second_char),
+            ))
+        previous_row = current_row
+
+    return previous_row[-1]
@@ -0,0 +1,16 @@
+import os
+
+
+def is_process_alive(pid):
+    """
+    Whether a process of this host is running (or owned by another user)
+    :param pid:
+    :return:
+    """
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
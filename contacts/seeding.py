@@ -0,0 +1,229 @@
+import random
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+from functools import lru_cache
+from itertools import accumulate
+
+from django.db import connection, transaction
+from django.db.models import Max
+
+from contacts.models import Contact, PhoneNumber, EmailField, AddressField
+from contacts.signals import contacts_bulk_changed
+from contacts.text import content_hash, fold
+
+# Names with rough frequency weights, so the common names repeat like in a real address book
+FIRST_NAMES = (
+    ('James', 33), ('Mary', 30), ('John', 28), ('Patricia', 20), ('Robert', 25), ('Jennifer', 19), ('Michael', 24),
+    ('Linda', 17), ('William', 20), ('Elizabeth', 16), ('David', 22), ('Barbara', 14), ('Richard', 12),
+    ('Susan', 13), ('Joseph', 12), ('Jessica', 12), ('Thomas', 12), ('Sarah', 11), ('Charles', 10), ('Karen', 10),
+    ('Maria', 14), ('José', 9), ('Ana', 8), ('João', 7), ('Lucía', 5), ('François', 4), ('Zoë', 3), ('Müller', 1),
+    ('Chloé', 4), ('Élodie', 3), ('Søren', 2), ('Mohammed', 9), ('Fatima', 6), ('Wei', 8), ('Yuki', 4),
+    ('Priya', 5), ('Olga', 4), ('Ivan', 5), ('Liam', 9), ('Emma', 10), ('Noah', 8), ('Olivia', 9), ('Elton', 1),
+    ('Marilyn', 1), ('Jon', 3), ('Jonathan', 6), ('Catherine', 6), ('Kathryn', 3), ('Stephen', 5), ('Steven', 6),
+)
+LAST_NAMES = (
+    ('Smith', 30), ('Johnson', 25), ('Williams', 22), ('Brown', 20), ('Jones', 20), ('Garcia', 16), ('Miller', 15),
+    ('Davis', 14), ('Rodriguez', 13), ('Martinez', 12), ('Hernandez', 11), ('Lopez', 10), ('Gonzalez', 10),
+    ('Wilson', 9), ('Anderson', 9), ('Thomas', 8), ('Taylor', 8), ('Moore', 7), ('Jackson', 7), ('Martin', 7),
+    ('Silva', 12), ('Santos', 10), ('Oliveira', 8), ('Souza', 7), ('Müller', 6), ('Schmidt', 5), ('Dubois', 4),
+    ('Lefèvre', 3), ('Rossi', 5), ('Nowak', 4), ('Kowalski', 3), ('Ivanov', 4), ('Wang', 10), ('Li', 10),
+    ('Zhang', 9), ('Tanaka', 4), ('Sato', 4), ('Kim', 8), ('Nguyen', 7), ('Patel', 7), ('Khan', 5), ('Smyth', 1),
+    ('Peña', 3), ('Çelik', 2), ('Ødegaard', 1), ('O\'Brien', 3), ('John', 1), ('Monroe', 1), ('Doe', 2),
+)
+EMAIL_DOMAINS = (
+    ('gmail.com', 40), ('yahoo.com', 12), ('outlook.com', 12), ('hotmail.com', 8), ('icloud.com', 6),
+    ('example.com', 4), ('mail.com', 2), ('proton.me', 2), ('uol.com.br', 3), ('web.de', 2),
+)
+# (city, state, country, zip code format, phone country code)
+CITIES = (
+    ('New York', 'NY', 'United States', '1####', '1', 20), ('Los Angeles', 'CA', 'United States', '9####', '1', 14),
+    ('Chicago', 'IL', 'United States', '6####', '1', 9), ('Houston', 'TX', 'United States', '7####', '1', 7),
+    ('Seattle', 'WA', 'United States', '98###', '1', 4), ('Toronto', 'ON', 'Canada', 'M#A #A#', '1', 5),
+    ('São Paulo', 'SP', 'Brazil', '0####-###', '55', 10), ('Rio de Janeiro', 'RJ', 'Brazil', '2####-###', '55', 6),
+    ('London', 'England', 'United Kingdom', 'SW# #AA', '44', 8),
+    ('Paris', 'Île-de-France', 'France', '75###', '33', 5),
+    ('Berlin', 'Berlin', 'Germany', '1####', '49', 5), ('Madrid', 'Madrid', 'Spain', '28###', '34', 4),
+    ('Tokyo', 'Tokyo', 'Japan', '1##-####', '81', 6), ('Mumbai', 'Maharashtra', 'India', '400###', '91', 5),
+)
+STREETS = (
+    'Main St', 'Oak Ave', 'Maple St', 'Park Ave', 'Elm St', 'Cedar Rd', 'Lake Dr', 'Hill St', 'Church Rd',
+    'High St', 'Rua das Flores', 'Avenida Paulista', 'Rue de Rivoli', 'Hauptstraße', 'Calle Mayor',
+)
+# Every contact has a phone and an email, like the contacts created through the API
+PHONE_COUNTS = ((1, 65), (2, 28), (3, 7))
+EMAIL_COUNTS = ((1, 75), (2, 25))
+ADDRESS_COUNTS = ((0, 25), (1, 65), (2, 10))
+DATES_OF_BIRTH = (date(1940, 1, 1), date(2008, 12, 31))
+BIRTH_DATES = [
+    (DATES_OF_BIRTH[0] + timedelta(days=days)).isoformat()
+    for days in range((DATES_OF_BIRTH[1] - DATES_OF_BIRTH[0]).days)
+]
+SQLITE_CACHE_SIZE = -256 * 1024  # KiB
+LETTERS = 'ABCDEFGHJKLMNPRSTUVWXYZ'
+# The letters without an accent to strip, spelled in ASCII for the email local parts
+TRANSLITERATIONS = str.maketrans({'ø': 'o', 'æ': 'ae', 'œ': 'oe', 'ß': 'ss', 'ł': 'l', 'đ': 'd', 'ı': 'i'})
+
+
+def _weighted(choices):
+    values = [choice[:-1] if len(choice) > 2 else choice[0] for choice in choices]
+    return values, list(accumulate(choice[-1] for choice in choices))
+
+
+FIRST_NAME_CHOICES = _weighted(FIRST_NAMES)
+LAST_NAME_CHOICES = _weighted(LAST_NAMES)
+EMAIL_DOMAIN_CHOICES = _weighted(EMAIL_DOMAINS)
+CITY_CHOICES = _weighted(CITIES)
+PHONE_COUNT_CHOICES = _weighted(PHONE_COUNTS)
+EMAIL_COUNT_CHOICES = _weighted(EMAIL_COUNTS)
+ADDRESS_COUNT_CHOICES = _weighted(ADDRESS_COUNTS)
+
+
+@lru_cache(maxsize=None)
+def _search_keys(first_name, last_name):
+    return tuple(Contact.search_keys(first_name, last_name).values())
+
+
+@lru_cache(maxsize=None)
+def _email_name(name):
+    return ''.join(char for char in fold(name).translate(TRANSLITERATIONS) if char.isascii() and char.isalnum())
+
+
+def _format_code(random_, code_format):
+    return ''.join(
+        str(int(random_.random() * 10)) if char == '#' else
+        LETTERS[int(random_.random() * len(LETTERS))] if char == 'A' else char
+        for char in code_format
+    )
+
+
+def contact_columns():
+    return ('id', 'first_name', 'last_name', 'date_of_birth', *Contact.search_keys('', ''))
+
+
+def generate_batch(seed, first_id, size):
+    """
+    Generate the rows of the contacts `first_id` to `first_id + size - 1`,
+    the same seed and ids always give the same rows.
+
+    The phones and emails embed the contact id, so they are unique across
+    batches without any coordination between the generating processes
+    :return: dict of the column names and the rows (tuples) of each model
+    """
+    random_ = random.Random('{}:{}'.format(seed, first_id))
+    contact_ids = range(first_id, first_id + size)
+    # The random choices are drawn for the whole batch at once, which is much cheaper than one by one
+    draws = zip(
+        contact_ids,
+        random_.choices(*FIRST_NAME_CHOICES, k=size),
+        random_.choices(*LAST_NAME_CHOICES, k=size),
+        random_.choices(*CITY_CHOICES, k=size),
+        random_.choices(*PHONE_COUNT_CHOICES, k=size),
+        random_.choices(*EMAIL_COUNT_CHOICES, k=size),
+        random_.choices(*ADDRESS_COUNT_CHOICES, k=size),
+    )
+    contacts, phone_numbers, emails, addresses = [], [], [], []
+
+    for contact_id, first_name, last_name, city, phone_count, email_count, address_count in draws:
+        contacts.append((
+            contact_id, first_name, last_name, BIRTH_DATES[int(random_.random() * len(BIRTH_DATES))],
+            *_search_keys(first_name, last_name),
+        ))
+
+        country_code = city[4]
+        for k in range(phone_count):
+            phone_numbers.append((contact_id, '+{} {:011d}'.format(country_code, contact_id * 4 + k)))
+
+        first_email_name, last_email_name = _email_name(first_name), _email_name(last_name)
+        domains = random_.choices(*EMAIL_DOMAIN_CHOICES, k=email_count)
+        # The generated emails are made of folded names, so they are their own search keys
+        email = '{}.{}{}@{}'.format(first_email_name, last_email_name, contact_id, domains[0])
+        emails.append((contact_id, email, email))
+        for k in range(1, email_count):
+            email = '{}{}.{}.{}@{}'.format(first_email_name[:1], last_email_name, contact_id, k, domains[k])
+            emails.append((contact_id, email, email))
+
+        for k in range(address_count):
+            if k:
+                city = random_.choices(*CITY_CHOICES)[0]
+            # The house numbers of a contact differ, so its addresses are unique
+            street = STREETS[int(random_.random() * len(STREETS))]
+            address = ('{} {}'.format(int(random_.random() * 500) * 3 + k + 1, street), *city[:3],
+                       _format_code(random_, city[3]))
+            addresses.append((contact_id, *address, content_hash(*address)))
+
+    return {
+        Contact: (contact_columns(), contacts),
+        PhoneNumber: (('contact_id', 'phone'), phone_numbers),
+        EmailField: (('contact_id', 'email', 'email_key'), emails),
+        AddressField: (('contact_id', *AddressField.CONTENT_FIELDS, 'content_hash'), addresses),
+    }
+
+
+def insert_rows(cursor, model, columns, rows):
+    """
+    Insert generated rows with a single `executemany`
+    :param cursor:
+    :param model:
+    :param columns: names of the columns of the rows
+    :param rows: tuples of values
+    """
+    if not rows:
+        return
+
+    quote_name = connection.ops.quote_name
+    cursor.executemany('INSERT INTO {} ({}) VALUES ({})'.format(
+        quote_name(model._meta.db_table), ', '.join(map(quote_name, columns)), ', '.join(['%s'] * len(columns))
+    ), rows)
+
+
+def seed_contacts(count, seed=0, batch_size=10000, workers=1, progress=None):
+    """
+    Add generated contacts (with phones, emails and addresses) after the
+    existing ones, the batches are generated by `workers` processes while
+    the current process inserts them
+    :param count: number of contacts to add
+    :param seed:
+    :param batch_size: number of contacts generated and inserted at a time
+    :param workers:
+    :param progress: callable receiving the number of contacts inserted so far
+    :return: the number of inserted rows of each model
+    """
+    first_id = (Contact.all_objects.aggregate(last_id=Max('id'))['last_id'] or 0) + 1
+    batches = [(seed, batch_id, min(batch_size, first_id + count - batch_id))
+               for batch_id in range(first_id, first_id + count, batch_size)]
+    inserted = {model: 0 for model in (Contact, PhoneNumber, EmailField, AddressField)}
+
+    def insert(generated, cursor):
+        for model, (columns, rows) in generated.items():
+            insert_rows(cursor, model, columns, rows)
+            inserted[model] += len(rows)
+        if progress:
+            progress(inserted[Contact])
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            # A larger page cache keeps the growing indexes in memory while inserting
+            cursor.execute('PRAGMA cache_size')
+            cache_size = cursor.fetchone()[0]
+            cursor.execute('PRAGMA cache_size = {:d}'.format(SQLITE_CACHE_SIZE))
+
+        if workers > 1 and len(batches) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                # A bounded number of batches is pending, so memory does not grow with `count`
+                pending = deque()
+                for batch in batches:
+                    pending.append(executor.submit(generate_batch, *batch))
+                    if len(pending) > 2 * workers:
+                        insert(pending.popleft().result(), cursor)
+                while pending:
+                    insert(pending.popleft().result(), cursor)
+        else:
+            for batch in batches:
+                insert(generate_batch(*batch), cursor)
+
+        if connection.vendor == 'sqlite':
+            cursor.execute('PRAGMA cache_size = {:d}'.format(cache_size))
+        contacts_bulk_changed(created_count=inserted[Contact])
+
+    return inserted
@@ -1,16 +1,62 @@
+import json
+
 from django.db import transaction, IntegrityError
 from rest_framework import serializers
+from rest_framework.validators import UniqueValidator
+
+from contacts.db import bulk_delete
+from contacts.models import Contact, PhoneNumber, EmailField, AddressField, Job
+from contacts.signals import contacts_bulk_changed
+from contacts.text import content_hash
+
 
-from contacts.models import Contact, PhoneNumber, EmailField, AddressField
+def take_over_values(model, slug_field, values):
+    """
+    Purge the deleted contacts holding some of the given phones or emails, so
+    that the values can be registered again (these contacts can no longer be restored)
+    :param model: PhoneNumber or EmailField
+    :param slug_field: 'phone' or 'email'
+    :param values:
+    """
+    holders = model.objects.filter(contact__deleted_at__isnull=False, **{slug_field + '__in': values})
+    contact_ids = list(holders.values_list('contact_id', flat=True))
+    if contact_ids:
+        with transaction.atomic():
+            Contact.purge(contact_ids)
 
 
-class PhoneNumberSerializer(serializers.ModelSerializer):
+class ContactValueSerializer(serializers.ModelSerializer):
+    """
+    Phone or email of a contact, unique among the contacts that are not
+    deleted: it is written once the deleted contacts holding it are purged
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        slug_field, = self.Meta.fields
+        for validator in fields[slug_field].validators:
+            if isinstance(validator, UniqueValidator):
+                validator.queryset = self.Meta.model.objects.of_live_contacts()
+        return fields
+
+    def create(self, validated_data):
+        slug_field, = self.Meta.fields
+        take_over_values(self.Meta.model, slug_field, [validated_data[slug_field]])
+        return super().create(validated_data)
+
+    def update(self, instance, validated_data):
+        slug_field, = self.Meta.fields
+        take_over_values(self.Meta.model, slug_field, [validated_data[slug_field]])
+        return super().update(instance, validated_data)
+
+
+class PhoneNumberSerializer(ContactValueSerializer):
     class Meta:
         model = PhoneNumber
         fields = ('phone',)
 
 
-class EmailFieldSerializer(serializers.ModelSerializer):
+class EmailFieldSerializer(ContactValueSerializer):
     class Meta:
         model = EmailField
         fields = ('email',)
@@ -22,15 +68,164 @@ class AddressSerializer(serializers.ModelSerializer):
         fields = ('id', 'address', 'city', 'state', 'country', 'zip_code')
 
 
+class ContactValuesField(serializers.ListField):
+    """
+    Phones or emails of a contact, read and written as the list of their
+    values: a contact always keeps at least one, and a value is listed once
+    """
+
+    def __init__(self, slug_field, **kwargs):
+        self.slug_field = slug_field
+        super().__init__(allow_empty=False, required=False, **kwargs)
+
+    def to_representation(self, related):
+        return [getattr(item, self.slug_field) for item in related.all()]
+
+    def to_internal_value(self, data):
+        values = super().to_internal_value(data)
+        if len(set(values)) < len(values):
+            raise serializers.ValidationError('A value is listed more than once')
+        return values
+
+
+class ContactAddressSerializer(AddressSerializer):
+    """
+    Address of a contact card: the one with the `id` is updated, an address without it is added
+    """
+    id = serializers.IntegerField(required=False)
+
+
 class ContactSerializer(serializers.ModelSerializer):
-    phone_numbers = serializers.SlugRelatedField(many=True, read_only=True, slug_field='phone')
-    emails = serializers.SlugRelatedField(many=True, read_only=True, slug_field='email')
-    addresses = AddressSerializer(many=True, required=False)
+    phone_numbers = ContactValuesField(
+        'phone', child=serializers.CharField(max_length=20, validators=[PhoneNumber.phone_regex])
+    )
+    emails = ContactValuesField('email', child=serializers.EmailField(max_length=254))
+    addresses = ContactAddressSerializer(many=True, required=False)
 
     class Meta:
         model = Contact
         fields = ('id', 'first_name', 'last_name', 'date_of_birth', 'phone_numbers', 'emails', 'addresses')
 
+    def update(self, contact, validated_data):
+        """
+        Write the changed fields of the contact, and replace its phones, emails
+        and addresses by the given lists, with a bulk delete, update and insert
+        of the rows that differ
+        """
+        phones = validated_data.pop('phone_numbers', None)
+        emails = validated_data.pop('emails', None)
+        addresses = validated_data.pop('addresses', None)
+        if (phones, emails, addresses) == (None, None, None):
+            # At most one UPDATE, which needs no transaction of its own
+            self.write_fields(contact, validated_data)
+            return contact
+
+        with transaction.atomic():
+            self.write_fields(contact, validated_data)
+            if phones is not None:
+                self.replace_values(contact, 'phone_numbers', phones)
+            if emails is not None:
+                self.replace_values(contact, 'emails', emails, email_key=EmailField.search_key)
+            if addresses is not None:
+                self.replace_addresses(contact, addresses)
+            contacts_bulk_changed(changed_ids=[contact.pk])
+        return contact
+
+    @staticmethod
+    def write_fields(contact, validated_data):
+        """
+        Save the fields of the contact whose value changed, if any
+        :param contact:
+        :param validated_data: the new values
+        """
+        changed = [field for field, value in validated_data.items() if getattr(contact, field) != value]
+        for field in changed:
+            setattr(contact, field, validated_data[field])
+        if changed:
+            contact.save(update_fields=changed)
+
+    def replace_values(self, contact, field_name, values, **derived):
+        """
+        Replace the phones or emails of a contact, the values registered for
+        other contacts are rejected (but those of deleted contacts are taken over)
+        :param contact:
+        :param field_name: 'phone_numbers' or 'emails'
+        :param values: the new values
+        :param derived: functions computing the derived fields of the rows from their value
+        """
+        slug_field = self.fields[field_name].slug_field
+        model = getattr(contact, field_name).model
+        stored = set(model.objects.filter(contact=contact).values_list(slug_field, flat=True))
+        removed = stored.difference(values)
+        added = [value for value in values if value not in stored]
+
+        if added:
+            taken = model.objects.of_live_contacts().filter(**{slug_field + '__in': added}) \
+                .values_list(slug_field, flat=True)
+            if taken:
+                raise serializers.ValidationError({
+                    field_name: ['{} is already registered'.format(value) for value in taken]
+                })
+            take_over_values(model, slug_field, added)
+
+        if removed:
+            bulk_delete(model.objects.filter(contact=contact, **{slug_field + '__in': removed}))
+        try:
+            model.objects.bulk_create([model(
+                contact=contact, **{slug_field: value}, **{field: derive(value) for field, derive in derived.items()}
+            ) for value in added])
+        except IntegrityError as err:
+            raise serializers.ValidationError({field_name: ['This field is already registered']}) from err
+
+    @staticmethod
+    def replace_addresses(contact, addresses):
+        """
+        Replace the addresses of a contact: the listed ones (by `id`) are updated,
+        the others are added, and the ones not listed are removed
+        :param contact:
+        :param addresses: the new addresses
+        """
+        stored = {address.pk: address for address in AddressField.objects.filter(contact=contact)}
+        ids = [data['id'] for data in addresses if 'id' in data]
+        if set(ids) - set(stored):
+            raise serializers.ValidationError({'addresses': ['Addresses not found: {}'.format(
+                ', '.join(map(str, sorted(set(ids) - set(stored))))
+            )]})
+        if len(set(ids)) < len(ids):
+            raise serializers.ValidationError({'addresses': ['An address is listed more than once']})
+
+        updated, added, hashes = [], [], set()
+        for data in addresses:
+            address = stored.pop(data['id']) if 'id' in data else AddressField(contact=contact)
+            # A partial update (PATCH) keeps the other fields of a listed address, a new one needs them all
+            missing = [field for field in AddressField.CONTENT_FIELDS if field not in data]
+            if address.pk is None and missing:
+                raise serializers.ValidationError({'addresses': [
+                    'A new address requires the fields: {}'.format(', '.join(missing))
+                ]})
+            values = [data.get(field, getattr(address, field)) for field in AddressField.CONTENT_FIELDS]
+            if address.pk is None:
+                added.append(address)
+            elif values != [getattr(address, field) for field in AddressField.CONTENT_FIELDS]:
+                updated.append(address)
+            for field, value in zip(AddressField.CONTENT_FIELDS, values):
+                setattr(address, field, value)
+            address.content_hash = content_hash(*values)
+            hashes.add(address.content_hash)
+        if len(hashes) < len(addresses):
+            raise serializers.ValidationError({'addresses': ['This field is already registered']})
+
+        # The changed rows are deleted and inserted again (with their ids), as
+        # rows updated one by one could collide on the unique hash when they
+        # exchange their contents
+        removed = [*stored, *(address.pk for address in updated)]
+        if removed:
+            bulk_delete(AddressField.objects.filter(pk__in=removed))
+        try:
+            AddressField.objects.bulk_create([*updated, *added])
+        except IntegrityError as err:
+            raise serializers.ValidationError({'addresses': ['This field is already registered']}) from err
+
 
 class ContactNestedSerializer(serializers.ModelSerializer):
     phone_numbers = PhoneNumberSerializer(many=True, required=True)
@@ -72,3 +267,46 @@ class ContactNestedSerializer(serializers.ModelSerializer):
     class Meta:
         model = Contact
         fields = '__all__'
+
+
+class MergeContactsSerializer(serializers.Serializer):
+    source_ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False)
+
+
+class JobSerializer(serializers.ModelSerializer):
+    arguments = serializers.SerializerMethodField()
+    result = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Job
+        fields = ('id', 'kind', 'status', 'progress', 'arguments', 'result', 'error', 'created_at', 'started_at',
+                  'finished_at')
+
+    def get_arguments(self, job):
+        return json.loads(job.arguments)
+
+    def get_result(self, job):
+        return json.loads(job.result) if job.result else None
+
+
+class EnqueueJobSerializer(serializers.Serializer):
+    kind = serializers.CharField(max_length=50)
+    arguments = serializers.DictField(required=False, default=dict)
+
+
+class JobArgumentsSerializer(serializers.Serializer):
+    """
+    Arguments of a kind of background jobs (none by default), the unknown
+    ones are rejected instead of failing the job
+    """
+
+    def validate(self, attrs):
+        unknown = sorted(set(self.initial_data) - set(self.fields))
+        if unknown:
+            raise serializers.ValidationError({name: ['Unknown argument.'] for name in unknown})
+        return attrs
+
+
+class DuplicatesJobSerializer(JobArgumentsSerializer):
+    threshold = serializers.FloatField(min_value=0, max_value=1, required=False)
+    window = serializers.IntegerField(min_value=1, required=False)
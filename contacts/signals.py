@@ -0,0 +1,58 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from contacts.cache import bump_data_generation, adjust_contacts_count
+from contacts.models import Contact, PhoneNumber, EmailField, AddressField
+from contacts.name_index import name_index
+
+
+@receiver([post_save, post_delete], sender=Contact)
+def contact_changed(sender, instance, **kwargs):
+    # The cached contacts and search results are keyed by the data generation
+    bump_data_generation()
+
+
+@receiver(post_save, sender=Contact)
+def contact_saved(sender, instance, created, **kwargs):
+    if created:
+        adjust_contacts_count(1)
+    contact_id, first_name, last_name = instance.pk, instance.first_name, instance.last_name
+    transaction.on_commit(lambda: name_index.contact_saved(contact_id, first_name, last_name))
+
+
+@receiver(post_delete, sender=Contact)
+def contact_deleted(sender, instance, **kwargs):
+    adjust_contacts_count(-1)
+    contact_id = instance.pk
+    transaction.on_commit(lambda: name_index.contact_deleted(contact_id))
+
+
+@receiver([post_save, post_delete], sender=PhoneNumber)
+@receiver([post_save, post_delete], sender=EmailField)
+@receiver([post_save, post_delete], sender=AddressField)
+def contact_field_changed(sender, instance, **kwargs):
+    bump_data_generation()
+
+
+def contacts_bulk_changed(changed_ids=(), deleted_ids=(), created_count=0, restored=()):
+    """
+    Counterpart of the receivers above for the set-based writes (queryset
+    updates, deletes and raw inserts), which do not send the model signals
+    :param changed_ids: ids of the contacts whose phones, emails or addresses changed
+    :param deleted_ids: ids of the removed (or soft-deleted) contacts
+    :param created_count: number of inserted contacts
+    :param restored: the restored contacts
+    """
+    for contact_id in deleted_ids:
+        transaction.on_commit(partial(name_index.contact_deleted, contact_id))
+    for contact in restored:
+        transaction.on_commit(partial(name_index.contact_saved, contact.pk, contact.first_name, contact.last_name))
+    if len(restored) != len(deleted_ids):
+        adjust_contacts_count(len(restored) - len(deleted_ids))
+    if created_count:
+        adjust_contacts_count(created_count)
+        transaction.on_commit(name_index.invalidate)
+    bump_data_generation()
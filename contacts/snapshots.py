@@ -0,0 +1,142 @@
+import fcntl
+import gzip
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.db import connection
+
+from contacts.cache import data_generation
+from contacts.models import Contact
+from contacts.serializers import ContactSerializer
+
+BATCH_SIZE = 1000
+
+
+def snapshots_dir():
+    return os.path.join(settings.CONTACTS_DATA_DIR, 'snapshots')
+
+
+def manifest_path():
+    return os.path.join(snapshots_dir(), 'latest.json')
+
+
+def build_lock_path():
+    return os.path.join(snapshots_dir(), 'build.lock')
+
+
+def latest_snapshot():
+    """
+    Manifest of the last built snapshot, or None if there is none
+    :return: dict with the `path`, `etag`, `size` and data `generation` of the snapshot
+    """
+    try:
+        with open(manifest_path()) as manifest_file:
+            manifest = json.load(manifest_file)
+    except FileNotFoundError:
+        return None
+
+    manifest['path'] = os.path.join(snapshots_dir(), manifest['file'])
+    return manifest
+
+
+def export_lines():
+    """
+    Serialized contacts (one JSON document per line), read in batches of ids
+    """
+    last_pk = 0
+    while True:
+        contacts = list(
+            Contact.objects.filter(pk__gt=last_pk).order_by('pk')
+            .prefetch_related('phone_numbers', 'emails', 'addresses')[:BATCH_SIZE]
+        )
+        if not contacts:
+            return
+
+        for data in ContactSerializer(contacts, many=True).data:
+            yield json.dumps(data, separators=(',', ':')).encode() + b'\n'
+        last_pk = contacts[-1].pk
+
+
+def build_snapshot(progress=None):
+    """
+    Write the gzip-compressed NDJSON export of all contacts and make it the
+    latest snapshot
+    :param progress: callable receiving the number of contacts written so far and the total
+    :return: the manifest of the new snapshot
+    """
+    generation = data_generation()
+    total = Contact.objects.count() if progress else None
+    os.makedirs(snapshots_dir(), exist_ok=True)
+    temporary_path = os.path.join(snapshots_dir(), 'building-{}.ndjson.gz'.format(os.getpid()))
+
+    with open(temporary_path, 'wb') as raw_file:
+        # No timestamp in the gzip header, so the same data gives the same file
+        with gzip.GzipFile(fileobj=raw_file, mode='wb', mtime=0) as snapshot_file:
+            for written, line in enumerate(export_lines(), 1):
+                snapshot_file.write(line)
+                if progress and written % BATCH_SIZE == 0:
+                    progress(written, total)
+
+    digest = hashlib.sha256()
+    with open(temporary_path, 'rb') as snapshot_file:
+        for chunk in iter(lambda: snapshot_file.read(1 << 16), b''):
+            digest.update(chunk)
+    etag = digest.hexdigest()[:32]
+    file_name = 'contacts-{}.ndjson.gz'.format(etag)
+    os.replace(temporary_path, os.path.join(snapshots_dir(), file_name))
+
+    manifest = {
+        'file': file_name,
+        'etag': etag,
+        'size': os.path.getsize(os.path.join(snapshots_dir(), file_name)),
+        'generation': generation,
+        'created_at': datetime.now(timezone.utc).isoformat(),
+    }
+    temporary_manifest_path = '{}.{}'.format(manifest_path(), os.getpid())
+    with open(temporary_manifest_path, 'w') as manifest_file:
+        json.dump(manifest, manifest_file)
+    os.replace(temporary_manifest_path, manifest_path())
+
+    # The previous snapshots are dropped (downloads in progress keep their open file)
+    for old_file_name in os.listdir(snapshots_dir()):
+        if old_file_name.startswith('contacts-') and old_file_name != file_name:
+            os.remove(os.path.join(snapshots_dir(), old_file_name))
+
+    manifest['path'] = os.path.join(snapshots_dir(), file_name)
+    return manifest
+
+
+def _build_in_background(lock_file):
+    try:
+        build_snapshot()
+    finally:
+        # Closing the file releases its lock
+        lock_file.close()
+        connection.close()
+
+
+def refresh_snapshot(manifest):
+    """
+    Start building a new snapshot in the background if the given one is
+    missing or from an older data generation (at most one build at a time
+    among the processes of the host, the lock is released by a dead process)
+    :param manifest:
+    :return: True if a build was started
+    """
+    if manifest is not None and manifest['generation'] == data_generation():
+        return False
+
+    os.makedirs(snapshots_dir(), exist_ok=True)
+    lock_file = open(build_lock_path(), 'wb')
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock_file.close()
+        return False
+
+    threading.Thread(target=_build_in_background, args=(lock_file,), daemon=True).start()
+    return True
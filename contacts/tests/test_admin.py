@@ -0,0 +1,129 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from contacts.cache import clear_contacts_count
+from contacts.models import Contact, PhoneNumber, AddressField
+
+
+class AdminTest(APITestCase):
+    fixtures = ['initial_data.json']
+
+    def setUp(self):
+        cache.clear()
+        clear_contacts_count()
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'secret'))
+
+    def changelist(self, model_name, query=''):
+        return self.client.get('/admin/contacts/{}/{}'.format(model_name, query))
+
+    def test_changelists(self):
+        """
+        This ensures that the changelist of each model is rendered with the
+        related contacts joined, instead of fetched row by row
+        """
+        for model_name in ('contact', 'phonenumber', 'emailfield', 'addressfield'):
+            with self.subTest(model=model_name), CaptureQueriesContext(connection) as queries:
+                response = self.changelist(model_name)
+
+                self.assertEqual(response.status_code, 200)
+                # The session, the user, the count and the page
+                self.assertLessEqual(len(queries), 4)
+                self.assertIsNone(response.context['cl'].full_result_count)
+
+    def test_contacts_count(self):
+        """
+        This ensures that all the contacts are counted by the cached counter,
+        without counting the table again
+        """
+        self.changelist('contact')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.changelist('contact')
+
+        self.assertEqual(response.context['cl'].result_count, Contact.objects.count())
+        self.assertFalse([query for query in queries if 'COUNT(' in query['sql']])
+
+    @override_settings(CONTACTS_PAGINATION={'PAGE_SIZE': 20, 'MAX_PAGE_SIZE': 100, 'COUNT_CAP': 2})
+    def test_capped_count(self):
+        """
+        This ensures that the other rows are counted up to a cap
+        """
+        response = self.changelist('phonenumber')
+
+        self.assertEqual(PhoneNumber.objects.count(), 4)
+        self.assertEqual(response.context['cl'].result_count, 2)
+
+    def test_search(self):
+        """
+        This ensures that the changelists are searched by prefixes, ignoring
+        case and accents on names and emails
+        """
+        Contact.objects.create(first_name='José', last_name='Silva', date_of_birth='1990-01-01')
+        searches = (
+            ('contact', 'JOSE', ['José Silva']), ('contact', 'mon', ['Marilyn Monroe']),
+            ('phonenumber', '+1 ', ['+1 000 111 2222', '+1 123 456 7890', '+1 321 654 0987']),
+            ('emailfield', 'El', ['elton_john@example.com', 'elvis_presley@example.com']),
+            ('addressfield', '9004', [str(AddressField.objects.get(zip_code='90049'))]),
+        )
+        for model_name, search_term, expected in searches:
+            with self.subTest(model=model_name, search_term=search_term):
+                response = self.client.get('/admin/contacts/{}/'.format(model_name), {'q': search_term})
+
+                self.assertEqual(sorted(map(str, response.context['cl'].result_list)), expected)
+
+    def test_contact_autocomplete(self):
+        """
+        This ensures that the contacts of the foreign keys are autocompleted by name
+        """
+        response = self.client.get('/admin/contacts/contact/autocomplete/', {'term': 'el'})
+
+        self.assertEqual([result['text'] for result in response.json()['results']], ['Elton John', 'Elvis Presley'])
+
+    def test_contact_inlines(self):
+        """
+        This ensures that the phones, emails and addresses of a contact are edited along with it
+        """
+        response = self.client.get('/admin/contacts/contact/1/change/')
+
+        self.assertContains(response, '+44 7911 123456')
+        self.assertContains(response, 'me@eltonjohn.com')
+        self.assertContains(response, '1 Blythe Road')
+
+    def test_add_a_duplicated_address(self):
+        """
+        This ensures that an address the contact already has is rejected by
+        the admin form instead of failing on the unique constraint
+        """
+        data = {
+            'contact': 1, 'address': '1 Blythe Road', 'city': 'London', 'state': 'Hammersmith',
+            'country': 'United Kingdom', 'zip_code': 'W14 0HG',
+        }
+        response = self.client.post('/admin/contacts/addressfield/add/', data)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'This contact already has this address.')
+        self.assertEqual(AddressField.objects.filter(contact_id=1).count(), 1)
+
+        response = self.client.post('/admin/contacts/addressfield/add/', dict(data, contact=2))
+        self.assertEqual(response.status_code, 302)
+
+    def test_add_a_duplicated_address_inline(self):
+        """
+        This ensures that the same address given twice to a contact is rejected by its inlines
+        """
+        address = {'address': '1 Main St', 'city': 'Boston', 'state': 'MA', 'country': 'United States',
+                   'zip_code': '02101'}
+        data = {'first_name': 'Jane', 'last_name': 'Doe', 'date_of_birth': '1990-01-01'}
+        for prefix, total in (('phone_numbers', 0), ('emails', 0), ('addresses', 2)):
+            data.update({'{}-TOTAL_FORMS'.format(prefix): total, '{}-INITIAL_FORMS'.format(prefix): 0})
+        for index in range(2):
+            data.update({'addresses-{}-{}'.format(index, field): value for field, value in address.items()})
+
+        response = self.client.post('/admin/contacts/contact/add/', data)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'The same address is given more than once.')
+        self.assertFalse(Contact.objects.filter(first_name='Jane').exists())
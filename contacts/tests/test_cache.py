@@ -0,0 +1,290 @@
+import os
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from contacts.cache import (
+    adjust_contacts_count, clear_contacts_count, get_or_render_contact, contacts_count, data_generation,
+    generations_dir, increment_generation, normalize_query, search_results, SearchResultCache, SharedCount,
+    SharedCounter, CONTACT_DETAIL_KEY, CONTACTS_COUNT, DATA_GENERATION
+)
+from contacts.models import Contact, PhoneNumber
+from contacts.tests.views.base_contact_view_test import BaseContactViewTest
+
+
+class GetOrRenderContactTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_read_through(self):
+        """
+        This ensures that a contact is rendered once and then served from the cache
+        """
+        calls = []
+
+        def render():
+            calls.append(1)
+            return b'{}'
+
+        self.assertEqual(get_or_render_contact(1, render), b'{}')
+        self.assertEqual(get_or_render_contact(1, render), b'{}')
+        self.assertEqual(len(calls), 1)
+
+    def test_stampede_protection(self):
+        """
+        This ensures that concurrent reads of a cold key trigger a single rebuild
+        """
+        calls = []
+        results = []
+
+        def render():
+            calls.append(1)
+            time.sleep(0.05)
+            return b'{}'
+
+        readers = [threading.Thread(target=lambda: results.append(get_or_render_contact(1, render)))
+                   for _ in range(5)]
+        for reader in readers:
+            reader.start()
+        for reader in readers:
+            reader.join()
+
+        self.assertEqual(results, [b'{}'] * 5)
+        self.assertEqual(len(calls), 1)
+
+
+class ContactDetailsCacheTest(BaseContactViewTest):
+    def test_cached_contact(self):
+        """
+        This ensures that a retrieved contact is stored in the cache
+        """
+        response = self.fetch_contact(self.valid_contact_id)
+
+        self.assertEqual(cache.get(CONTACT_DETAIL_KEY.format(self.valid_contact_id, data_generation())),
+                         response.content)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_invalidate_on_contact_change(self):
+        """
+        This ensures that a cached contact is dropped when the contact changes
+        """
+        self.fetch_contact(self.valid_contact_id)
+        contact = Contact.objects.get(pk=self.valid_contact_id)
+        contact.first_name = 'Reginald'
+        contact.save()
+
+        response = self.fetch_contact(self.valid_contact_id)
+
+        self.assertEqual(response.json()['first_name'], 'Reginald')
+
+    def test_invalidate_on_phone_number_change(self):
+        """
+        This ensures that a cached contact is dropped when one of its phone numbers changes
+        """
+        self.fetch_contact(self.valid_contact_id)
+        PhoneNumber.objects.create(contact_id=self.valid_contact_id, phone='+55 84 9999 9999')
+
+        response = self.fetch_contact(self.valid_contact_id)
+
+        self.assertIn('+55 84 9999 9999', response.json()['phone_numbers'])
+
+    def test_write_of_another_process(self):
+        """
+        This ensures that a contact cached by a process is not served anymore
+        once another process (with its own cache) changed it
+        """
+        first_process_cache, second_process_cache = LocMemCache('first', {}), LocMemCache('second', {})
+        with mock.patch('contacts.cache.cache', first_process_cache):
+            self.fetch_contact(self.valid_contact_id)
+        with mock.patch('contacts.cache.cache', second_process_cache):
+            self.patch_contact(self.valid_contact_id, {'first_name': 'Reginald'})
+
+        with mock.patch('contacts.cache.cache', first_process_cache):
+            response = self.fetch_contact(self.valid_contact_id)
+
+        self.assertEqual(response.json()['first_name'], 'Reginald')
+
+    def test_invalidate_on_contact_removal(self):
+        """
+        This ensures that a removed contact is not served from the cache
+        """
+        self.fetch_contact(self.valid_contact_id)
+        self.remove_contact(self.valid_contact_id)
+
+        response = self.fetch_contact(self.valid_contact_id)
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class SearchResultCacheTest(APITestCase):
+    def test_evict_least_recently_used(self):
+        """
+        This ensures that the least recently used query is evicted when the cache is full
+        """
+        results = SearchResultCache(max_size=2, max_ids=10)
+        results.set('elton', 1, [1])
+        results.set('elvis', 1, [2])
+        results.get('elton', 1)
+        results.set('marilyn', 1, [3])
+
+        self.assertEqual(results.get('elton', 1), [1])
+        self.assertIsNone(results.get('elvis', 1))
+        self.assertEqual(results.get('marilyn', 1), [3])
+
+    def test_bound_the_cached_ids(self):
+        """
+        This ensures that the results are evicted once they hold too many ids
+        in all, and that a result larger than that is not cached
+        """
+        results = SearchResultCache(max_size=10, max_ids=4)
+        results.set('elton', 1, [1, 2])
+        results.set('elvis', 1, [3, 4])
+        results.set('e', 1, [1, 2, 3, 4, 5])
+        results.set('marilyn', 1, [5])
+
+        self.assertIsNone(results.get('elton', 1))
+        self.assertEqual(results.get('elvis', 1), [3, 4])
+        self.assertIsNone(results.get('e', 1))
+        self.assertEqual(results.get('marilyn', 1), [5])
+        self.assertEqual(results.stats()['ids'], 3)
+
+    def test_ignore_older_generations(self):
+        """
+        This ensures that the results cached for an older data generation are misses
+        """
+        results = SearchResultCache(max_size=2, max_ids=10)
+        results.set('elton', 1, [1])
+
+        self.assertIsNone(results.get('elton', 2))
+        self.assertEqual(results.stats()['hits'], 0)
+        self.assertEqual(results.stats()['misses'], 1)
+
+    def test_normalize_query(self):
+        """
+        This ensures that queries differing only by case or accents share an entry
+        """
+        self.assertEqual(normalize_query('ElTon'), normalize_query('elton'))
+        self.assertEqual(normalize_query('JOSÉ'), normalize_query('jose'))
+        self.assertNotEqual(normalize_query('josé'), normalize_query('jos'))
+
+
+class SharedCounterTest(APITestCase):
+    def setUp(self):
+        data_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(data_dir.cleanup)
+        settings_override = override_settings(CONTACTS_DATA_DIR=data_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_shared_generation(self):
+        """
+        This ensures that the data generation moved by another process is seen
+        by this one, and the other way around
+        """
+        generation = data_generation()
+        other_process = SharedCounter(os.path.join(generations_dir(), DATA_GENERATION))
+
+        self.assertEqual(other_process.value(), generation)
+        self.assertEqual(other_process.increment(), generation + 1)
+        self.assertEqual(data_generation(), generation + 1)
+        self.assertEqual(increment_generation(DATA_GENERATION), generation + 2)
+        self.assertEqual(other_process.value(), generation + 2)
+
+    def test_concurrent_increments(self):
+        """
+        This ensures that no increment is lost when several threads bump a generation
+        """
+        generation = data_generation()
+        threads = [
+            threading.Thread(target=lambda: [increment_generation(DATA_GENERATION) for _ in range(100)])
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(data_generation(), generation + 400)
+
+
+class SearchContactsCacheTest(BaseContactViewTest):
+    def setUp(self):
+        super().setUp()
+        search_results.clear()
+
+    def test_cached_search(self):
+        """
+        This ensures that a repeated search is answered from the cache and
+        hydrated with one query per relation
+        """
+        first_response = self.search_contacts('el')
+        with self.assertNumQueries(4):
+            second_response = self.search_contacts('EL')
+
+        self.assertEqual(first_response.json(), second_response.json())
+        self.assertEqual(search_results.stats()['hits'], 1)
+
+    def test_invalidate_on_write(self):
+        """
+        This ensures that a write to the contacts moves the data generation,
+        so the cached results are not used anymore
+        """
+        generation = data_generation()
+        self.search_contacts('reginald')
+        Contact.objects.create(first_name='Reginald', last_name='Dwight', date_of_birth='1947-03-25')
+
+        response = self.search_contacts('reginald')
+
+        self.assertNotEqual(data_generation(), generation)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([contact['first_name'] for contact in response.json()], ['Reginald'])
+
+
+class ContactsCountTest(APITestCase):
+    fixtures = ['initial_data.json']
+
+    def setUp(self):
+        cache.clear()
+        clear_contacts_count()
+
+    def test_contacts_count(self):
+        """
+        This ensures that the contacts are counted once and then read from the counter
+        """
+        self.assertEqual(contacts_count(), 3)
+        with self.assertNumQueries(0):
+            self.assertEqual(contacts_count(), 3)
+
+    def test_count_shared_by_the_processes(self):
+        """
+        This ensures that the changes of the count by another process are read,
+        and that an expired count is counted again
+        """
+        contacts_count()
+        # The count file as opened by another process
+        other_process_count = SharedCount(os.path.join(generations_dir(), CONTACTS_COUNT))
+        other_process_count.add(2)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(contacts_count(), 5)
+        with mock.patch('contacts.cache.time.time', return_value=time.time() + 3600):
+            self.assertEqual(contacts_count(), 3)
+
+    def test_adjust_count_on_commit(self):
+        """
+        This ensures that the count is only adjusted once the write is committed
+        """
+        contacts_count()
+        with mock.patch('contacts.cache.transaction.on_commit') as on_commit:
+            adjust_contacts_count(-1)
+            self.assertEqual(contacts_count(), 3)
+            on_commit.call_args[0][0]()
+
+        self.assertEqual(contacts_count(), 2)
@@ -0,0 +1,72 @@
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+
+from contacts.duplicates import find_duplicate_clusters, name_vector, similarity, ContactRecord
+from contacts.tests.views.base_contact_view_test import BaseContactViewTest
+
+
+class SimilarityTest(APITestCase):
+    def record(self, contact_id, name, date_of_birth='1947-03-25', emails=(), phone_suffixes=()):
+        return ContactRecord(contact_id, name, name_vector(name), date_of_birth, frozenset(emails),
+                             frozenset(phone_suffixes))
+
+    def test_identical_records(self):
+        """
+        This ensures that records with the same information are fully similar
+        """
+        first = self.record(1, 'elton john', emails={'elton@example.com'}, phone_suffixes={'5550104'})
+        second = self.record(2, 'elton john', emails={'elton@example.com'}, phone_suffixes={'5550104'})
+
+        self.assertAlmostEqual(similarity(first, second), 1)
+
+    def test_different_records(self):
+        """
+        This ensures that records without anything in common are not similar
+        """
+        first = self.record(1, 'elton john')
+        second = self.record(2, 'marilyn monroe', date_of_birth='1926-06-01')
+
+        self.assertLess(similarity(first, second), 0.2)
+
+
+class FindDuplicatesTest(BaseContactViewTest):
+    def setUp(self):
+        super().setUp()
+        self.insert_contact('Elton', 'John', '1947-03-25', [{'phone': '+1 202 555 0101'}], ['sir.elton@example.com'],
+                            [])
+        self.insert_contact('Elthon', 'John', '1947-03-25', [{'phone': '+55 84 202 555 0101'}],
+                            ['elthon@example.org'], [])
+
+    def test_find_duplicate_clusters(self):
+        """
+        This ensures that contacts with similar information are grouped
+        together, and that the unrelated ones are not reported
+        """
+        clusters = find_duplicate_clusters()
+        contact_ids = [cluster['contact_ids'] for cluster in clusters]
+
+        self.assertEqual(len(contact_ids), 1)
+        self.assertEqual(len(contact_ids[0]), 3)
+        self.assertIn(1, contact_ids[0])
+
+    def test_duplicates_report(self):
+        """
+        This ensures that the report written by the find_duplicates command is
+        served by the contacts/duplicates endpoint
+        """
+        url = reverse('contacts-duplicates', kwargs={'version': self.current_version})
+        with tempfile.TemporaryDirectory() as data_dir, override_settings(CONTACTS_DATA_DIR=data_dir):
+            self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+
+            call_command('find_duplicates', workers=1, stdout=StringIO())
+            response = self.client.get(url)
+
+        self.assertEqual(len(response.data['clusters']), 1)
+        self.assertFalse(response.data['stale'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
@@ -0,0 +1,50 @@
+from django.test import RequestFactory
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+
+from contactmanager.handlers import APIWSGIHandler, PrefixDispatcher
+from contacts.middleware import ProfilingMiddleware
+from contacts.models import Contact
+
+
+class APIWSGIHandlerTest(APITestCase):
+    def setUp(self):
+        self.handler = APIWSGIHandler()
+        self.factory = RequestFactory()
+
+    def test_api_middleware(self):
+        """
+        This ensures that the API handler serves the API without the session middleware
+        """
+        contact = Contact.objects.create(first_name='Elton', last_name='John', date_of_birth='1947-03-25')
+        request = self.factory.get(reverse('contact-details', kwargs={'version': 'v1', 'contact_id': contact.pk}))
+
+        response = self.handler.get_response(request)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(hasattr(request, 'session'))
+
+    def test_profiling_loads_user(self):
+        """
+        This ensures that the profiling middleware loads the user by itself
+        when the authentication middleware did not run
+        """
+        request = self.factory.get(reverse('contacts-list', kwargs={'version': 'v1'}))
+
+        self.assertFalse(ProfilingMiddleware.get_user(request).is_authenticated)
+        self.assertTrue(hasattr(request, 'session'))
+
+
+class PrefixDispatcherTest(APITestCase):
+    def test_dispatch(self):
+        """
+        This ensures that the requests are passed to the application of their path prefix
+        """
+        dispatcher = PrefixDispatcher(lambda environ, start_response: 'default', {
+            '/contactmanager/': lambda environ, start_response: 'api',
+        })
+
+        self.assertEqual(dispatcher({'PATH_INFO': '/contactmanager/v1/contacts'}, None), 'api')
+        self.assertEqual(dispatcher({'PATH_INFO': '/admin/'}, None), 'default')
+        self.assertEqual(dispatcher({}, None), 'default')
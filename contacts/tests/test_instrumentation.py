@@ -0,0 +1,92 @@
+from datetime import date
+
+from django.db import connection
+from django.test import override_settings
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+
+from contacts.instrumentation import explain, full_scans, recent_slow_queries, record_queries
+from contacts.models import Contact, EmailField
+
+
+class QueryPlanTest(APITestCase):
+    def test_explain(self):
+        """
+        This ensures that the plan of a query is given by the database
+        """
+        sql, params = Contact.objects.filter(first_name__icontains='elton').query.sql_with_params()
+
+        plan = explain(connection, sql, params)
+
+        self.assertEqual(full_scans(plan), ['contacts_contact'])
+        self.assertIsNone(explain(connection, 'INSERT INTO contacts_contact DEFAULT VALUES', ()))
+
+    def test_full_scans(self):
+        """
+        This ensures that only the scans (not the index searches) of the
+        contacts tables are flagged
+        """
+        plan = [
+            'SCAN contacts_contact',
+            'SCAN TABLE contacts_emailfield AS U0',
+            'SEARCH contacts_phonenumber USING INDEX contacts_phonenumber_contact_id (contact_id=?)',
+            'SCAN contacts_addressfield USING COVERING INDEX contact_address_idx',
+            'SEARCH contacts_addressfield USING INDEX contact_address_idx (contact_id=?)',
+            'SCAN auth_user',
+            'Seq Scan on contacts_phonenumber  (cost=0.00..1.01 rows=1 width=40)',
+        ]
+
+        self.assertEqual(full_scans(plan), [
+            'contacts_addressfield', 'contacts_contact', 'contacts_emailfield', 'contacts_phonenumber'
+        ])
+
+    def test_full_scans_of_aliased_tables(self):
+        """
+        This ensures that the scans of the tables aliased in subqueries are flagged
+        """
+        queryset = Contact.objects.filter(pk__in=EmailField.objects.filter(email__contains='@').values('contact_id'))
+        sql, params = queryset.query.sql_with_params()
+
+        self.assertEqual(full_scans(['SCAN U0'], sql), ['contacts_emailfield'])
+        self.assertEqual(full_scans(explain(connection, sql, params), sql), ['contacts_emailfield'])
+
+    def test_record_queries(self):
+        """
+        This ensures that the queries run inside the context are recorded
+        """
+        with record_queries() as recorder:
+            Contact.objects.filter(first_name='Elton').exists()
+
+        self.assertEqual(len(recorder.queries), 1)
+        self.assertEqual(recorder.queries[0]['params'], ['Elton'])
+
+
+class SlowQueryLogTest(APITestCase):
+    def setUp(self):
+        Contact.objects.create(first_name='Elton', last_name='John', date_of_birth=date(1947, date.today().month, 1))
+        # The birthdays of a month are found by scanning the contacts
+        self.url = reverse('contacts-birthdays', kwargs={'version': 'v1'})
+
+    @override_settings(CONTACTS_SLOW_QUERIES={'THRESHOLD_MS': 0, 'SAMPLE_RATE': 1.0, 'RECENT': 100})
+    def test_log_slow_query(self):
+        """
+        This ensures that a slow query is logged with its call site and plan,
+        as a warning when it scans a contacts table
+        """
+        with self.assertLogs('contacts.slow_queries', 'WARNING') as logs:
+            self.client.get(self.url)
+
+        self.assertIn('contacts.views.contacts.BirthdaysView', logs.output[0])
+        self.assertIn('[FULL SCAN of contacts_contact', logs.output[0])
+        self.assertEqual(recent_slow_queries()[-1]['call_site'], 'contacts.views.contacts.BirthdaysView')
+
+    @override_settings(CONTACTS_SLOW_QUERIES={'THRESHOLD_MS': 0, 'SAMPLE_RATE': 0, 'RECENT': 100})
+    def test_sampled_out_slow_query(self):
+        """
+        This ensures that the slow queries out of the sample are not logged
+        """
+        logged = len(recent_slow_queries())
+
+        self.client.get(self.url)
+
+        self.assertEqual(len(recent_slow_queries()), logged)
@@ -0,0 +1,255 @@
+import json
+import os
+import socket
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+
+from contacts.jobs import (
+    claim_job, enqueue, enqueue_periodic_jobs, purge_finished_jobs, requeue_orphaned_jobs, run_job, work, Progress
+)
+from contacts.models import Contact, PhoneNumber, EmailField, AddressField, Job
+from contacts.tests.views.base_contact_view_test import BaseContactViewTest
+
+
+def failing_job(progress):
+    raise RuntimeError('Something went wrong')
+
+
+@mock.patch.dict('contacts.jobs._handlers', {'test_failure': failing_job})
+class JobQueueTest(APITestCase):
+    fixtures = ['initial_data.json']
+
+    def test_enqueue(self):
+        """
+        This ensures that a queued job is reused for the same kind and arguments
+        """
+        job = enqueue('find_duplicates', {'threshold': 0.9})
+
+        self.assertEqual(enqueue('find_duplicates', {'threshold': 0.9}), job)
+        self.assertNotEqual(enqueue('find_duplicates', {'threshold': 0.8}), job)
+        self.assertEqual(json.loads(job.arguments), {'threshold': 0.9})
+        with self.assertRaises(ValueError):
+            enqueue('unknown')
+
+    def test_claim_job(self):
+        """
+        This ensures that the queued jobs are claimed once, the oldest first
+        """
+        first_job = enqueue('build_snapshot')
+        second_job = enqueue('rebuild_search_keys')
+
+        claimed = [claim_job('first-worker'), claim_job('second-worker'), claim_job('first-worker')]
+
+        self.assertEqual([claimed[0].pk, claimed[1].pk], [first_job.pk, second_job.pk])
+        self.assertEqual((claimed[0].status, claimed[0].worker), (Job.RUNNING, 'first-worker'))
+        self.assertIsNotNone(claimed[0].started_at)
+        self.assertIsNone(claimed[2])
+
+    def test_run_job(self):
+        """
+        This ensures that a job stores its result and finishes with full progress
+        """
+        Contact.objects.update(first_name_phonetic='', last_name_phonetic='')
+        enqueue('rebuild_search_keys')
+
+        job = run_job(claim_job('worker'))
+
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertEqual(json.loads(job.result), {'contacts': 3, 'updated': 3})
+        self.assertEqual(job.progress, 1)
+        self.assertIsNotNone(job.finished_at)
+        for contact in Contact.objects.all():
+            for field, value in Contact.search_keys(contact.first_name, contact.last_name).items():
+                self.assertEqual(getattr(contact, field), value)
+
+    def test_run_failing_job(self):
+        """
+        This ensures that the error of a failed job is stored
+        """
+        enqueue('test_failure')
+
+        job = run_job(claim_job('worker'))
+
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertIn('Something went wrong', Job.objects.get(pk=job.pk).error)
+
+    def test_work(self):
+        """
+        This ensures that a burst worker runs the queued jobs and returns
+        """
+        enqueue('rebuild_search_keys')
+        enqueue('test_failure')
+
+        self.assertEqual(work('worker', burst=True), 2)
+        self.assertFalse(Job.objects.exclude(status__in=(Job.SUCCEEDED, Job.FAILED)).exists())
+
+    def test_progress(self):
+        """
+        This ensures that the progress updates are throttled
+        """
+        job = enqueue('rebuild_search_keys')
+        progress = Progress(job.pk, interval=60)
+
+        progress(1, 4)
+        progress(3, 4)
+
+        self.assertEqual(Job.objects.get(pk=job.pk).progress, 0.25)
+
+    def test_requeue_orphaned_jobs(self):
+        """
+        This ensures that only the jobs of the dead workers are queued again
+        """
+        dead_worker = '{}:{}'.format(socket.gethostname(), 2 ** 22 + 1)
+        live_worker = '{}:{}'.format(socket.gethostname(), os.getpid())
+        orphaned = Job.objects.create(kind='build_snapshot', status=Job.RUNNING, worker=dead_worker)
+        running = Job.objects.create(kind='build_snapshot', status=Job.RUNNING, worker=live_worker)
+
+        self.assertEqual(requeue_orphaned_jobs(), 1)
+        self.assertEqual(Job.objects.get(pk=orphaned.pk).status, Job.QUEUED)
+        self.assertEqual(Job.objects.get(pk=running.pk).status, Job.RUNNING)
+
+    def test_purge_finished_jobs(self):
+        """
+        This ensures that only the jobs finished before the retention period are removed
+        """
+        old_job = Job.objects.create(kind='build_snapshot', status=Job.SUCCEEDED,
+                                     finished_at=timezone.now() - timedelta(days=30))
+        recent_job = Job.objects.create(kind='build_snapshot', status=Job.SUCCEEDED, finished_at=timezone.now())
+        queued_job = enqueue('rebuild_search_keys')
+
+        self.assertEqual(purge_finished_jobs(), 1)
+        self.assertFalse(Job.objects.filter(pk=old_job.pk).exists())
+        self.assertEqual(Job.objects.filter(pk__in=(recent_job.pk, queued_job.pk)).count(), 2)
+
+    def test_enqueue_periodic_jobs(self):
+        """
+        This ensures that a periodic job is queued again only once its interval
+        has passed, even when its last run is finished
+        """
+        first_jobs = enqueue_periodic_jobs()
+        self.assertEqual([job.kind for job in first_jobs], ['purge_deleted_contacts'])
+        Job.objects.filter(pk=first_jobs[0].pk).update(status=Job.SUCCEEDED, finished_at=timezone.now())
+        self.assertEqual(enqueue_periodic_jobs(), [])
+
+        Job.objects.filter(pk=first_jobs[0].pk).update(created_at=timezone.now() - timedelta(hours=2))
+        second_jobs = enqueue_periodic_jobs()
+
+        self.assertEqual([job.kind for job in second_jobs], ['purge_deleted_contacts'])
+        self.assertNotEqual(second_jobs[0].pk, first_jobs[0].pk)
+
+    @override_settings(CONTACTS_DELETION={'RETENTION_DAYS': 30, 'PURGE_BATCH_SIZE': 1})
+    def test_purge_deleted_contacts(self):
+        """
+        This ensures that the contacts deleted before the retention period are
+        removed with their phones, emails and addresses, in batches
+        """
+        Contact.all_objects.filter(pk__in=(1, 3)).update(deleted_at=timezone.now() - timedelta(days=31))
+        Contact.all_objects.filter(pk=2).update(deleted_at=timezone.now())
+
+        job = run_job(enqueue('purge_deleted_contacts'))
+
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertEqual(json.loads(job.result), {'contacts': 2})
+        self.assertEqual(list(Contact.all_objects.values_list('pk', flat=True)), [2])
+        for model in (PhoneNumber, EmailField, AddressField):
+            self.assertEqual(set(model.objects.values_list('contact_id', flat=True)), {2})
+
+
+class JobViewsTest(BaseContactViewTest):
+    def setUp(self):
+        super().setUp()
+        self.data_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.data_dir.cleanup)
+        settings_override = override_settings(CONTACTS_DATA_DIR=self.data_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def url(self, name, **kwargs):
+        return reverse(name, kwargs={'version': self.current_version, **kwargs})
+
+    def test_queue_duplicates_report(self):
+        """
+        This ensures that asking for a duplicates report queues a job, whose
+        status is then available at the returned location
+        """
+        response = self.client.post(self.url('contacts-duplicates'), {'threshold': 0.9}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.json()['status'], Job.QUEUED)
+        self.assertTrue(response['Location'].endswith(self.url('job-details', job_id=response.json()['id'])))
+
+        work('worker', burst=True)
+        job_response = self.client.get(response['Location'])
+
+        self.assertEqual(job_response.status_code, status.HTTP_200_OK)
+        self.assertEqual(job_response.json()['status'], Job.SUCCEEDED)
+        self.assertEqual(job_response.json()['arguments'], {'threshold': 0.9})
+        self.assertEqual(self.client.get(self.url('contacts-duplicates')).status_code, status.HTTP_200_OK)
+
+    def test_queue_invalid_duplicates_report(self):
+        """
+        This ensures that the options of a duplicates report are validated
+        """
+        response = self.client.post(self.url('contacts-duplicates'), {'threshold': 2}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Job.objects.exists())
+
+    def test_queue_export(self):
+        """
+        This ensures that building a new export is queued as a job
+        """
+        response = self.client.post(self.url('contacts-export'))
+        work('worker', burst=True)
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(Job.objects.get(pk=response.json()['id']).status, Job.SUCCEEDED)
+        self.assertEqual(self.client.get(self.url('contacts-export')).status_code, status.HTTP_200_OK)
+
+    def test_queue_job(self):
+        """
+        This ensures that a job of a known kind can be queued directly
+        """
+        response = self.client.post(self.url('jobs-list'), {'kind': 'rebuild_search_keys'}, format='json')
+        invalid_response = self.client.post(self.url('jobs-list'), {'kind': 'unknown'}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(invalid_response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([job['id'] for job in self.client.get(self.url('jobs-list')).json()], [response.json()['id']])
+
+    def test_queue_job_with_invalid_arguments(self):
+        """
+        This ensures that the arguments of a job are validated for its kind,
+        whatever their names
+        """
+        url = self.url('jobs-list')
+        for kind, arguments in (
+            ('find_duplicates', {'kind': 1}),
+            ('find_duplicates', {'threshold': 'high'}),
+            ('find_duplicates', {'progress': 1}),
+            ('rebuild_search_keys', {'batch_size': 10}),
+        ):
+            response = self.client.post(url, {'kind': kind, 'arguments': arguments}, format='json')
+
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, arguments)
+            self.assertIn('arguments', response.json())
+        self.assertFalse(Job.objects.exists())
+
+        response = self.client.post(url, {'kind': 'find_duplicates', 'arguments': {'window': 10}}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.json()['arguments'], {'window': 10})
+
+    def test_unknown_job(self):
+        """
+        This ensures that an unknown job is not found
+        """
+        response = self.client.get(self.url('job-details', job_id=42))
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
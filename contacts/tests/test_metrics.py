@@ -0,0 +1,146 @@
+import os
+import tempfile
+
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+
+from contacts import metrics
+from contacts.metrics import MmapValues, metrics_dir
+
+# No process has this pid (above the maximum pid of Linux)
+EXITED_PID = 1 << 23
+
+
+class MetricsTestMixin:
+    def setUp(self):
+        super().setUp()
+        data_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(data_dir.cleanup)
+        settings_override = override_settings(CONTACTS_DATA_DIR=data_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(metrics.clear)
+        os.makedirs(metrics_dir())
+
+    def process_values(self, pid):
+        values = MmapValues(os.path.join(metrics_dir(), '{}.db'.format(pid)))
+        self.addCleanup(values.close)
+        return values
+
+
+class MmapValuesTest(MetricsTestMixin, APITestCase):
+    def test_values(self):
+        """
+        This ensures that the values written by a process are read back from its file
+        """
+        values = self.process_values(os.getpid())
+        values.inc('requests')
+        values.inc('requests', 2)
+        values.set('in_flight', 5)
+
+        self.assertEqual(MmapValues.read(values.path), [('requests', 3), ('in_flight', 5)])
+
+    def test_file_grows(self):
+        """
+        This ensures that the file grows when its entries do not fit anymore
+        """
+        values = self.process_values(os.getpid())
+        for i in range(5000):
+            values.inc('a long key to fill the file {}'.format(i), i)
+
+        self.assertEqual(len(MmapValues.read(values.path)), 5000)
+        self.assertEqual(dict(MmapValues.read(values.path))['a long key to fill the file 4999'], 4999)
+
+    def test_reopen_file(self):
+        """
+        This ensures that the values of a file are kept when it is opened again
+        """
+        values = self.process_values(os.getpid())
+        values.inc('requests', 2)
+        values.close()
+
+        values = self.process_values(os.getpid())
+        values.inc('requests')
+
+        self.assertEqual(MmapValues.read(values.path), [('requests', 3)])
+
+
+class MetricsTest(MetricsTestMixin, APITestCase):
+    def test_aggregate_processes(self):
+        """
+        This ensures that the counters of all the processes are summed, and
+        only the gauges of the live ones
+        """
+        metrics.REQUESTS.inc(route='contacts-list', method='GET', status=200)
+        metrics.REQUESTS_IN_FLIGHT.inc()
+        exited_process = self.process_values(EXITED_PID)
+        exited_process.inc(metrics.REQUESTS.key({'route': 'contacts-list', 'method': 'GET', 'status': 200}), 2)
+        exited_process.inc(metrics.REQUESTS_IN_FLIGHT.key({}), 4)
+
+        output = metrics.render()
+
+        self.assertIn('contacts_http_requests_total{route="contacts-list",method="GET",status="200"} 3\n', output)
+        self.assertIn('contacts_http_requests_in_flight 1\n', output)
+
+    def test_compact_exited_processes(self):
+        """
+        This ensures that the files of the exited processes are merged into
+        one, without their gauges, and that their counters are still exposed
+        """
+        key = metrics.REQUESTS.key({'route': 'contacts-list', 'method': 'GET', 'status': 200})
+        for pid in (EXITED_PID, EXITED_PID + 1):
+            exited_process = self.process_values(pid)
+            exited_process.inc(key, 2)
+            exited_process.inc(metrics.REQUESTS_IN_FLIGHT.key({}), 4)
+
+        self.assertEqual(metrics.compact(), 2)
+        self.assertEqual(sorted(os.listdir(metrics_dir())), [metrics.EXITED_FILE, 'files.lock'])
+        self.assertEqual(MmapValues.read(os.path.join(metrics_dir(), metrics.EXITED_FILE)), [(key, 4)])
+        self.assertEqual(metrics.compact(), 0)
+        self.assertIn('contacts_http_requests_total{route="contacts-list",method="GET",status="200"} 4\n',
+                      metrics.render())
+
+    def test_histogram(self):
+        """
+        This ensures that the histogram buckets are exposed cumulatively
+        """
+        for duration in (0.003, 0.02, 0.02, 30):
+            metrics.REQUEST_DURATION.observe(duration, route='contacts-list', method='GET')
+
+        output = metrics.render()
+
+        prefix = 'contacts_http_request_duration_seconds_bucket{route="contacts-list",method="GET",le='
+        self.assertIn(prefix + '"0.005"} 1\n', output)
+        self.assertIn(prefix + '"0.01"} 1\n', output)
+        self.assertIn(prefix + '"0.025"} 3\n', output)
+        self.assertIn(prefix + '"10.0"} 3\n', output)
+        self.assertIn(prefix + '"+Inf"} 4\n', output)
+        self.assertIn('contacts_http_request_duration_seconds_count{route="contacts-list",method="GET"} 4\n', output)
+
+    def test_cache_hit_ratio(self):
+        """
+        This ensures that the hit ratio of each cache is computed from its lookups
+        """
+        metrics.CACHE_LOOKUPS.inc(3, cache='search', result='hit')
+        metrics.CACHE_LOOKUPS.inc(cache='search', result='miss')
+
+        self.assertIn('contacts_cache_hit_ratio{cache="search"} 0.75\n', metrics.render())
+
+    def test_metrics_view(self):
+        """
+        This ensures that the requests served are exposed in the Prometheus text format
+        """
+        self.client.get(reverse('contacts-list', kwargs={'version': 'v1'}))
+
+        response = self.client.get(reverse('metrics'))
+        output = response.content.decode()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        self.assertIn('# TYPE contacts_http_request_duration_seconds histogram\n', output)
+        self.assertIn('contacts_http_requests_total{route="contacts-list",method="GET",status="200"} 1\n', output)
+        self.assertIn('contacts_db_queries_total{route="contacts-list"} 1\n', output)
+        # The request being served
+        self.assertIn('contacts_http_requests_in_flight 1\n', output)
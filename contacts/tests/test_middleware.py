@@ -0,0 +1,171 @@
+import os
+import tempfile
+import threading
+
+from django.contrib.auth.models import User
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+
+from contacts.middleware import AdmissionGate, AdmissionControlMiddleware, admission_stats, profiles_dir, _gates
+
+
+class AdmissionGateTest(APITestCase):
+    def test_admit_until_concurrency_limit(self):
+        """
+        This ensures that requests are admitted while there are free slots
+        and shed when both the slots and the queue are full
+        """
+        gate = AdmissionGate('search', concurrency=2, queue_size=0, timeout=0.01)
+
+        self.assertTrue(gate.acquire())
+        self.assertTrue(gate.acquire())
+        self.assertFalse(gate.acquire())
+        self.assertEqual(gate.stats()['in_flight'], 2)
+        self.assertEqual(gate.stats()['shed'], 1)
+
+    def test_queued_request_expires(self):
+        """
+        This ensures that a queued request is shed when its deadline expires
+        """
+        gate = AdmissionGate('search', concurrency=1, queue_size=1, timeout=0.01)
+        gate.acquire()
+
+        self.assertFalse(gate.acquire())
+        self.assertEqual(gate.stats()['queued'], 0)
+        self.assertEqual(gate.stats()['shed'], 1)
+
+    def test_queued_request_is_admitted_on_release(self):
+        """
+        This ensures that a queued request takes the slot released by another one
+        """
+        gate = AdmissionGate('search', concurrency=1, queue_size=1, timeout=5)
+        gate.acquire()
+        results = []
+
+        waiter = threading.Thread(target=lambda: results.append(gate.acquire()))
+        waiter.start()
+        while gate.stats()['queued'] == 0:
+            pass
+        gate.release()
+        waiter.join()
+
+        self.assertEqual(results, [True])
+        self.assertEqual(gate.stats()['in_flight'], 1)
+
+
+class AdmissionControlMiddlewareTest(APITestCase):
+    def setUp(self):
+        _gates.clear()
+        self.addCleanup(_gates.clear)
+        self.factory = RequestFactory()
+        self.middleware = AdmissionControlMiddleware(lambda request: HttpResponse())
+
+    def test_route_classes(self):
+        """
+        This ensures that requests are classified by the name of their route
+        """
+        self.assertEqual(self.middleware.route_class(self.factory.get('/contactmanager/v1/contacts/search')), 'search')
+        self.assertEqual(self.middleware.route_class(self.factory.get('/contactmanager/v1/contacts/1')), 'normal')
+        self.assertEqual(self.middleware.route_class(self.factory.get('/nonexistent')), 'normal')
+
+    def test_shed_request(self):
+        """
+        This ensures that a request over the limit gets a 503 with a Retry-After header
+        """
+        gate = self.middleware.gates['search']
+        for _ in range(gate.concurrency):
+            gate.acquire()
+        gate.queue_size = 0
+
+        response = self.middleware(self.factory.get('/contactmanager/v1/contacts/search'))
+
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertEqual(admission_stats()['search']['shed'], 1)
+
+    def test_release_slot_after_response(self):
+        """
+        This ensures that the slot of a request is released once it is answered
+        """
+        response = self.middleware(self.factory.get('/contactmanager/v1/contacts/search'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(admission_stats()['search']['in_flight'], 0)
+        self.assertEqual(admission_stats()['search']['admitted'], 1)
+
+
+class ProfilingMiddlewareTest(APITestCase):
+    def setUp(self):
+        data_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(data_dir.cleanup)
+        settings_override = override_settings(CONTACTS_DATA_DIR=data_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.url = reverse('contacts-list', kwargs={'version': 'v1'})
+        self.staff_user = User.objects.create_user('staff', password='secret', is_staff=True)
+        self.user = User.objects.create_user('user', password='secret')
+
+    def test_profile_request_of_staff_user(self):
+        """
+        This ensures that a staff user asking for a profile gets the report
+        of the request, with its SQL queries, instead of its response
+        """
+        self.client.force_login(self.staff_user)
+
+        response = self.client.get(self.url, {'_profile': '1'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['status'], status.HTTP_200_OK)
+        self.assertTrue(any('contacts_contact' in query['sql'] for query in response.json()['queries']))
+        self.assertTrue(response.json()['profile'])
+        self.assertTrue(os.path.exists(os.path.join(profiles_dir(), response.json()['profile_file'])))
+
+    def test_profile_header(self):
+        """
+        This ensures that a profile can also be asked for with a header
+        """
+        self.client.force_login(self.staff_user)
+
+        response = self.client.get(self.url, HTTP_X_PROFILE='1')
+
+        self.assertIn('profile', response.json())
+
+    def test_no_profile_for_other_users(self):
+        """
+        This ensures that anonymous and non-staff users get the regular response
+        """
+        response = self.client.get(self.url, {'_profile': '1'})
+        self.assertEqual(response.json(), [])
+
+        self.client.force_login(self.user)
+        response = self.client.get(self.url, {'_profile': '1'})
+        self.assertEqual(response.json(), [])
+
+
+class MonitoringViewTest(APITestCase):
+    def setUp(self):
+        self.url = reverse('monitoring', kwargs={'version': 'v1'})
+
+    def test_admission_stats(self):
+        """
+        This ensures that the admission gates are exposed by the monitoring endpoint
+        """
+        self.client.force_authenticate(User.objects.create_user('staff', password='secret', is_staff=True))
+        response = self.client.get(self.url)
+
+        self.assertEqual(set(response.data['admission']), {'search', 'bulk', 'normal'})
+        self.assertEqual(response.data['admission']['normal']['in_flight'], 1)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_denied_to_other_users(self):
+        """
+        This ensures that the runtime statistics are not served to anonymous and non-staff users
+        """
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(User.objects.create_user('user', password='secret'))
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_403_FORBIDDEN)
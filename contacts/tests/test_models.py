@@ -1,4 +1,5 @@
 from datetime import date
+from django.db import IntegrityError, transaction
 from django.template.base import kwarg_re
 
 from rest_framework.test import APITestCase
@@ -23,6 +24,21 @@ class ContactModelTest(APITestCase):
         self.assertEqual(date(1980, 10, 5), self.created_contact.date_of_birth)
         self.assertEqual('John Doe', str(self.created_contact))
 
+    def test_contact_search_keys(self):
+        """
+        Ensure that the derived search keys follow the name, also on partial updates
+        """
+        self.assertEqual('J500', self.created_contact.first_name_phonetic)
+        self.assertEqual('D000', self.created_contact.last_name_phonetic)
+        self.assertEqual('john', self.created_contact.first_name_key)
+
+        self.created_contact.last_name = 'Smith'
+        self.created_contact.save(update_fields=['last_name'])
+        self.created_contact.refresh_from_db()
+
+        self.assertEqual('S530', self.created_contact.last_name_phonetic)
+        self.assertEqual('smith', self.created_contact.last_name_key)
+
 
 class PhoneNumberModelTest(APITestCase):
     def setUp(self):
@@ -101,3 +117,22 @@ class AddressFieldModelTest(APITestCase):
         self.assertEqual(self.sample_address['zip_code'], self.created_address.zip_code)
         formatted_address = '{}, {} - {}, {}, {}'.format(*self.sample_address.values())
         self.assertEqual(formatted_address, str(self.created_address))
+
+    def test_address_field_content_hash(self):
+        """
+        Ensure that the content hash follows the address, also on partial
+        updates, and that the addresses of a contact are unique by it
+        """
+        self.created_address.city = 'Salem'
+        self.created_address.save(update_fields=['city'])
+        salem_hash = AddressField.objects.get(pk=self.created_address.pk).content_hash
+        self.created_address.city = 'Portland'
+        self.created_address.save(update_fields=['city'])
+
+        self.assertNotEqual(salem_hash, self.created_address.content_hash)
+        self.assertEqual(AddressField.objects.get(pk=self.created_address.pk).content_hash,
+                         self.created_address.content_hash)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            AddressField.objects.create(contact=self.created_contact, **{
+                **self.sample_address, 'address': ' 1722 Heron Way ',
+            })
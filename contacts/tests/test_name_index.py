@@ -0,0 +1,78 @@
+import os
+import tempfile
+from unittest import mock
+
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from contacts.cache import generations_dir, SharedCounter, NAMES_GENERATION
+from contacts.name_index import NameIndex
+
+
+class NameIndexTest(APITestCase):
+    fixtures = ['initial_data.json']
+
+    def setUp(self):
+        data_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(data_dir.cleanup)
+        settings_override = override_settings(CONTACTS_DATA_DIR=data_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.index = NameIndex()
+
+    def test_build_on_first_search(self):
+        """
+        This ensures that the index is loaded from the database on the first lookup
+        """
+        self.assertEqual(self.index.search('marilyn', 10), [(3, 'Marilyn', 'Monroe')])
+
+    def test_search_full_names(self):
+        """
+        This ensures that a prefix of several words matches the full names
+        ("first last") on their own keys, once per contact
+        """
+        self.assertEqual(self.index.search('elton j', 10), [(1, 'Elton', 'John')])
+        self.assertEqual(self.index.search('Marilyn Monroe', 10), [(3, 'Marilyn', 'Monroe')])
+        self.assertEqual(self.index.search('elton p', 10), [])
+        self.assertEqual(self.index.search('el', 10), [(1, 'Elton', 'John'), (2, 'Elvis', 'Presley')])
+        self.assertEqual(self.index._keys.count('elvis presley'), 1)
+
+    def test_contact_saved(self):
+        """
+        This ensures that a saved contact replaces its previous names in the index
+        """
+        self.index.search('elton', 10)
+        self.index.contact_saved(1, 'Reginald', 'Dwight')
+
+        self.assertEqual(self.index.search('elton', 10), [])
+        self.assertEqual(self.index.search('dwi', 10), [(1, 'Reginald', 'Dwight')])
+        self.assertEqual(self.index.search('reginald d', 10), [(1, 'Reginald', 'Dwight')])
+        self.assertNotIn('elton john', self.index._keys)
+
+    def test_contact_deleted(self):
+        """
+        This ensures that a removed contact is dropped from the index
+        """
+        self.index.search('elton', 10)
+        self.index.contact_deleted(1)
+
+        self.assertEqual(self.index.search('el', 10), [(2, 'Elvis', 'Presley')])
+
+    @override_settings(CONTACTS_AUTOCOMPLETE={'LIMIT': 10, 'MAX_LIMIT': 50, 'MAX_STALENESS': 0})
+    def test_write_of_another_process(self):
+        """
+        This ensures that the writes of this process keep the index current,
+        while a write of another process triggers a rebuild
+        """
+        self.index.search('elton', 10)
+        self.index.contact_saved(1, 'Reginald', 'Dwight')
+        with mock.patch('contacts.name_index.threading.Thread') as thread:
+            self.index.search('dwi', 10)
+        thread.assert_not_called()
+
+        SharedCounter(os.path.join(generations_dir(), NAMES_GENERATION)).increment()
+        self.index.contact_deleted(2)
+        with mock.patch('contacts.name_index.threading.Thread') as thread:
+            self.assertEqual(self.index.search('dwi', 10), [(1, 'Reginald', 'Dwight')])
+
+        thread.return_value.start.assert_called_once_with()
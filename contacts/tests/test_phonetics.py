@@ -0,0 +1,40 @@
+from rest_framework.test import APITestCase
+
+from contacts.phonetics import soundex, edit_distance
+
+
+class SoundexTest(APITestCase):
+    def test_similar_names(self):
+        """
+        This ensures that names that sound alike share the same code
+        """
+        self.assertEqual(soundex('Smith'), 'S530')
+        self.assertEqual(soundex('Smyth'), 'S530')
+        self.assertEqual(soundex('Jon'), soundex('John'))
+        self.assertEqual(soundex('Robert'), soundex('Rupert'))
+
+    def test_letters_separated_by_h_or_w(self):
+        """
+        This ensures that 'h' and 'w' do not split letters with the same code
+        """
+        self.assertEqual(soundex('Ashcraft'), 'A261')
+        self.assertEqual(soundex('Pfister'), 'P236')
+
+    def test_accents_and_empty_names(self):
+        """
+        This ensures that accents are ignored and names without letters have no code
+        """
+        self.assertEqual(soundex('José'), soundex('Jose'))
+        self.assertEqual(soundex(''), '')
+        self.assertEqual(soundex('123'), '')
+
+
+class EditDistanceTest(APITestCase):
+    def test_edit_distance(self):
+        """
+        This ensures that the distance counts insertions, deletions and substitutions
+        """
+        self.assertEqual(edit_distance('kitten', 'sitting'), 3)
+        self.assertEqual(edit_distance('jon', 'john'), 1)
+        self.assertEqual(edit_distance('', 'abc'), 3)
+        self.assertEqual(edit_distance('smith', 'smith'), 0)
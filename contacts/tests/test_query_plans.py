@@ -0,0 +1,388 @@
+import re
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+
+from contacts import urls
+from contacts.instrumentation import explain, full_scans, TABLE_ALIAS_RE
+from contacts.jobs import enqueue
+from contacts.models import Contact, PhoneNumber, EmailField, AddressField
+from contacts.name_index import name_index
+from contacts.seeding import seed_contacts
+from contacts.snapshots import build_snapshot
+
+SEEDED_CONTACTS = 3000
+NEW_ADDRESS = {
+    'address': '1 Main St', 'city': 'London', 'state': 'England', 'country': 'United Kingdom', 'zip_code': 'SW1 1AA'
+}
+
+
+# "ORDER BY "t"."a" ASC, "t"."b" ASC LIMIT 10", the columns of the ordering
+ORDER_BY_RE = re.compile(r' ORDER BY (.+?) LIMIT ')
+ORDER_BY_COLUMN_RE = re.compile(r'"(\w+)"(?: (?:ASC|DESC))?$')
+# "SCAN TABLE t USING COVERING INDEX i" (the table alone is a scan in the order of its rowid)
+SCAN_RE = re.compile(r'^SCAN (?:TABLE )?"?(\w+)"?(?: AS \w+)?(?: USING (?:COVERING )?INDEX (\w+))?')
+
+
+def index_columns(index):
+    """
+    Columns of the order of a SQLite index, which ends with the rowid (the id)
+    """
+    if index is None:
+        return ['id']
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA index_info({})'.format(connection.ops.quote_name(index)))
+        return [row[2] for row in sorted(cursor.fetchall())] + ['id']
+
+
+def unbounded_scans(sql, plan):
+    """
+    Contacts tables fully scanned by a statement, a scan stopped by a LIMIT
+    in the order of the index it reads (i.e. reading a page) is not a full scan
+    """
+    scans = full_scans(plan, sql)
+    order_by = ORDER_BY_RE.search(sql)
+    if not scans or order_by is None or any('FOR ORDER BY' in line for line in plan or ()):
+        return scans
+
+    ordering = [ORDER_BY_COLUMN_RE.search(term.strip()) for term in order_by.group(1).split(', ')]
+    if None in ordering:
+        return scans
+    ordering = [match.group(1) for match in ordering]
+    aliases = {alias: table for table, alias in TABLE_ALIAS_RE.findall(sql)}
+    paged = set()
+    for line in plan:
+        match = SCAN_RE.search(line.strip())
+        if match and index_columns(match.group(2))[:len(ordering)] == ordering:
+            paged.add(aliases.get(match.group(1), match.group(1)))
+    return [table for table in scans if table not in paged]
+
+
+class QueryPlanRegressionTest(APITestCase):
+    """
+    Query budget and query plans of every endpoint, on a seeded address book.
+
+    Each route of `contacts.urls` has a `test_<route name>` method making its
+    requests: they must not run more than the given number of queries, and
+    none of these queries may scan a whole contacts table (but the ones the
+    request is expected to scan). The failures show the offending statements
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_contacts(SEEDED_CONTACTS, seed=46)
+        # A phone and an email of contacts having several, so that they can be removed
+        cls.phone = PhoneNumber.objects.filter(contact__in=cls.contacts_with_several('phone_numbers')).first()
+        cls.email = EmailField.objects.filter(contact__in=cls.contacts_with_several('emails')).first()
+        cls.address = AddressField.objects.order_by('id').first()
+
+    @staticmethod
+    def contacts_with_several(relation):
+        return Contact.objects.annotate(count=Count(relation)).filter(count__gt=1).values('id')
+
+    def setUp(self):
+        cache.clear()
+        name_index.clear()
+        self.data_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.data_dir.cleanup)
+        settings_override = override_settings(CONTACTS_DATA_DIR=self.data_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    @staticmethod
+    def url(name, query='', **kwargs):
+        return reverse(name, kwargs={'version': 'v1', **kwargs}) + query
+
+    def assertQueries(self, max_queries, method, url, data=None, expected_scans=()):
+        """
+        Make a request and check the number and the plans of its queries
+        :param max_queries:
+        :param method: name of the test client method (e.g. 'get')
+        :param url:
+        :param data: JSON body of the request
+        :param expected_scans: contacts tables the request is expected to scan
+        :return: the response
+        """
+        statements = []
+
+        def record(execute, sql, params, many, context):
+            params = list(params) if many else params
+            statements.append((sql, params[0] if many and params else params))
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(record):
+            response = getattr(self.client, method)(url, data, format='json')
+
+        self.assertLessEqual(len(statements), max_queries, '{} {} ran {} queries:\n{}'.format(
+            method.upper(), url, len(statements), '\n'.join(sql for sql, _ in statements)
+        ))
+        for sql, params in statements:
+            plan = explain(connection, sql, params)
+            scans = set(unbounded_scans(sql, plan)) - set(expected_scans)
+            self.assertFalse(scans, '{} {} scans {}:\n{}\nplan: {}'.format(
+                method.upper(), url, ', '.join(sorted(scans)), sql, ' / '.join(plan or ())
+            ))
+        return response
+
+    def test_every_route_is_covered(self):
+        """
+        This ensures that each route has its query plan test
+        """
+        tested = [name for name in dir(self) if name.startswith('test_')]
+        for pattern in urls.urlpatterns:
+            with self.subTest(route=pattern.name):
+                self.assertIn('test_{}'.format(pattern.name.replace('-', '_')), tested)
+
+    def test_unbounded_scans(self):
+        """
+        This ensures that only a page read in the order of the scanned index
+        is not reported as a full scan
+        """
+        querysets = (
+            (Contact.objects.order_by(*Contact.NAME_ORDERING)[:10], []),
+            (Contact.objects.order_by('id')[:10], []),
+            (Contact.objects.filter(first_name__contains='a')[:10], ['contacts_contact']),
+            (Contact.objects.order_by('date_of_birth', 'id')[:10], ['contacts_contact']),
+        )
+        for queryset, expected in querysets:
+            sql, params = queryset.query.sql_with_params()
+            with self.subTest(sql=sql):
+                self.assertEqual(unbounded_scans(sql, explain(connection, sql, params)), expected)
+
+    def test_contacts_list(self):
+        """
+        This ensures that a page of contacts (filtered or not) is read on indexes
+        """
+        # The unfiltered listing is counted once, then the count is cached
+        response = self.assertQueries(5, 'get', self.url('contacts-list', '?page=2'),
+                                      expected_scans=['contacts_contact'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.assertQueries(4, 'get', self.url('contacts-list', '?page=2'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        for filters in ('?country=Brazil&city=S%C3%A3o+Paulo', '?zip_prefix=98', '?country=Japan&page_size=5'):
+            with self.subTest(filters=filters):
+                response = self.assertQueries(5, 'get', self.url('contacts-list', filters))
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.assertQueries(17, 'post', self.url('contacts-list'), {
+            'first_name': 'Elton', 'last_name': 'John', 'date_of_birth': '1947-03-25',
+            'phone_numbers': ['+44 20 7946 0000'], 'emails': ['elton@example.com'], 'addresses': [NEW_ADDRESS],
+        })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_contact_details(self):
+        """
+        This ensures that a contact is read, updated and deleted by its primary key
+        """
+        url = self.url('contact-details', contact_id=self.phone.contact_id)
+
+        self.assertEqual(self.assertQueries(4, 'get', url).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.assertQueries(0, 'get', url).status_code, status.HTTP_200_OK)
+        # Only the changed columns are written, the response reuses the cached contact
+        response = self.assertQueries(2, 'put', url, {
+            'first_name': 'Elton', 'last_name': 'John', 'date_of_birth': '1947-03-25'
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # Without the cached contact, its relations are prefetched for the response
+        response = self.assertQueries(5, 'patch', url, {'first_name': 'Reginald'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # The phones, emails and addresses are replaced with a bulk write each
+        # (once the deleted contacts holding the added ones are looked up)
+        phones = list(PhoneNumber.objects.filter(contact_id=self.phone.contact_id).values_list('phone', flat=True))
+        response = self.assertQueries(18, 'patch', url, {
+            'phone_numbers': [*phones[1:], '+1 555 000 0046'], 'emails': ['reginald@example.com'], 'addresses': [],
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # Only marked as deleted, its rows are purged later
+        self.assertEqual(self.assertQueries(1, 'delete', url).status_code, status.HTTP_204_NO_CONTENT)
+
+    def test_contact_restore(self):
+        """
+        This ensures that a deleted contact is restored by its primary key
+        """
+        self.client.delete(self.url('contact-details', contact_id=1))
+
+        response = self.assertQueries(5, 'post', self.url('contact-restore', contact_id=1))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_contact_merge(self):
+        """
+        This ensures that merging contacts takes a constant number of indexed queries
+        """
+        response = self.assertQueries(12, 'post', self.url('contact-merge', contact_id=1), {'source_ids': [2, 3, 4]})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_contacts_search(self):
+        """
+        This ensures that a search scans the names and emails once for their
+        substrings, and the phones only for the queries with digits
+        """
+        email_prefix = self.email.email.split('@')[0].rstrip('0123456789')
+        substrings = ['contacts_contact', 'contacts_emailfield']
+        searches = (
+            ('?query=jose', substrings), ('?query=Jos%C3%A9+Silva', substrings),
+            ('?query=' + email_prefix, substrings), ('?query=%40web.de', substrings),
+            ('?query=555', substrings + ['contacts_phonenumber']), ('?query=ilv', substrings),
+            ('?query=jon&fuzzy=1', ()),
+        )
+        for query, expected_scans in searches:
+            with self.subTest(query=query):
+                response = self.assertQueries(
+                    5, 'get', self.url('contacts-search', query + '&page_size=10'), expected_scans=expected_scans
+                )
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_contacts_autocomplete(self):
+        """
+        This ensures that the names are read once, then their prefixes are
+        searched in memory
+        """
+        response = self.assertQueries(
+            1, 'get', self.url('contacts-autocomplete', '?prefix=jo'), expected_scans=['contacts_contact']
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.assertQueries(0, 'get', self.url('contacts-autocomplete', '?prefix=mar'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_contacts_duplicates(self):
+        """
+        This ensures that the duplicates report is read from a file, and built by a queued job
+        """
+        response = self.assertQueries(0, 'get', self.url('contacts-duplicates'))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.assertQueries(2, 'post', self.url('contacts-duplicates'), {'threshold': 0.9})
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+
+    def test_contacts_export(self):
+        """
+        This ensures that the export is read from a file, and built by a queued job
+        """
+        build_snapshot()
+
+        response = self.assertQueries(0, 'get', self.url('contacts-export'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.assertQueries(2, 'post', self.url('contacts-export'))
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+
+    def test_contacts_birthdays(self):
+        """
+        This ensures that the contacts born in the current month are fetched
+        with their relations in a constant number of queries (the months of
+        the dates of birth are not indexed)
+        """
+        response = self.assertQueries(5, 'get', self.url('contacts-birthdays'), expected_scans=['contacts_contact'])
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_phone_numbers_list(self):
+        """
+        This ensures that the phones of a contact are listed and added on indexes
+        """
+        url = self.url('phone-numbers-list', contact_id=self.phone.contact_id)
+
+        # The contact (not deleted) and its rows
+        self.assertEqual(self.assertQueries(2, 'get', url).status_code, status.HTTP_200_OK)
+        response = self.assertQueries(4, 'post', url, {'phone': '+1 555 0100'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        # The phone of a deleted contact is taken over, the contact is purged
+        taken = PhoneNumber.objects.exclude(contact_id=self.phone.contact_id).first()
+        Contact.objects.filter(pk=taken.contact_id).update(deleted_at=timezone.now())
+        response = self.assertQueries(10, 'post', url, {'phone': taken.phone})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_phone_number_details(self):
+        """
+        This ensures that a phone is read, updated and removed on indexes
+        """
+        url = self.url('phone-number-details', contact_id=self.phone.contact_id, phone_number=self.phone.phone)
+        new_url = self.url('phone-number-details', contact_id=self.phone.contact_id, phone_number='+1 555 0101')
+
+        self.assertEqual(self.assertQueries(1, 'get', url).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.assertQueries(4, 'put', url, {'phone': '+1 555 0101'}).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.assertQueries(4, 'delete', new_url).status_code, status.HTTP_204_NO_CONTENT)
+
+    def test_emails_list(self):
+        """
+        This ensures that the emails of a contact are listed and added on indexes
+        """
+        url = self.url('emails-list', contact_id=self.email.contact_id)
+
+        # The contact (not deleted) and its rows
+        self.assertEqual(self.assertQueries(2, 'get', url).status_code, status.HTTP_200_OK)
+        response = self.assertQueries(4, 'post', url, {'email': 'elton@example.com'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_email_details(self):
+        """
+        This ensures that an email is read, updated and removed on indexes
+        """
+        url = self.url('email-details', contact_id=self.email.contact_id, email=self.email.email)
+        new_url = self.url('email-details', contact_id=self.email.contact_id, email='elton@example.com')
+
+        self.assertEqual(self.assertQueries(1, 'get', url).status_code, status.HTTP_200_OK)
+        response = self.assertQueries(4, 'put', url, {'email': 'elton@example.com'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.assertQueries(4, 'delete', new_url).status_code, status.HTTP_204_NO_CONTENT)
+
+    def test_addresses_list(self):
+        """
+        This ensures that the addresses of a contact are listed and added on indexes
+        """
+        url = self.url('addresses-list', contact_id=self.address.contact_id)
+
+        # The contact (not deleted) and its rows
+        self.assertEqual(self.assertQueries(2, 'get', url).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.assertQueries(2, 'post', url, NEW_ADDRESS).status_code, status.HTTP_201_CREATED)
+
+    def test_address_details(self):
+        """
+        This ensures that an address is read, updated and removed on indexes
+        """
+        url = self.url('address-details', contact_id=self.address.contact_id, address_id=self.address.pk)
+
+        self.assertEqual(self.assertQueries(1, 'get', url).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.assertQueries(2, 'put', url, NEW_ADDRESS).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.assertQueries(2, 'delete', url).status_code, status.HTTP_204_NO_CONTENT)
+
+    def test_jobs_list(self):
+        """
+        This ensures that the jobs are listed and queued on indexes
+        """
+        enqueue('build_snapshot')
+
+        response = self.assertQueries(1, 'get', self.url('jobs-list', '?status=queued'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.assertQueries(2, 'post', self.url('jobs-list'), {'kind': 'find_duplicates'})
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+
+    def test_job_details(self):
+        """
+        This ensures that a job is read by its primary key
+        """
+        job = enqueue('build_snapshot')
+
+        response = self.assertQueries(1, 'get', self.url('job-details', job_id=job.pk))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_metrics(self):
+        """
+        This ensures that the metrics are served without queries
+        """
+        self.assertEqual(self.assertQueries(0, 'get', reverse('metrics')).status_code, status.HTTP_200_OK)
+
+    def test_monitoring(self):
+        """
+        This ensures that the runtime statistics are served without queries
+        """
+        self.client.force_authenticate(User(username='staff', is_staff=True))
+        self.assertEqual(self.assertQueries(0, 'get', self.url('monitoring')).status_code, status.HTTP_200_OK)
@@ -0,0 +1,42 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+
+
+class OpenAPISchemaTest(APITestCase):
+    def setUp(self):
+        data_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(data_dir.cleanup)
+        settings_override = override_settings(OPENAPI_SCHEMA_FILE=os.path.join(data_dir.name, 'openapi.json'))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_schema_not_built(self):
+        """
+        This ensures that a 404 is returned until the schema is built
+        """
+        response = self.client.get(reverse('openapi-schema'))
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_build_schema(self):
+        """
+        This ensures that the built schema describes the API endpoints and is served as is
+        """
+        call_command('build_openapi_schema', stdout=StringIO())
+
+        response = self.client.get(reverse('openapi-schema'))
+        schema = json.loads(b''.join(response.streaming_content))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/vnd.oai.openapi+json')
+        self.assertEqual(schema['info']['title'], 'Contact Manager API')
+        self.assertIn('/contactmanager/{version}/contacts', schema['paths'])
+        self.assertTrue(all(path.startswith('/contactmanager/') for path in schema['paths']))
@@ -0,0 +1,67 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.validators import validate_email
+from rest_framework.test import APITestCase
+
+from contacts.models import Contact, PhoneNumber, EmailField, AddressField
+from contacts.seeding import generate_batch, seed_contacts
+from contacts.text import content_hash
+
+
+class SeedContactsTest(APITestCase):
+    def test_generated_batches_are_deterministic(self):
+        """
+        This ensures that the same seed and ids generate the same rows
+        """
+        self.assertEqual(generate_batch(7, 1, 100), generate_batch(7, 1, 100))
+        self.assertNotEqual(generate_batch(7, 1, 100), generate_batch(8, 1, 100))
+
+    def test_generated_contacts_are_valid(self):
+        """
+        This ensures that every generated contact has a phone and an email,
+        and that the emails are valid whatever the letters of the names
+        """
+        rows = generate_batch(7, 1, 1000)
+
+        self.assertEqual({row[0] for row in rows[PhoneNumber][1]}, set(range(1, 1001)))
+        self.assertEqual({row[0] for row in rows[EmailField][1]}, set(range(1, 1001)))
+        for _, email, _ in rows[EmailField][1]:
+            validate_email(email)
+            self.assertTrue(email.isascii(), email)
+
+    def test_seed_contacts(self):
+        """
+        This ensures that the generated contacts are inserted after the
+        existing ones, with unique phones and emails and their search keys
+        """
+        existing_contact = Contact.objects.create(first_name='Elton', last_name='John', date_of_birth='1947-03-25')
+
+        inserted = seed_contacts(500, batch_size=120)
+        inserted_again = seed_contacts(300, batch_size=120)
+
+        self.assertEqual(inserted[Contact], 500)
+        self.assertEqual(inserted_again[Contact], 300)
+        self.assertEqual(Contact.objects.count(), 801)
+        self.assertEqual(Contact.objects.filter(pk__gt=existing_contact.pk).count(), 800)
+        self.assertEqual(PhoneNumber.objects.count(), inserted[PhoneNumber] + inserted_again[PhoneNumber])
+        self.assertEqual(EmailField.objects.count(), inserted[EmailField] + inserted_again[EmailField])
+        self.assertEqual(AddressField.objects.count(), inserted[AddressField] + inserted_again[AddressField])
+
+        for contact in Contact.objects.all()[:50]:
+            for field, value in Contact.search_keys(contact.first_name, contact.last_name).items():
+                self.assertEqual(getattr(contact, field), value)
+        for address in AddressField.objects.all()[:50]:
+            self.assertEqual(address.content_hash, content_hash(*(
+                getattr(address, field) for field in AddressField.CONTENT_FIELDS
+            )))
+
+    def test_command(self):
+        """
+        This ensures that the command adds the requested number of contacts
+        """
+        output = StringIO()
+        call_command('seed_contacts', count=250, batch_size=100, workers=1, stdout=output)
+
+        self.assertEqual(Contact.objects.count(), 250)
+        self.assertIn('Added 250 contacts', output.getvalue())
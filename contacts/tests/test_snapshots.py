@@ -0,0 +1,143 @@
+import fcntl
+import gzip
+import json
+import os
+import tempfile
+from unittest import mock
+
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.reverse import reverse
+
+from contacts.cache import generations_dir, SharedCounter, DATA_GENERATION
+from contacts.models import Contact
+from contacts.serializers import ContactSerializer
+from contacts.snapshots import build_lock_path, build_snapshot, latest_snapshot, refresh_snapshot
+from contacts.tests.views.base_contact_view_test import BaseContactViewTest
+
+
+class ExportSnapshotTest(BaseContactViewTest):
+    def setUp(self):
+        super().setUp()
+        self.data_dir = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(CONTACTS_DATA_DIR=self.data_dir.name)
+        self.settings_override.enable()
+        self.url = reverse('contacts-export', kwargs={'version': self.current_version})
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.data_dir.cleanup()
+
+    @staticmethod
+    def read_snapshot(manifest):
+        with open(manifest['path'], 'rb') as snapshot_file:
+            return snapshot_file.read()
+
+    def download(self, **headers):
+        response = self.client.get(self.url, **headers)
+        return response, b''.join(response.streaming_content) if response.streaming else response.content
+
+    def test_build_snapshot(self):
+        """
+        This ensures that the snapshot holds one serialized contact per line
+        """
+        manifest = build_snapshot()
+
+        with gzip.open(manifest['path']) as snapshot_file:
+            lines = [json.loads(line) for line in snapshot_file]
+
+        self.assertEqual(lines, ContactSerializer(Contact.objects.order_by('pk'), many=True).data)
+        self.assertEqual(latest_snapshot(), manifest)
+
+    def test_download_snapshot(self):
+        """
+        This ensures that the latest snapshot is served with its ETag
+        """
+        manifest = build_snapshot()
+        response, content = self.download()
+
+        self.assertEqual(content, self.read_snapshot(manifest))
+        self.assertEqual(response['ETag'], '"{}"'.format(manifest['etag']))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_download_unchanged_snapshot(self):
+        """
+        This ensures that a client with the current ETag gets a 304 response
+        """
+        manifest = build_snapshot()
+        response, content = self.download(HTTP_IF_NONE_MATCH='"{}"'.format(manifest['etag']))
+
+        self.assertEqual(content, b'')
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_download_snapshot_range(self):
+        """
+        This ensures that a byte range of the snapshot can be downloaded
+        """
+        manifest = build_snapshot()
+        response, content = self.download(HTTP_RANGE='bytes=10-19')
+
+        self.assertEqual(content, self.read_snapshot(manifest)[10:20])
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/{}'.format(manifest['size']))
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+
+    def test_download_unsatisfiable_range(self):
+        """
+        This ensures that a range after the end of the snapshot is rejected
+        """
+        manifest = build_snapshot()
+        response, _ = self.download(HTTP_RANGE='bytes={}-'.format(manifest['size']))
+
+        self.assertEqual(response.status_code, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+
+    def test_download_missing_snapshot(self):
+        """
+        This ensures that a snapshot is built in the background when there is
+        none yet, and that the client is asked to retry
+        """
+        with mock.patch('contacts.snapshots.threading.Thread') as thread:
+            response, _ = self.download()
+
+        thread.return_value.start.assert_called_once_with()
+        self.assertEqual(response['Retry-After'], '5')
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    def test_refresh_stale_snapshot(self):
+        """
+        This ensures that a write to the contacts triggers a new snapshot,
+        while the previous one keeps being served
+        """
+        build_snapshot()
+        Contact.objects.get(pk=1).save()
+
+        with mock.patch('contacts.snapshots.threading.Thread') as thread:
+            response, _ = self.download()
+
+        thread.return_value.start.assert_called_once_with()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_refresh_after_write_of_another_process(self):
+        """
+        This ensures that a write to the contacts in another process triggers
+        a new snapshot
+        """
+        manifest = build_snapshot()
+        SharedCounter(os.path.join(generations_dir(), DATA_GENERATION)).increment()
+
+        with mock.patch('contacts.snapshots.threading.Thread') as thread:
+            self.assertTrue(refresh_snapshot(manifest))
+
+        thread.return_value.start.assert_called_once_with()
+        thread.call_args[1]['args'][0].close()
+
+    def test_one_build_at_a_time(self):
+        """
+        This ensures that no snapshot is built while another process holds the build lock
+        """
+        os.makedirs(os.path.dirname(build_lock_path()), exist_ok=True)
+        with open(build_lock_path(), 'wb') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            with mock.patch('contacts.snapshots.threading.Thread') as thread:
+                self.assertFalse(refresh_snapshot(None))
+
+        thread.assert_not_called()
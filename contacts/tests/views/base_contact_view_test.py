@@ -1,9 +1,11 @@
 import json
+from django.core.cache import cache
 from django.utils.http import urlencode
 from rest_framework.reverse import reverse
 
 from rest_framework.test import APITestCase, APIClient
 
+from contacts.cache import clear_contacts_count
 from contacts.models import Contact, AddressField
 from contacts.tests.views.base_address_field_view_test import BaseAddressFieldViewTest
 from contacts.tests.views.base_email_field_view_test import BaseEmailFieldViewTest
@@ -38,6 +40,8 @@ class BaseContactViewTest(APITestCase):
                 )
 
     def setUp(self):
+        cache.clear()
+        clear_contacts_count()
         # Default Values
         self.valid_contact_id = 1
         self.valid_contact_id_with_multiple_phones = 3
@@ -110,6 +114,19 @@ class BaseContactViewTest(APITestCase):
             content_type='application/json'
         )
 
+    def patch_contact(self, contact_id, new_data):
+        """
+        Perform a PATCH request to partially update an existing contact
+        :param contact_id:
+        :param new_data:
+        :return:
+        """
+        return self.client.patch(
+            reverse('contact-details', kwargs={'version': self.current_version, 'contact_id': contact_id}),
+            data=json.dumps(new_data),
+            content_type='application/json'
+        )
+
     def fetch_contact(self, contact_id):
         """
         Perform a GET request to retrieve an existing contact by your id
@@ -120,17 +137,45 @@ class BaseContactViewTest(APITestCase):
             reverse('contact-details', kwargs={'version': self.current_version, 'contact_id': contact_id})
         )
 
-    def search_contacts(self, query):
+    def search_contacts(self, query, fuzzy=False):
         """
         Perform a GET request to search for contacts that match a given query
         :param query:
+        :param fuzzy:
+        :return:
+        """
+        params = {'query': query, 'fuzzy': 1} if fuzzy else {'query': query}
+        url = "{}?{}".format(
+            reverse('contacts-search', kwargs={'version': self.current_version}), urlencode(params)
+        )
+        return self.client.get(url)
+
+    def autocomplete_contacts(self, prefix, limit=None):
+        """
+        Perform a GET request to retrieve the contacts whose names start with a given prefix
+        :param prefix:
+        :param limit:
         :return:
         """
+        params = {'prefix': prefix} if limit is None else {'prefix': prefix, 'limit': limit}
         url = "{}?{}".format(
-            reverse('contacts-search', kwargs={'version': self.current_version}), urlencode({'query': query})
+            reverse('contacts-autocomplete', kwargs={'version': self.current_version}), urlencode(params)
         )
         return self.client.get(url)
 
+    def merge_contacts(self, contact_id, data):
+        """
+        Perform a POST request to merge other contacts into an existing contact
+        :param contact_id:
+        :param data:
+        :return:
+        """
+        return self.client.post(
+            reverse('contact-merge', kwargs={'version': self.current_version, 'contact_id': contact_id}),
+            data=json.dumps(data),
+            content_type='application/json'
+        )
+
     def remove_contact(self, contact_id):
         """
         Perform a DELETE request to remove an existing contact by your id
@@ -140,3 +185,13 @@ class BaseContactViewTest(APITestCase):
         return self.client.delete(
             reverse('contact-details', kwargs={'version': self.current_version, 'contact_id': contact_id})
         )
+
+    def restore_contact(self, contact_id):
+        """
+        Perform a POST request to restore a removed contact by your id
+        :param contact_id:
+        :return:
+        """
+        return self.client.post(
+            reverse('contact-restore', kwargs={'version': self.current_version, 'contact_id': contact_id})
+        )
@@ -1,3 +1,4 @@
+from django.utils import timezone
 from rest_framework import status
 
 from contacts.models import Contact, AddressField
@@ -81,6 +82,16 @@ class AddAnAddressToAContactTest(BaseAddressFieldViewTest):
         self.assertTrue(len(response.data['address']) > 0)
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_add_a_differently_encoded_duplicated_address_to_a_contact(self):
+        """
+        This test ensures that an address with decomposed accents is a duplicate of the composed one
+        """
+        self.add_address(self.valid_contact_id, {**self.valid_address, 'city': 'São Paulo'})
+        response = self.add_address(self.valid_contact_id, {**self.valid_address, 'city': 'São Paulo'})
+
+        self.assertTrue(len(response.data['address']) > 0)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_add_an_empty_address_to_a_contact(self):
         """
         This test ensures that an empty address cannot be added to a contact
@@ -224,3 +235,22 @@ class RemoveAnAddressFromAContactTest(BaseAddressFieldViewTest):
 
         self.assertTrue('not found' in response.data['detail'].lower())
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class DeletedContactAddressesTest(BaseAddressFieldViewTest):
+    def test_addresses_of_a_deleted_contact(self):
+        """
+        This test ensures that the addresses of a deleted contact can no longer be read nor changed
+        """
+        Contact.all_objects.filter(pk=self.valid_contact_id).update(deleted_at=timezone.now())
+
+        responses = (
+            self.fetch_all_addresses(self.valid_contact_id),
+            self.fetch_address(self.valid_contact_id, self.valid_contact_address_id),
+            self.update_address(self.valid_contact_id, self.valid_contact_address_id, self.valid_address),
+            self.add_address(self.valid_contact_id, self.valid_address),
+            self.remove_address(self.valid_contact_id, self.valid_contact_address_id),
+        )
+
+        self.assertEqual([response.status_code for response in responses], [status.HTTP_404_NOT_FOUND] * 5)
+        self.assertTrue(AddressField.objects.filter(pk=self.valid_contact_address_id).exists())
@@ -1,8 +1,16 @@
+from datetime import timedelta
+
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 
-from contacts.models import Contact
+from contacts.cache import contacts_count
+from contacts.models import Contact, AddressField, EmailField
+from contacts.name_index import name_index
 from contacts.serializers import ContactSerializer
+from contacts.text import content_hash
 from contacts.tests.views.base_contact_view_test import BaseContactViewTest
 
 
@@ -22,6 +30,92 @@ class GetAllContactsTest(BaseContactViewTest):
         self.assertEqual(response.json(), serialized.data)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+    def test_get_a_page_of_contacts(self):
+        """
+        This ensures that the contacts can be retrieved in pages, with the
+        total taken from the maintained counter
+        """
+        # Retrieve response from API
+        url = reverse('contacts-list', kwargs={'version': self.current_version})
+        response = self.client.get(url, {'page': 2, 'page_size': 2})
+        json_response = response.json()
+
+        # Fetch data from database
+        expected = Contact.objects.order_by(*Contact.NAME_ORDERING)[2:4]
+        serialized = ContactSerializer(expected, many=True)
+
+        self.assertEqual(json_response['results'], serialized.data)
+        self.assertEqual(json_response['count'], 3)
+        self.assertFalse(json_response['has_more'])
+        self.assertIsNone(json_response['next'])
+        self.assertIsNotNone(json_response['previous'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_get_a_page_of_contacts_without_counting(self):
+        """
+        This ensures that a page of contacts is served without counting the table
+        """
+        url = reverse('contacts-list', kwargs={'version': self.current_version})
+        contacts_count()
+
+        with self.assertNumQueries(4):
+            response = self.client.get(url, {'page_size': 2})
+
+        self.assertTrue(response.json()['has_more'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_get_an_invalid_page_of_contacts(self):
+        """
+        This ensures that an invalid page number results in a 404
+        """
+        url = reverse('contacts-list', kwargs={'version': self.current_version})
+        response = self.client.get(url, {'page': 0})
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_get_contacts_in_name_order(self):
+        """
+        This ensures that the contacts are sorted by name ignoring case and accents
+        """
+        url = reverse('contacts-list', kwargs={'version': self.current_version})
+        Contact.objects.create(first_name='zoe', last_name='Adams', date_of_birth='1990-01-01')
+        Contact.objects.create(first_name='Émile', last_name='Zola', date_of_birth='1840-04-02')
+
+        response = self.client.get(url, {'page_size': 10})
+
+        self.assertEqual([contact['first_name'] for contact in response.json()['results']],
+                         ['Elton', 'Elvis', 'Émile', 'Marilyn', 'zoe'])
+
+    def test_filter_contacts_by_address(self):
+        """
+        This ensures that the contacts can be filtered by the location of
+        their addresses, each contact being listed once
+        """
+        url = reverse('contacts-list', kwargs={'version': self.current_version})
+        AddressField.objects.create(contact_id=2, address='Graceland', city='Memphis', state='Tennessee',
+                                    country='United States', zip_code='38116')
+
+        by_country = self.client.get(url, {'country': 'United States'}).json()
+        by_city = self.client.get(url, {'country': 'United States', 'state': 'Tennessee', 'city': 'Memphis'}).json()
+        by_zip_prefix = self.client.get(url, {'zip_prefix': '9'}).json()
+        by_other_address = self.client.get(url, {'city': 'London', 'zip_prefix': '3'}).json()
+
+        self.assertEqual([contact['id'] for contact in by_country], [2, 3])
+        self.assertEqual([contact['id'] for contact in by_city], [2])
+        self.assertEqual([contact['id'] for contact in by_zip_prefix], [3])
+        self.assertEqual(by_other_address, [])
+
+    def test_get_a_page_of_filtered_contacts(self):
+        """
+        This ensures that the total of a filtered listing is counted, not
+        taken from the counter of all contacts
+        """
+        url = reverse('contacts-list', kwargs={'version': self.current_version})
+        response = self.client.get(url, {'country': 'United States', 'page_size': 1})
+
+        self.assertEqual(response.json()['count'], 2)
+        self.assertTrue(response.json()['has_more'])
+
 
 class SearchContactsTest(BaseContactViewTest):
     def test_search_by_first_name(self):
@@ -116,6 +210,164 @@ class SearchContactsTest(BaseContactViewTest):
 
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
 
+    def test_search_ignoring_case_and_accents(self):
+        """
+        This ensures that the names and emails match a query whatever the case and accents of both
+        """
+        contact = Contact.objects.create(first_name='José', last_name='Ñúñez', date_of_birth='1970-01-01')
+        EmailField.objects.create(contact=contact, email='JOSE.NUNEZ@example.com')
+
+        for query in ('jose', 'JOSÉ', 'nunez', 'José Ñ', 'jose.nun'):
+            response = self.search_contacts(query)
+
+            self.assertEqual([result['id'] for result in response.json()], [contact.id], query)
+
+    def test_search_by_email_prefix(self):
+        """
+        This ensures that a query matches the emails starting with it, or containing it when it has an `@`
+        """
+        self.assertEqual([contact['id'] for contact in self.search_contacts('me@').json()], [1])
+        self.assertEqual([contact['id'] for contact in self.search_contacts('@monroe').json()], [3])
+        self.assertEqual(self.search_contacts('johnson').status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_search_by_substring(self):
+        """
+        This ensures that a query matches the names and emails containing it,
+        after the names and emails starting with it
+        """
+        self.assertEqual([contact['id'] for contact in self.search_contacts('e').json()], [1, 2, 3])
+        self.assertEqual([contact['id'] for contact in self.search_contacts('lto').json()], [1])
+        self.assertEqual([contact['id'] for contact in self.search_contacts('resley').json()], [2])
+        self.assertEqual([contact['id'] for contact in self.search_contacts('example').json()], [1, 2])
+        self.assertEqual([contact['id'] for contact in self.search_contacts('elvis').json()], [2])
+
+    def test_search_a_page_of_contacts(self):
+        """
+        This ensures that the search results can be retrieved in pages, with a capped count
+        """
+        url = reverse('contacts-search', kwargs={'version': self.current_version})
+        with self.settings(CONTACTS_PAGINATION={'PAGE_SIZE': 20, 'MAX_PAGE_SIZE': 100, 'COUNT_CAP': 1}):
+            response = self.client.get(url, {'query': 'el', 'page_size': 1})
+        json_response = response.json()
+
+        self.assertEqual([contact['first_name'] for contact in json_response['results']], ['Elton'])
+        self.assertEqual(json_response['count'], '1+')
+        self.assertTrue(json_response['has_more'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_fuzzy_search_by_name(self):
+        """
+        This ensures that a misspelled name still finds the contact when the
+        fuzzy search is enabled
+        """
+        # Retrieve response from API
+        response = self.search_contacts('Elten Jon', fuzzy=True)
+
+        self.assertEqual(response.data[0]['id'], 1)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_fuzzy_search_ranking(self):
+        """
+        This ensures that the closest names come first in a fuzzy search
+        """
+        # Retrieve response from API
+        self.insert_contact('Marlin', 'Monro', '1980-01-01', [{'phone': '+1 202 555 0199'}], ['marlin@example.com'], [])
+        response = self.search_contacts('Merilin Monroe', fuzzy=True)
+
+        response_names = [(contact['first_name'], contact['last_name']) for contact in response.data]
+
+        self.assertEqual(response_names, [('Marilyn', 'Monroe'), ('Marlin', 'Monro')])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    @override_settings(CONTACTS_FUZZY_SEARCH={'MAX_CANDIDATES': 3})
+    def test_fuzzy_search_with_more_candidates_than_the_cap(self):
+        """
+        This ensures that the contacts matching all the words of a fuzzy search
+        are ranked even when more contacts than the cap match one of them
+        """
+        for index, (first_name, last_name) in enumerate([('Jon', 'Xavier'), ('Jane', 'Young'), ('Joan', 'Quinn'),
+                                                         ('June', 'Vance'), ('Zack', 'Smyth'), ('John', 'Smith')]):
+            self.insert_contact(first_name, last_name, '1980-01-01', [{'phone': '+1 202 555 010{}'.format(index)}],
+                                ['{}@example.com'.format(first_name.lower())], [])
+
+        response = self.search_contacts('Jon Smith', fuzzy=True)
+
+        self.assertEqual((response.data[0]['first_name'], response.data[0]['last_name']), ('John', 'Smith'))
+        self.assertEqual(len(response.data), 3)
+
+    def test_fuzzy_search_nonexistent_contact(self):
+        """
+        This ensures that a fuzzy search without phonetic matches results in a 404
+        """
+        # Retrieve response from API
+        response = self.search_contacts('anonymous', fuzzy=True)
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class AutocompleteContactsTest(BaseContactViewTest):
+    def setUp(self):
+        super().setUp()
+        name_index.clear()
+
+    def test_autocomplete_by_first_name(self):
+        """
+        This ensures that the contacts whose first name starts with the given
+        prefix are returned, regardless of the case
+        """
+        response = self.autocomplete_contacts('EL')
+
+        self.assertEqual(response.json(), [
+            {'id': 1, 'first_name': 'Elton', 'last_name': 'John'},
+            {'id': 2, 'first_name': 'Elvis', 'last_name': 'Presley'},
+        ])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_autocomplete_by_last_name(self):
+        """
+        This ensures that the contacts whose last name starts with the given prefix are returned
+        """
+        response = self.autocomplete_contacts('mon')
+
+        self.assertEqual(response.json(), [{'id': 3, 'first_name': 'Marilyn', 'last_name': 'Monroe'}])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_autocomplete_by_full_name(self):
+        """
+        This ensures that a prefix with more than a word is matched against the full name
+        """
+        response = self.autocomplete_contacts('elvis p')
+
+        self.assertEqual(response.json(), [{'id': 2, 'first_name': 'Elvis', 'last_name': 'Presley'}])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_autocomplete_limit(self):
+        """
+        This ensures that no more than `limit` contacts are returned
+        """
+        response = self.autocomplete_contacts('el', limit=1)
+
+        self.assertEqual(len(response.json()), 1)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_autocomplete_with_an_invalid_limit(self):
+        """
+        This ensures that a non numeric limit is rejected
+        """
+        response = self.autocomplete_contacts('el', limit='many')
+
+        self.assertTrue(len(response.data['limit']) > 0)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_autocomplete_nonexistent_contact(self):
+        """
+        This ensures that an unknown prefix results in an empty list
+        """
+        response = self.autocomplete_contacts('anonymous')
+
+        self.assertEqual(response.json(), [])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
 
 class GetAContactTest(BaseContactViewTest):
     def test_get_a_contact(self):
@@ -516,6 +768,235 @@ class UpdateContactTest(BaseContactViewTest):
         self.assertTrue(len(response.data['date_of_birth']) > 0)
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_patch_only_the_changed_fields(self):
+        """
+        This test ensures that a partial update only writes the fields that changed
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = self.patch_contact(contact_id=2, new_data={'first_name': 'Elvis Aaron', 'last_name': 'Presley'})
+        updates = [query['sql'] for query in queries if query['sql'].startswith('UPDATE "contacts_contact"')]
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), ContactSerializer(Contact.objects.get(pk=2)).data)
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"first_name_key"', updates[0])
+        self.assertNotIn('"last_name"', updates[0])
+        self.assertNotIn('"date_of_birth"', updates[0])
+
+    def test_patch_without_changes(self):
+        """
+        This test ensures that a partial update that changes nothing does not write the contact
+        """
+        contact = Contact.objects.get(pk=2)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.patch_contact(contact_id=2, new_data={'first_name': contact.first_name})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['first_name'], contact.first_name)
+        self.assertFalse([query for query in queries if query['sql'].startswith('UPDATE')])
+
+    def test_patch_a_cached_contact(self):
+        """
+        This test ensures that the response of a partial update of a cached
+        contact is built without reading its phones, emails and addresses again
+        """
+        self.fetch_contact(1)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.patch_contact(contact_id=1, new_data={'date_of_birth': '1947-03-26'})
+        tables = ' '.join(query['sql'] for query in queries)
+
+        self.assertEqual(response.json(), ContactSerializer(Contact.objects.get(pk=1)).data)
+        self.assertEqual(response.json()['date_of_birth'], '1947-03-26')
+        for table in ('contacts_phonenumber', 'contacts_emailfield', 'contacts_addressfield'):
+            self.assertNotIn(table, tables)
+        self.assertEqual(self.fetch_contact(1).json()['date_of_birth'], '1947-03-26')
+
+    def test_update_the_contact_card(self):
+        """
+        This test ensures that the phones, emails and addresses of a contact
+        are replaced by the lists given, keeping the rows that did not change
+        """
+        address = {'address': '1 Blythe Road', 'city': 'London', 'state': 'Hammersmith',
+                   'country': 'United Kingdom', 'zip_code': 'W14 0HG'}
+        new_address = {'address': '10 Downing Street', 'city': 'London', 'state': 'Westminster',
+                       'country': 'United Kingdom', 'zip_code': 'SW1A 2AA'}
+        kept_phone = Contact.objects.get(pk=1).phone_numbers.get()
+        response = self.patch_contact(contact_id=1, new_data={
+            'phone_numbers': ['+44 7911 123456', '+44 20 7946 0000'],
+            'emails': ['me@eltonjohn.com', 'Rocket@Example.com'],
+            'addresses': [{**address, 'id': 1, 'zip_code': 'W14 0HH'}, new_address],
+        })
+        json_response = response.json()
+        contact = Contact.objects.get(pk=1)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(json_response, ContactSerializer(contact).data)
+        self.assertEqual(sorted(json_response['phone_numbers']), ['+44 20 7946 0000', '+44 7911 123456'])
+        self.assertEqual(sorted(json_response['emails']), ['Rocket@Example.com', 'me@eltonjohn.com'])
+        self.assertEqual(contact.phone_numbers.get(phone='+44 7911 123456').pk, kept_phone.pk)
+        self.assertEqual(contact.emails.get(email='Rocket@Example.com').email_key, 'rocket@example.com')
+        self.assertEqual([address.pop('id') for address in json_response['addresses']][0], 1)
+        self.assertEqual(json_response['addresses'], [{**address, 'zip_code': 'W14 0HH'}, new_address])
+        self.assertEqual(
+            contact.addresses.get(pk=1).content_hash, content_hash(*{**address, 'zip_code': 'W14 0HH'}.values())
+        )
+        self.assertFalse(EmailField.objects.filter(email='elton_john@example.com').exists())
+
+    def test_update_the_contact_card_with_invalid_lists(self):
+        """
+        This test ensures that the rules of the phones, emails and addresses
+        are kept, and that nothing is written when one is broken
+        """
+        address = {'address': '1 Blythe Road', 'city': 'London', 'state': 'Hammersmith',
+                   'country': 'United Kingdom', 'zip_code': 'W14 0HG'}
+        invalid_data = (
+            ({'phone_numbers': []}, 'phone_numbers'),
+            ({'emails': ['me@eltonjohn.com', 'me@eltonjohn.com']}, 'emails'),
+            ({'phone_numbers': ['+1 123 456 7890']}, 'phone_numbers'),
+            ({'emails': ['marilyn@monroe.com']}, 'emails'),
+            ({'addresses': [{**address, 'id': 1}, address]}, 'addresses'),
+            ({'addresses': [{**address, 'id': 2}]}, 'addresses'),
+        )
+        for data, field in invalid_data:
+            with self.subTest(data=data):
+                response = self.patch_contact(contact_id=1, new_data={'first_name': 'Reginald', **data})
+
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+                self.assertIn(field, response.json())
+                self.assertEqual(self.fetch_contact(1).json(), ContactSerializer(Contact.objects.get(pk=1)).data)
+                self.assertEqual(Contact.objects.get(pk=1).first_name, 'Elton')
+
+    def test_patch_part_of_an_address(self):
+        """
+        This test ensures that a partial update of a listed address keeps its other fields
+        """
+        response = self.patch_contact(contact_id=1, new_data={'addresses': [{'id': 1, 'city': 'Londres'}]})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['addresses'], [{
+            'id': 1, 'address': '1 Blythe Road', 'city': 'Londres', 'state': 'Hammersmith',
+            'country': 'United Kingdom', 'zip_code': 'W14 0HG'
+        }])
+        address = AddressField.objects.get(pk=1)
+        self.assertEqual(address.content_hash, content_hash(*(getattr(address, field)
+                                                              for field in AddressField.CONTENT_FIELDS)))
+
+    def test_swap_two_addresses(self):
+        """
+        This test ensures that two addresses of a contact can exchange their
+        contents (and a new address take the previous content of one) in a single update
+        """
+        first = {'address': '1 Blythe Road', 'city': 'London', 'state': 'Hammersmith',
+                 'country': 'United Kingdom', 'zip_code': 'W14 0HG'}
+        second = {**first, 'address': '2 Blythe Road'}
+        self.patch_contact(contact_id=1, new_data={'addresses': [{'id': 1}, second]})
+        second_id = AddressField.objects.get(contact_id=1, address='2 Blythe Road').pk
+        third = {**first, 'address': '3 Blythe Road'}
+
+        response = self.patch_contact(contact_id=1, new_data={
+            'addresses': [{'id': 1, **second}, {'id': second_id, **third}, first]
+        })
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        addresses = {address.pop('id'): address for address in response.json()['addresses']}
+        self.assertEqual(addresses[1], second)
+        self.assertEqual(addresses[second_id], third)
+        self.assertEqual(list(addresses.values()), [second, third, first])
+        for address in AddressField.objects.filter(contact_id=1):
+            self.assertEqual(address.content_hash, content_hash(*(getattr(address, field)
+                                                                  for field in AddressField.CONTENT_FIELDS)))
+
+    def test_patch_an_incomplete_new_address(self):
+        """
+        This test ensures that a new address given by a partial update must have all its fields
+        """
+        response = self.patch_contact(contact_id=1, new_data={'addresses': [{'address': '10 Downing Street'}]})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('city, state, country, zip_code', response.json()['addresses'][0])
+        self.assertEqual(list(AddressField.objects.filter(contact_id=1).values_list('pk', flat=True)), [1])
+
+
+class MergeContactsTest(BaseContactViewTest):
+    def test_merge_contacts(self):
+        """
+        This test ensures that the phones, emails and addresses of the source
+        contacts are moved to the target contact, and that the sources are removed
+        """
+        # Use the API endpoint to merge contacts
+        response = self.merge_contacts(1, {'source_ids': [2, 3]})
+        json_response = response.json()
+
+        self.assertEqual(sorted(json_response['phone_numbers']),
+                         ['+1 000 111 2222', '+1 123 456 7890', '+1 321 654 0987', '+44 7911 123456'])
+        self.assertEqual(sorted(json_response['emails']), [
+            'elton_john@example.com', 'elvis_presley@example.com', 'marilyn@monroe.com', 'me@eltonjohn.com'
+        ])
+        self.assertEqual(len(json_response['addresses']), 3)
+        self.assertFalse(Contact.objects.filter(pk__in=[2, 3]).exists())
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_merge_contacts_with_duplicated_addresses(self):
+        """
+        This test ensures that the addresses already registered for the target
+        (or for another source) are kept only once
+        """
+        # Copy the address of the target to both sources
+        target_address = AddressField.objects.get(contact_id=1)
+        for source_id in (2, 3):
+            target_address.pk = None
+            target_address.contact_id = source_id
+            target_address.save()
+
+        # Use the API endpoint to merge contacts
+        response = self.merge_contacts(1, {'source_ids': [2, 3]})
+
+        self.assertEqual(len(response.json()['addresses']), 3)
+        self.assertEqual(AddressField.objects.filter(contact_id=1).count(), 3)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_merge_with_a_constant_number_of_queries(self):
+        """
+        This test ensures that the number of queries does not depend on the number of sources
+        """
+        with self.assertNumQueries(12):
+            self.merge_contacts(1, {'source_ids': [2]})
+        with self.assertNumQueries(12):
+            self.merge_contacts(1, {'source_ids': [3]})
+
+    def test_merge_into_a_nonexistent_contact(self):
+        """
+        This test ensures that contacts cannot be merged into a nonexistent contact
+        """
+        # Use the API endpoint to merge contacts
+        response = self.merge_contacts(self.invalid_contact_id, {'source_ids': [2]})
+
+        self.assertTrue('not found' in response.data['detail'].lower())
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_merge_nonexistent_contacts(self):
+        """
+        This test ensures that nothing is merged when a source contact does not exist
+        """
+        # Use the API endpoint to merge contacts
+        response = self.merge_contacts(1, {'source_ids': [2, self.invalid_contact_id]})
+
+        self.assertTrue(len(response.data['source_ids']) > 0)
+        self.assertTrue(Contact.objects.filter(pk=2).exists())
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_merge_a_contact_into_itself(self):
+        """
+        This test ensures that a contact cannot be merged into itself
+        """
+        # Use the API endpoint to merge contacts
+        response = self.merge_contacts(1, {'source_ids': [1]})
+
+        self.assertTrue(len(response.data['source_ids']) > 0)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
 
 class RemoveContactTest(BaseContactViewTest):
     def test_remove_a_contact(self):
@@ -541,3 +1022,74 @@ class RemoveContactTest(BaseContactViewTest):
 
         self.assertTrue('not found' in response.data['detail'].lower())
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_removed_contact_is_hidden(self):
+        """
+        This test ensures that a removed contact is no longer served, while its
+        rows are kept until it is purged
+        """
+        self.remove_contact(1)
+
+        self.assertEqual(self.fetch_contact(1).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.remove_contact(1).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.search_contacts('elton').status_code, status.HTTP_404_NOT_FOUND)
+        self.assertNotIn(1, [contact['id'] for contact in self.autocomplete_contacts('el').json()])
+        self.assertEqual(Contact.all_objects.get(pk=1).phone_numbers.count(), 1)
+
+    def test_restore_a_contact(self):
+        """
+        This test ensures that a removed contact is restored with its phones, emails and addresses
+        """
+        contact_data = self.fetch_contact(1).json()
+        self.remove_contact(1)
+
+        response = self.restore_contact(1)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), contact_data)
+        self.assertEqual(self.fetch_contact(1).json(), contact_data)
+        self.assertEqual([contact['id'] for contact in self.search_contacts('elton').json()], [1])
+
+    def test_recreate_a_removed_contact(self):
+        """
+        This test ensures that a removed contact can be created again with its
+        phones and emails, the removed one then can no longer be restored
+        """
+        contact_data = self.fetch_contact(1).json()
+        self.remove_contact(1)
+
+        response = self.create_contact({
+            field: contact_data[field]
+            for field in ('first_name', 'last_name', 'date_of_birth', 'phone_numbers', 'emails', 'addresses')
+        })
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json()['emails'], contact_data['emails'])
+        self.assertEqual(self.restore_contact(1).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(Contact.all_objects.filter(pk=1).exists())
+
+    def test_take_over_the_values_of_a_removed_contact(self):
+        """
+        This test ensures that the phones and emails of a removed contact can be
+        moved to another contact, while those of the other contacts are still rejected
+        """
+        self.remove_contact(1)
+
+        response = self.patch_contact(2, {'emails': ['elton_john@example.com', 'marilyn@monroe.com']})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(Contact.all_objects.filter(pk=1).exists())
+
+        response = self.patch_contact(2, {'phone_numbers': ['+44 7911 123456'], 'emails': ['elton_john@example.com']})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['emails'], ['elton_john@example.com'])
+        self.assertEqual(self.restore_contact(1).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_restore_a_contact_not_removed(self):
+        """
+        This test ensures that only the contacts removed within the retention period can be restored
+        """
+        Contact.all_objects.filter(pk=2).update(deleted_at=Contact.retention_start() - timedelta(minutes=1))
+
+        for contact_id in (1, 2, self.invalid_contact_id):
+            with self.subTest(contact_id=contact_id):
+                self.assertEqual(self.restore_contact(contact_id).status_code, status.HTTP_404_NOT_FOUND)
@@ -1,3 +1,4 @@
+from django.utils import timezone
 from rest_framework import status
 
 from contacts.models import Contact, EmailField
@@ -253,3 +254,35 @@ class RemoveAEmailFromAContactTest(BaseEmailFieldViewTest):
 
         self.assertTrue('not found' in response.data['detail'].lower())
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class DeletedContactEmailsTest(BaseEmailFieldViewTest):
+    def test_emails_of_a_deleted_contact(self):
+        """
+        This test ensures that the emails of a deleted contact can no longer be read nor changed
+        """
+        Contact.all_objects.filter(pk=self.valid_contact_id).update(deleted_at=timezone.now())
+
+        responses = (
+            self.fetch_all_emails(self.valid_contact_id),
+            self.fetch_email(self.valid_contact_id, self.valid_contact_email),
+            self.update_email(self.valid_contact_id, self.valid_contact_email, self.valid_email_data),
+            self.add_email(self.valid_contact_id, self.valid_email_data),
+            self.remove_email(self.valid_contact_id, self.valid_contact_email),
+        )
+
+        self.assertEqual([response.status_code for response in responses], [status.HTTP_404_NOT_FOUND] * 5)
+        self.assertTrue(EmailField.objects.filter(email=self.valid_contact_email).exists())
+
+    def test_take_over_an_email_of_a_deleted_contact(self):
+        """
+        This test ensures that an email can be changed to the email of a
+        deleted contact, which purges the deleted one
+        """
+        Contact.all_objects.filter(pk=self.valid_contact_id).update(deleted_at=timezone.now())
+
+        response = self.update_email(2, 'elvis_presley@example.com', {'email': self.valid_contact_email})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(EmailField.objects.get(email=self.valid_contact_email).contact_id, 2)
+        self.assertFalse(Contact.all_objects.filter(pk=self.valid_contact_id).exists())
@@ -1,3 +1,4 @@
+from django.utils import timezone
 from rest_framework import status
 
 from contacts.models import Contact, PhoneNumber
@@ -266,3 +267,37 @@ class RemoveAPhoneNumberFromAContactTest(BasePhoneNumbersViewTest):
 
         self.assertTrue('not found' in response.data['detail'].lower())
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class DeletedContactPhoneNumbersTest(BasePhoneNumbersViewTest):
+    def test_phone_numbers_of_a_deleted_contact(self):
+        """
+        This test ensures that the phone numbers of a deleted contact can no longer be read nor changed
+        """
+        Contact.all_objects.filter(pk=self.valid_contact_id).update(deleted_at=timezone.now())
+
+        responses = (
+            self.fetch_all_phone_numbers(self.valid_contact_id),
+            self.fetch_phone_number(self.valid_contact_id, self.valid_contact_phone_number),
+            self.update_phone_number(
+                self.valid_contact_id, self.valid_contact_phone_number, self.valid_phone_number_data
+            ),
+            self.add_phone_number(self.valid_contact_id, self.valid_phone_number_data),
+            self.remove_phone_number(self.valid_contact_id, self.valid_contact_phone_number),
+        )
+
+        self.assertEqual([response.status_code for response in responses], [status.HTTP_404_NOT_FOUND] * 5)
+        self.assertTrue(PhoneNumber.objects.filter(phone=self.valid_contact_phone_number).exists())
+
+    def test_take_over_a_phone_number_of_a_deleted_contact(self):
+        """
+        This test ensures that the phone number of a deleted contact can be
+        added to another contact, which purges the deleted one
+        """
+        Contact.all_objects.filter(pk=self.valid_contact_id).update(deleted_at=timezone.now())
+
+        response = self.add_phone_number(2, {'phone': self.valid_contact_phone_number})
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(PhoneNumber.objects.get(phone=self.valid_contact_phone_number).contact_id, 2)
+        self.assertFalse(Contact.all_objects.filter(pk=self.valid_contact_id).exists())
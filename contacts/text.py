@@ -0,0 +1,23 @@
+import hashlib
+import unicodedata
+
+
+def fold(text):
+    """
+    Case- and accent-insensitive form of a text (e.g. 'Émile' -> 'emile')
+    :param text:
+    :return:
+    """
+    decomposed = unicodedata.normalize('NFKD', text.casefold())
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def content_hash(*values):
+    """
+    Fixed-width hash of some texts, taken without their surrounding spaces and
+    with their accents composed (so texts that look the same get the same hash)
+    :param values:
+    :return: signed 64-bit integer
+    """
+    normalized = '\x1f'.join(unicodedata.normalize('NFC', value.strip()) for value in values)
+    return int.from_bytes(hashlib.blake2b(normalized.encode(), digest_size=8).digest(), 'big', signed=True)
@@ -5,7 +5,12 @@ from contacts import views
 urlpatterns = [
     path('contacts', views.ListContactsView.as_view(), name='contacts-list'),
     path('contacts/<int:contact_id>', views.ContactDetailsView.as_view(), name='contact-details'),
+    path('contacts/<int:contact_id>/merge', views.MergeContactsView.as_view(), name='contact-merge'),
+    path('contacts/<int:contact_id>/restore', views.RestoreContactView.as_view(), name='contact-restore'),
     path('contacts/search', views.SearchContactsView.as_view(), name='contacts-search'),
+    path('contacts/autocomplete', views.AutocompleteContactsView.as_view(), name='contacts-autocomplete'),
+    path('contacts/duplicates', views.DuplicatesView.as_view(), name='contacts-duplicates'),
+    path('contacts/export', views.ExportSnapshotView.as_view(), name='contacts-export'),
     path('contacts/birthdays', views.BirthdaysView.as_view(), name='contacts-birthdays'),
     path('contacts/<int:contact_id>/phone_numbers', views.ListPhoneNumbersView.as_view(), name='phone-numbers-list'),
     path('contacts/<int:contact_id>/phone_numbers/<str:phone_number>', views.PhoneNumbersDetailsView.as_view(),
@@ -14,5 +19,8 @@ urlpatterns = [
     path('contacts/<int:contact_id>/emails/<str:email>', views.EmailDetailsView.as_view(), name='email-details'),
     path('contacts/<int:contact_id>/addresses', views.ListAddressesView.as_view(), name='addresses-list'),
     path('contacts/<int:contact_id>/addresses/<int:address_id>', views.AddressDetailsView.as_view(),
-         name='address-details')
+         name='address-details'),
+    path('contacts/jobs', views.ListJobsView.as_view(), name='jobs-list'),
+    path('contacts/jobs/<int:job_id>', views.JobDetailsView.as_view(), name='job-details'),
+    path('monitoring', views.MonitoringView.as_view(), name='monitoring'),
 ]
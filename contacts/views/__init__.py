@@ -1,4 +1,10 @@
 from .address import *
 from .contacts import *
+from .duplicates import *
 from .emails import *
+from .jobs import *
+from .metrics import *
+from .monitoring import *
 from .phone_numbers import *
+from .schema import *
+from .snapshots import *
@@ -15,7 +15,7 @@ class ListAddressesView(generics.ListCreateAPIView):
     serializer_class = AddressSerializer
 
     def get_queryset(self):
-        return AddressField.objects.filter(contact_id=self.kwargs['contact_id'])
+        return AddressField.objects.filter(contact=get_object_or_404(Contact, pk=self.kwargs['contact_id']))
 
     def post(self, request, *args, **kwargs):
         requested_contact = get_object_or_404(Contact, pk=kwargs['contact_id'])
@@ -32,12 +32,17 @@ class ListAddressesView(generics.ListCreateAPIView):
 class AddressDetailsView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = AddressSerializer
 
+    def get_object(self):
+        return get_object_or_404(
+            AddressField.objects.of_contact(self.kwargs['contact_id']), pk=self.kwargs['address_id']
+        )
+
     def get(self, request, *args, **kwargs):
-        retrieved_address = get_object_or_404(AddressField, contact_id=kwargs['contact_id'], pk=kwargs['address_id'])
+        retrieved_address = self.get_object()
         return Response(self.serializer_class(retrieved_address).data)
 
     def put(self, request, *args, **kwargs):
-        original_address = get_object_or_404(AddressField, contact_id=kwargs['contact_id'], pk=kwargs['address_id'])
+        original_address = self.get_object()
 
         serializer = self.serializer_class(original_address, data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -49,6 +54,6 @@ class AddressDetailsView(generics.RetrieveUpdateDestroyAPIView):
             raise ValidationError({'address': ['This field is already registered']}) from err
 
     def delete(self, request, *args, **kwargs):
-        requested_address = get_object_or_404(AddressField, contact_id=kwargs['contact_id'], pk=kwargs['address_id'])
+        requested_address = self.get_object()
         requested_address.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
@@ -1,28 +1,160 @@
 import datetime
+import json
+
+from django.conf import settings
 from django.db import transaction
+from django.db.models import BooleanField, Case, Exists, OuterRef, Q, Value, When, prefetch_related_objects
+from django.shortcuts import get_object_or_404
+from django.http import HttpResponse
+from django.utils import timezone
 from rest_framework import generics, status
-from rest_framework.exceptions import NotFound
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
-from contacts.models import Contact
-from contacts.serializers import ContactSerializer, ContactNestedSerializer
+from contacts.cache import (
+    get_cached_contact, get_or_render_contact, contacts_count, data_generation, normalize_query, search_results
+)
+from contacts.db import bulk_delete, prefix_lookups
+from contacts.models import Contact, PhoneNumber, EmailField, AddressField
+from contacts.name_index import name_index
+from contacts.pagination import EstimatedCountPagination
+from contacts.phonetics import soundex, edit_distance
+from contacts.serializers import ContactSerializer, ContactNestedSerializer, MergeContactsSerializer
+from contacts.signals import contacts_bulk_changed
+from contacts.text import fold
 
 
 class SearchContactsView(generics.ListAPIView):
+    """
+    Provides the contacts matching a given `query`, with `fuzzy=1` the names
+    are matched by how they sound and ranked by their edit distance to the query
+    """
     serializer_class = ContactSerializer
+    pagination_class = EstimatedCountPagination
 
     def get_queryset(self):
+        return self.hydrate(self.get_contact_ids())
+
+    def list(self, request, *args, **kwargs):
+        contact_ids = self.get_contact_ids()
+        page = self.paginate_queryset(contact_ids)
+        if page is None:
+            return Response(self.get_serializer(self.hydrate(contact_ids), many=True).data)
+        return self.get_paginated_response(self.get_serializer(self.hydrate(page), many=True).data)
+
+    def get_contact_ids(self):
         query = self.request.query_params.get('query', '')
-        by_first_name = Contact.objects.filter(first_name__icontains=query)
-        by_last_name = Contact.objects.filter(last_name__icontains=query)
-        by_email = Contact.objects.filter(emails__email__icontains=query)
-        by_phone = Contact.objects.filter(phone_numbers__phone__icontains=query)
-        queryset = by_first_name | by_last_name | by_email | by_phone
-
-        if queryset:
-            return queryset.order_by('first_name', 'last_name').distinct()
-        else:
+        fuzzy = self.request.query_params.get('fuzzy') == '1'
+        cache_key = (fuzzy, normalize_query(query))
+        generation = data_generation()
+
+        contact_ids = search_results.get(cache_key, generation)
+        if contact_ids is None:
+            contact_ids = self.fuzzy_search(query) if fuzzy else self.search(query)
+            search_results.set(cache_key, generation, contact_ids)
+
+        if not contact_ids:
             raise NotFound()
+        return contact_ids
+
+    @staticmethod
+    def hydrate(contact_ids):
+        contacts = Contact.objects.prefetch_related('phone_numbers', 'emails', 'addresses').in_bulk(contact_ids)
+        return [contacts[contact_id] for contact_id in contact_ids if contact_id in contacts]
+
+    @staticmethod
+    def search(query):
+        """
+        Contacts with a name starting with the query (ignoring case and
+        accents), an email starting with it (or containing it, for queries
+        with an `@`) or a phone containing it, then the other contacts with
+        a name or an email containing the query
+        """
+        key = fold(query).strip()
+        if not key:
+            return list(Contact.objects.order_by(*Contact.NAME_ORDERING).values_list('id', flat=True))
+
+        # The names are matched on the prefixes of the name keys, a full name
+        # ("first last") within the range of its first word
+        first_word, _, other_words = key.partition(' ')
+        first_names = Q(**prefix_lookups('first_name_key', key))
+        if other_words:
+            first_names = Q(**prefix_lookups('first_name_key', first_word)) & (
+                first_names | Q(**prefix_lookups('last_name_key', other_words.strip()))
+            )
+        matches = first_names | Q(**prefix_lookups('last_name_key', key))
+
+        # Semi-joins, so no DISTINCT over the contacts joined to their emails and phones is needed
+        emails = EmailField.objects.filter(email_key__contains=key) if '@' in key else \
+            EmailField.objects.filter(**prefix_lookups('email_key', key))
+        matches |= Q(pk__in=emails.values('contact_id'))
+        # The phones are only scanned for the queries with digits
+        if any(character.isdigit() for character in key):
+            matches |= Q(pk__in=PhoneNumber.objects.filter(phone__contains=key).values('contact_id'))
+
+        # The substrings cannot use the indexes (a scan of the names and the
+        # emails), their contacts come after those matched on the indexes
+        substrings = Q(first_name_key__contains=key) | Q(last_name_key__contains=key) | Q(
+            pk__in=EmailField.objects.filter(email_key__contains=key).values('contact_id')
+        )
+        contacts = Contact.objects.filter(matches | substrings).annotate(
+            substring_only=Case(When(matches, then=Value(False)), default=Value(True), output_field=BooleanField())
+        )
+        return list(contacts.order_by('substring_only', *Contact.NAME_ORDERING).values_list('id', flat=True))
+
+    @staticmethod
+    def fuzzy_search(query):
+        words = [word.casefold() for word in query.split()]
+        phonetic_keys = {soundex(word) for word in words} - {''}
+        if not phonetic_keys:
+            return []
+
+        # Only the contacts sharing a phonetic key (indexed) are ranked. With
+        # several keys, the contacts sharing both their first and last name keys
+        # come first, so that a common name (e.g. "John Smith") is not crowded
+        # out of the capped candidates by the contacts sharing only one of them
+        max_candidates = settings.CONTACTS_FUZZY_SEARCH['MAX_CANDIDATES']
+        first_names, last_names = Q(first_name_phonetic__in=phonetic_keys), Q(last_name_phonetic__in=phonetic_keys)
+        fields = ('id', 'first_name_key', 'last_name_key')
+        candidates, others = [], Contact.objects.filter(first_names | last_names)
+        if len(phonetic_keys) > 1:
+            candidates = list(Contact.objects.filter(first_names & last_names).values_list(*fields)[:max_candidates])
+            others = others.exclude(first_names & last_names)
+        if len(candidates) < max_candidates:
+            candidates += others.values_list(*fields)[:max_candidates - len(candidates)]
+        folded_words = [fold(word) for word in words]
+
+        def rank(candidate):
+            contact_id, first_name_key, last_name_key = candidate
+            names = '{} {}'.format(first_name_key, last_name_key).split()
+            distance = sum(min(edit_distance(word, name) for name in names) for word in folded_words)
+            return distance, first_name_key, last_name_key, contact_id
+
+        return [contact_id for contact_id, _, _ in sorted(candidates, key=rank)]
+
+
+class AutocompleteContactsView(APIView):
+    """
+    Provides the contacts with a first or last name starting with a given `prefix`
+    """
+
+    def get(self, request, *args, **kwargs):
+        prefix = request.query_params.get('prefix', '').strip()
+        try:
+            limit = int(request.query_params.get('limit', settings.CONTACTS_AUTOCOMPLETE['LIMIT']))
+        except ValueError:
+            raise ValidationError({'limit': ['A valid integer is required.']})
+
+        if not prefix:
+            return Response([])
+
+        limit = max(1, min(limit, settings.CONTACTS_AUTOCOMPLETE['MAX_LIMIT']))
+        matches = name_index.search(prefix, limit)
+        return Response([
+            {'id': contact_id, 'first_name': first_name, 'last_name': last_name}
+            for contact_id, first_name, last_name in matches
+        ])
 
 
 class BirthdaysView(generics.ListAPIView):
@@ -32,18 +164,43 @@ class BirthdaysView(generics.ListAPIView):
         today = datetime.datetime.now()
         queryset = Contact.objects.filter(date_of_birth__month=today.month)
 
-        if queryset:
-            return queryset.order_by('date_of_birth__day', 'first_name', 'last_name')
+        if queryset.exists():
+            return queryset.prefetch_related('phone_numbers', 'emails', 'addresses') \
+                .order_by('date_of_birth__day', *Contact.NAME_ORDERING)
         else:
             raise NotFound()
 
 
 class ListContactsView(generics.ListCreateAPIView):
     """
-    Provides a GET and POST method handler
+    Provides a GET and POST method handler, the listing can be filtered by
+    the `country`, `state`, `city` and `zip_prefix` of the addresses
     """
-    queryset = Contact.objects.all().order_by('first_name', 'last_name')
+    queryset = Contact.objects.prefetch_related('phone_numbers', 'emails', 'addresses') \
+        .order_by(*Contact.NAME_ORDERING)
     serializer_class = ContactSerializer
+    pagination_class = EstimatedCountPagination
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        addresses = self.filtered_addresses()
+        if addresses is not None:
+            # A semi-join: each contact is listed once, however many of its addresses match
+            queryset = queryset.filter(pk__in=addresses.values('contact_id'))
+        return queryset
+
+    def filtered_addresses(self):
+        """
+        Addresses matching all the given filters (at once), or None if there are no filters
+        """
+        params = self.request.query_params
+        filters = {field: params[field] for field in ('country', 'state', 'city') if params.get(field)}
+        if params.get('zip_prefix'):
+            filters.update(prefix_lookups('zip_code', params['zip_prefix']))
+        return AddressField.objects.filter(**filters) if filters else None
+
+    def get_total_count(self):
+        return contacts_count() if self.filtered_addresses() is None else None
 
     @transaction.atomic
     def post(self, request, *args, **kwargs):
@@ -62,3 +219,114 @@ class ContactDetailsView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Contact.objects.all()
     serializer_class = ContactSerializer
     lookup_url_kwarg = 'contact_id'
+    # Fields of the contact itself, not of its relations
+    scalar_fields = {'first_name', 'last_name', 'date_of_birth'}
+
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Serve the rendered contact from the cache (only for JSON responses)
+        """
+        if request.accepted_renderer.format != 'json':
+            return super().retrieve(request, *args, **kwargs)
+
+        content = get_or_render_contact(kwargs['contact_id'], self.render_contact)
+        return HttpResponse(content, content_type=request.accepted_renderer.media_type)
+
+    def render_contact(self):
+        serializer = self.get_serializer(self.get_object())
+        return self.request.accepted_renderer.render(serializer.data)
+
+    def update(self, request, *args, **kwargs):
+        """
+        Write only what changed (see `ContactSerializer.update`), the response
+        of a change of the contact fields alone is built from the contact in
+        memory and its cached representation, so its relations are not read again
+        """
+        contact = self.get_object()
+        serializer = self.get_serializer(contact, data=request.data, partial=kwargs.get('partial', False))
+        serializer.is_valid(raise_exception=True)
+
+        # Read before the write, which invalidates it
+        cached = None
+        if request.accepted_renderer.format == 'json' and set(serializer.validated_data) <= self.scalar_fields:
+            cached = get_cached_contact(contact.pk)
+        serializer.save()
+
+        if cached is None:
+            prefetch_related_objects([contact], 'phone_numbers', 'emails', 'addresses')
+            return Response(self.get_serializer(contact).data)
+
+        data = json.loads(cached.decode())
+        data.update(
+            (field, serializer.fields[field].to_representation(getattr(contact, field)))
+            for field in serializer.validated_data
+        )
+        return Response(data)
+
+    def destroy(self, request, *args, **kwargs):
+        """
+        Mark the contact as deleted with a single UPDATE, its rows are removed
+        later by the `purge_deleted_contacts` job (see `RestoreContactView`)
+        """
+        contact_id = kwargs['contact_id']
+        if not Contact.objects.filter(pk=contact_id).update(deleted_at=timezone.now()):
+            raise NotFound()
+
+        contacts_bulk_changed(deleted_ids=[contact_id])
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class RestoreContactView(APIView):
+    """
+    Provides a POST method handler that restores a deleted contact, until it is purged
+    """
+
+    def post(self, request, *args, **kwargs):
+        contact_id = kwargs['contact_id']
+        deleted = Contact.all_objects.filter(pk=contact_id, deleted_at__gte=Contact.retention_start())
+        if not deleted.update(deleted_at=None):
+            raise NotFound()
+
+        restored_contact = Contact.objects.prefetch_related('phone_numbers', 'emails', 'addresses').get(pk=contact_id)
+        contacts_bulk_changed(restored=[restored_contact])
+        return Response(ContactSerializer(restored_contact).data)
+
+
+class MergeContactsView(APIView):
+    """
+    Provides a POST method handler that merges the contacts in `source_ids`
+    into the requested one, with a constant number of queries
+    """
+
+    @transaction.atomic
+    def post(self, request, *args, **kwargs):
+        target_id = kwargs['contact_id']
+        serializer = MergeContactsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        source_ids = set(serializer.validated_data['source_ids'])
+
+        if target_id in source_ids:
+            raise ValidationError({'source_ids': ['A contact cannot be merged into itself']})
+        existing_ids = set(Contact.objects.filter(pk__in=[target_id, *source_ids]).values_list('pk', flat=True))
+        if target_id not in existing_ids:
+            raise NotFound()
+        if source_ids - existing_ids:
+            raise ValidationError({'source_ids': ['Contacts not found: {}'.format(
+                ', '.join(map(str, sorted(source_ids - existing_ids)))
+            )]})
+
+        # Drop the source addresses already registered for the target (or for a previous source)
+        same_address = AddressField.objects.filter(content_hash=OuterRef('content_hash')).filter(
+            Q(contact_id=target_id) | Q(contact_id__in=source_ids, pk__lt=OuterRef('pk'))
+        )
+        bulk_delete(AddressField.objects.filter(contact_id__in=source_ids).filter(Exists(same_address)))
+
+        for model in (PhoneNumber, EmailField, AddressField):
+            model.objects.filter(contact_id__in=source_ids).update(contact_id=target_id)
+        bulk_delete(Contact.objects.filter(pk__in=source_ids))
+        contacts_bulk_changed(changed_ids=[target_id], deleted_ids=source_ids)
+
+        merged_contact = get_object_or_404(
+            Contact.objects.prefetch_related('phone_numbers', 'emails', 'addresses'), pk=target_id
+        )
+        return Response(ContactSerializer(merged_contact).data)
@@ -0,0 +1,26 @@
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from contacts.duplicates import read_report
+from contacts.jobs import enqueue
+from contacts.serializers import DuplicatesJobSerializer
+from contacts.views.jobs import job_accepted
+
+
+class DuplicatesView(APIView):
+    """
+    Provides the last report of duplicated contacts (see the `find_duplicates`
+    command) and queues the job building a new one
+    """
+
+    def get(self, request, *args, **kwargs):
+        report = read_report()
+        if report is None:
+            raise NotFound('No duplicates report was generated yet.')
+        return Response(report)
+
+    def post(self, request, *args, **kwargs):
+        serializer = DuplicatesJobSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return job_accepted(request, enqueue('find_duplicates', serializer.validated_data))
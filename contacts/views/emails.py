@@ -13,7 +13,7 @@ class ListEmailsView(generics.ListCreateAPIView):
     serializer_class = EmailFieldSerializer
 
     def get_queryset(self):
-        return EmailField.objects.filter(contact_id=self.kwargs['contact_id'])
+        return EmailField.objects.filter(contact=get_object_or_404(Contact, pk=self.kwargs['contact_id']))
 
     def post(self, request, *args, **kwargs):
         serializer = self.serializer_class(data=request.data)
@@ -27,12 +27,17 @@ class ListEmailsView(generics.ListCreateAPIView):
 class EmailDetailsView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = EmailFieldSerializer
 
+    def get_object(self):
+        return get_object_or_404(
+            EmailField.objects.of_contact(self.kwargs['contact_id']), email=self.kwargs['email']
+        )
+
     def get(self, request, *args, **kwargs):
-        retrieved_email = get_object_or_404(EmailField, contact_id=kwargs['contact_id'], email=kwargs['email'])
+        retrieved_email = self.get_object()
         return Response(self.serializer_class(retrieved_email).data)
 
     def put(self, request, *args, **kwargs):
-        original_email = get_object_or_404(EmailField, contact_id=kwargs['contact_id'], email=kwargs['email'])
+        original_email = self.get_object()
 
         serializer = self.serializer_class(original_email, data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -41,7 +46,7 @@ class EmailDetailsView(generics.RetrieveUpdateDestroyAPIView):
 
     def delete(self, request, *args, **kwargs):
         requested_contact = get_object_or_404(Contact, pk=kwargs['contact_id'])
-        requested_email = get_object_or_404(EmailField, contact_id=kwargs['contact_id'], email=kwargs['email'])
+        requested_email = self.get_object()
         if requested_contact.emails.count() > 1:
             requested_email.delete()
             return Response(status=status.HTTP_204_NO_CONTENT)
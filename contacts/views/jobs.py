@@ -0,0 +1,58 @@
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from contacts.jobs import enqueue, job_arguments_serializer, job_kinds
+from contacts.models import Job
+from contacts.serializers import JobSerializer, EnqueueJobSerializer
+
+RECENT_JOBS = 50
+
+
+def job_accepted(request, job):
+    """
+    `202 Accepted` response of a queued job, pointing to its status
+    """
+    url = reverse('job-details', kwargs={'version': request.resolver_match.kwargs['version'], 'job_id': job.pk})
+    response = JsonResponse(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+    response['Location'] = request.build_absolute_uri(url)
+    return response
+
+
+class ListJobsView(APIView):
+    """
+    Provides the most recent background jobs (optionally by `kind` and `status`)
+    and queues new ones
+    """
+
+    def get(self, request, *args, **kwargs):
+        jobs = Job.objects.order_by('-id')
+        for field in ('kind', 'status'):
+            if field in request.query_params:
+                jobs = jobs.filter(**{field: request.query_params[field]})
+        return Response(JobSerializer(jobs[:RECENT_JOBS], many=True).data)
+
+    def post(self, request, *args, **kwargs):
+        serializer = EnqueueJobSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        kind, arguments = serializer.validated_data['kind'], serializer.validated_data['arguments']
+        if kind not in job_kinds():
+            raise ValidationError({'kind': ['Must be one of: {}.'.format(', '.join(job_kinds()))]})
+
+        arguments_serializer = job_arguments_serializer(kind)(data=arguments)
+        if not arguments_serializer.is_valid():
+            raise ValidationError({'arguments': arguments_serializer.errors})
+        return job_accepted(request, enqueue(kind, arguments_serializer.validated_data))
+
+
+class JobDetailsView(APIView):
+    """
+    Provides the status, progress and result of a background job
+    """
+
+    def get(self, request, *args, **kwargs):
+        return Response(JobSerializer(get_object_or_404(Job, pk=kwargs['job_id'])).data)
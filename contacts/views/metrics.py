@@ -0,0 +1,15 @@
+from django.http import HttpResponse
+from django.views import View
+
+from contacts import metrics
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class MetricsView(View):
+    """
+    Provides the metrics of all the worker processes in the Prometheus text format
+    """
+
+    def get(self, request, *args, **kwargs):
+        return HttpResponse(metrics.render(), content_type=CONTENT_TYPE)
@@ -0,0 +1,21 @@
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from contacts.cache import search_results
+from contacts.instrumentation import recent_slow_queries
+from contacts.middleware import admission_stats
+
+
+class MonitoringView(APIView):
+    """
+    Provides the runtime statistics of the current worker process (to staff users only)
+    """
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request, *args, **kwargs):
+        return Response({
+            'admission': admission_stats(),
+            'search_cache': search_results.stats(),
+            'slow_queries': recent_slow_queries(),
+        })
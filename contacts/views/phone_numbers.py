@@ -13,7 +13,7 @@ class ListPhoneNumbersView(generics.ListCreateAPIView):
     serializer_class = PhoneNumberSerializer
 
     def get_queryset(self):
-        return PhoneNumber.objects.filter(contact_id=self.kwargs['contact_id'])
+        return PhoneNumber.objects.filter(contact=get_object_or_404(Contact, pk=self.kwargs['contact_id']))
 
     def post(self, request, *args, **kwargs):
         serializer = self.serializer_class(data=request.data)
@@ -27,12 +27,17 @@ class ListPhoneNumbersView(generics.ListCreateAPIView):
 class PhoneNumbersDetailsView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = PhoneNumberSerializer
 
+    def get_object(self):
+        return get_object_or_404(
+            PhoneNumber.objects.of_contact(self.kwargs['contact_id']), phone=self.kwargs['phone_number']
+        )
+
     def get(self, request, *args, **kwargs):
-        retrieved_phone = get_object_or_404(PhoneNumber, contact_id=kwargs['contact_id'], phone=kwargs['phone_number'])
+        retrieved_phone = self.get_object()
         return Response(self.serializer_class(retrieved_phone).data)
 
     def put(self, request, *args, **kwargs):
-        original_phone = get_object_or_404(PhoneNumber, contact_id=kwargs['contact_id'], phone=kwargs['phone_number'])
+        original_phone = self.get_object()
 
         serializer = self.serializer_class(original_phone, data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -41,7 +46,7 @@ class PhoneNumbersDetailsView(generics.RetrieveUpdateDestroyAPIView):
 
     def delete(self, request, *args, **kwargs):
         requested_contact = get_object_or_404(Contact, pk=kwargs['contact_id'])
-        requested_phone = get_object_or_404(PhoneNumber, contact_id=kwargs['contact_id'], phone=kwargs['phone_number'])
+        requested_phone = self.get_object()
         if requested_contact.phone_numbers.count() > 1:
             requested_phone.delete()
             return Response(status=status.HTTP_204_NO_CONTENT)
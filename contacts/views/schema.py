@@ -0,0 +1,17 @@
+import os
+
+from django.conf import settings
+from django.http import FileResponse, Http404
+from django.views import View
+
+
+class OpenAPISchemaView(View):
+    """
+    Provides the OpenAPI schema of the API, from the file built with
+    `manage.py build_openapi_schema`
+    """
+
+    def get(self, request, *args, **kwargs):
+        if not os.path.exists(settings.OPENAPI_SCHEMA_FILE):
+            raise Http404('The OpenAPI schema was not built')
+        return FileResponse(open(settings.OPENAPI_SCHEMA_FILE, 'rb'), content_type='application/vnd.oai.openapi+json')
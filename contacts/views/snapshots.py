@@ -0,0 +1,103 @@
+import re
+
+from django.http import FileResponse, HttpResponseNotModified, JsonResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import parse_etags
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+
+from contacts.jobs import enqueue
+from contacts.snapshots import latest_snapshot, refresh_snapshot
+from contacts.views.jobs import job_accepted
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 1 << 16
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class ExportSnapshotView(View):
+    """
+    Provides the latest export of all contacts (gzip-compressed NDJSON), served
+    from a prebuilt file with ETag and Range support, and queues the job
+    building a new one
+    """
+
+    def get(self, request, *args, **kwargs):
+        manifest = latest_snapshot()
+        refresh_snapshot(manifest)
+        if manifest is None:
+            return self.unavailable()
+
+        etag = '"{}"'.format(manifest['etag'])
+        if_none_match = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+        if etag in if_none_match or '*' in if_none_match:
+            response = HttpResponseNotModified()
+            response['ETag'] = etag
+            return response
+
+        try:
+            snapshot_file = open(manifest['path'], 'rb')
+        except FileNotFoundError:
+            # Replaced by a newer snapshot in the meantime
+            return self.unavailable()
+
+        size = manifest['size']
+        byte_range = self.requested_range(request, etag, size)
+        if byte_range is None:
+            response = FileResponse(snapshot_file, content_type='application/gzip', as_attachment=True,
+                                    filename='contacts.ndjson.gz')
+        elif byte_range is False:
+            snapshot_file.close()
+            response = HttpResponse(status=416)
+            response['Content-Range'] = 'bytes */{}'.format(size)
+        else:
+            start, end = byte_range
+            snapshot_file.seek(start)
+            response = StreamingHttpResponse(self.read_range(snapshot_file, end - start + 1), status=206,
+                                             content_type='application/gzip')
+            response['Content-Range'] = 'bytes {}-{}/{}'.format(start, end, size)
+            response['Content-Length'] = end - start + 1
+
+        response['ETag'] = etag
+        response['Accept-Ranges'] = 'bytes'
+        return response
+
+    def post(self, request, *args, **kwargs):
+        return job_accepted(request, enqueue('build_snapshot'))
+
+    @staticmethod
+    def requested_range(request, etag, size):
+        """
+        Parse a single byte range of the Range header
+        :return: (start, end) inclusive, None to send the whole file or False if not satisfiable
+        """
+        match = RANGE_RE.match(request.META.get('HTTP_RANGE', '').strip())
+        if_range = request.META.get('HTTP_IF_RANGE')
+        if match is None or (if_range is not None and if_range != etag) or match.groups() == ('', ''):
+            return None
+
+        start, end = match.groups()
+        if start == '':
+            start, end = max(size - int(end), 0), size - 1
+        else:
+            start, end = int(start), min(int(end), size - 1) if end else size - 1
+
+        if start > end or start >= size:
+            return False
+        return start, end
+
+    @staticmethod
+    def read_range(snapshot_file, length):
+        with snapshot_file:
+            while length > 0:
+                chunk = snapshot_file.read(min(CHUNK_SIZE, length))
+                if not chunk:
+                    return
+                length -= len(chunk)
+                yield chunk
+
+    @staticmethod
+    def unavailable():
+        response = JsonResponse({'detail': 'The export is being generated, try again later.'}, status=503)
+        response['Retry-After'] = '5'
+        return response